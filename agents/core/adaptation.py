@@ -0,0 +1,61 @@
+"""
+HAILEI Course Adaptation - reuse of a near-identical prior course's generated sections
+Shared by the IPDAi API and the production mock agents
+"""
+
+import copy
+import os
+import re
+from typing import Any, Dict, Iterable, List, Set
+
+# Descriptions at least this similar (shingle Jaccard) count as unchanged;
+# shares the similarity index's threshold
+DESCRIPTION_SIMILARITY_THRESHOLD = float(os.getenv("HAILEI_SIMILARITY_THRESHOLD", "0.8"))
+
+
+def retitle(value: Any, old_title: str, new_title: str) -> Any:
+    """Copy of a generated section with the course title replaced throughout"""
+    if not old_title or old_title == new_title:
+        return copy.deepcopy(value)
+    if isinstance(value, str):
+        # Templates embed the title as written and lower-cased
+        return value.replace(old_title, new_title).replace(old_title.lower(), new_title.lower())
+    if isinstance(value, list):
+        return [retitle(item, old_title, new_title) for item in value]
+    if isinstance(value, dict):
+        return {key: retitle(item, old_title, new_title) for key, item in value.items()}
+    return value
+
+
+def text_shingles(text: str, size: int = 4) -> Set[str]:
+    """Character shingles of the lower-cased words, ignoring punctuation and spacing"""
+    text = " ".join(re.findall(r"[a-z0-9]+", (text or "").lower()))
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def text_similarity(left: str, right: str) -> float:
+    """Jaccard similarity of the two texts' shingles"""
+    left_shingles, right_shingles = text_shingles(left), text_shingles(right)
+    return len(left_shingles & right_shingles) / len(left_shingles | right_shingles)
+
+
+def stale_sections(section_fields: Dict[str, Iterable[str]], previous_input: Dict[str, Any],
+                   course_input: Dict[str, Any],
+                   description_threshold: float = DESCRIPTION_SIMILARITY_THRESHOLD) -> List[str]:
+    """Sections that depend on an input field changed since the prior course
+
+    The title is left out: retitle carries a section over to the new title.
+    A reworded description only counts as changed once its similarity to the
+    prior one drops below description_threshold.
+    """
+    changed = {
+        name for name in set(previous_input) | set(course_input)
+        if name != "course_title" and previous_input.get(name) != course_input.get(name)
+    }
+    if "course_description" in changed and text_similarity(
+        previous_input.get("course_description", ""), course_input.get("course_description", "")
+    ) >= description_threshold:
+        changed.discard("course_description")
+    return [section for section, fields in section_fields.items() if changed.intersection(fields)]
@@ -4,16 +4,24 @@ FastAPI server hosting HTTP endpoints for all HAILEI agents
 For n8n workflow integration
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional
+import asyncio
+import contextvars
 import json
+from concurrent.futures import ThreadPoolExecutor
 import os
 from datetime import datetime
 import uvicorn
 
 # Import our agent classes
 from test_workflow import MockIPDAi, MockCAuthAi, MockSearchAi
+from ipdai_api import IPDAiAPI, llm_stats as ipdai_llm_stats
+from llm_client import client_stats, close_clients
+from prompts import registry as prompts
+from usage import ledger as usage_ledger
 
 app = FastAPI(
     title="HAILEI Agent API",
@@ -30,6 +38,15 @@ class CourseInput(BaseModel):
     goals: List[str]
     weeks: int = 8
 
+class IPDAiInput(CourseInput):
+    # A prior run's input and IPDAi output; when both are given only the
+    # sections whose input fields changed are generated again
+    previous_input: Optional[CourseInput] = None
+    previous_output: Optional[Dict[str, Any]] = None
+    # Adapt the prior run (reused sections retitled, objectives revised)
+    # instead of regenerating changed sections from scratch
+    adapt: bool = False
+
 class AgentResponse(BaseModel):
     agent: str
     status: str
@@ -40,6 +57,13 @@ class AgentResponse(BaseModel):
 ipdai = MockIPDAi()
 cauthai = MockCAuthAi()
 searchai = MockSearchAi()
+# LLM-backed IPDAi for streaming; falls back to templates without OPENAI_API_KEY
+ai_ipdai = IPDAiAPI()
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    """Close the shared LLM connection pools and their event loop threads"""
+    await close_clients()
 
 @app.get("/")
 async def root():
@@ -62,14 +86,28 @@ async def health_check():
     }
 
 @app.post("/ipdai")
-async def ipdai_endpoint(course_input: CourseInput):
+async def ipdai_endpoint(course_input: IPDAiInput):
     """
     IPDAi - Instructional Planning and Design Agent
-    Creates foundational course structure, objectives, and frameworks
+    Creates foundational course structure, objectives, and frameworks.
+    Given a previous run, regenerates (or adapts) only what changed.
     """
+    input_dict = course_input.dict(exclude={"previous_input", "previous_output", "adapt"})
+    previous_input, previous_output = course_input.previous_input, course_input.previous_output
+    if (previous_input is None) != (previous_output is None):
+        raise HTTPException(status_code=400, detail="previous_input and previous_output must be given together")
+    if course_input.adapt and previous_output is not None:
+        missing = [section for section in IPDAiAPI.SECTION_FIELDS if section not in previous_output]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"previous_output is missing sections: {', '.join(missing)}")
+    
     try:
-        input_dict = course_input.dict()
-        result = ipdai.process_course_input(input_dict)
+        if previous_output is None:
+            result = ipdai.process_course_input(input_dict)
+        elif course_input.adapt:
+            result = await asyncio.to_thread(ai_ipdai.adapt, previous_output, previous_input.dict(), input_dict)
+        else:
+            result = await asyncio.to_thread(ai_ipdai.regenerate, previous_output, previous_input.dict(), input_dict)
         
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
@@ -79,6 +117,37 @@ async def ipdai_endpoint(course_input: CourseInput):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"IPDAi processing error: {str(e)}")
 
+async def sse_events(events: Iterator[Dict[str, Any]], request: Request):
+    """Server-sent events from a blocking event generator
+    
+    Every step runs in the same context, so usage metering scoped inside the
+    generator stays intact even though each step runs on a worker thread.
+    When the client disconnects the generator is closed, releasing its LLM
+    slot, once any step still running has finished.
+    """
+    context = contextvars.copy_context()
+    # One worker runs the steps and the final close in order
+    worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ipdai-sse")
+    loop = asyncio.get_running_loop()
+    try:
+        while not await request.is_disconnected():
+            event = await loop.run_in_executor(worker, context.run, next, events, None)
+            if event is None:
+                break
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        worker.submit(context.run, events.close)
+        worker.shutdown(wait=False)
+
+@app.post("/ipdai/stream")
+async def ipdai_stream_endpoint(course_input: CourseInput, request: Request):
+    """
+    IPDAi with streamed output - server-sent events carrying objective tokens
+    as the LLM generates them, each finished section, then the full result
+    """
+    events = ai_ipdai.stream_course_input(course_input.dict())
+    return StreamingResponse(sse_events(events, request), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.post("/cauthai")
 async def cauthai_endpoint(ipdai_data: Dict[str, Any]):
     """
@@ -308,32 +377,47 @@ async def complete_workflow_endpoint(course_input: CourseInput):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Complete workflow error: {str(e)}")
 
+@app.get("/usage")
+async def usage_totals():
+    """LLM calls, tokens, estimated cost and LLM time in total, per agent and per API key fingerprint"""
+    return usage_ledger.stats()
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Per-client LLM counters, rate limits, circuit breaker, coalescing and cache, plus IPDAi hedging"""
+    return {"clients": client_stats(), "ipdai": ipdai_llm_stats()}
+
 # Agent status endpoints
 @app.get("/agents/status")
 async def agents_status():
     """Get status of all agents"""
     return {
         "agents": {
-            "IPDAi": {"status": "active", "endpoint": "/ipdai"},
+            "IPDAi": {"status": "active", "endpoint": "/ipdai", "stream": "/ipdai/stream", "prompts": prompts.get_stats()},
             "CAuthAi": {"status": "active", "endpoint": "/cauthai"},
             "SearchAi": {"status": "active", "endpoint": "/searchai"},
             "TFDAi": {"status": "active", "endpoint": "/tfdai"},
             "EditorAi": {"status": "active", "endpoint": "/editorai"},
             "EthosAi": {"status": "active", "endpoint": "/ethosai"}
         },
-        "workflow_endpoint": "/complete-workflow"
+        "workflow_endpoint": "/complete-workflow",
+        "usage_endpoint": "/usage",
+        "llm_stats_endpoint": "/llm/stats"
     }
 
 if __name__ == "__main__":
     print("🚀 Starting HAILEI Agent API Server...")
     print("📍 Endpoints available:")
     print("   http://localhost:8000/ipdai")
+    print("   http://localhost:8000/ipdai/stream (SSE)")
     print("   http://localhost:8000/cauthai") 
     print("   http://localhost:8000/searchai")
     print("   http://localhost:8000/tfdai")
     print("   http://localhost:8000/editorai")
     print("   http://localhost:8000/ethosai")
     print("   http://localhost:8000/complete-workflow")
+    print("   http://localhost:8000/usage")
+    print("   http://localhost:8000/llm/stats")
     print("📚 API docs: http://localhost:8000/docs")
     
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""
+HAILEI LLM Call Coalescing - singleflight for identical prompts, micro-batching for small ones
+Concurrent workflows asking the same thing share one provider round trip
+"""
+
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from json_stream import parse_json
+
+# Small prompts arriving within this window are sent as one request (0 disables batching)
+LLM_BATCH_WINDOW = float(os.getenv("HAILEI_LLM_BATCH_WINDOW_MS", "0")) / 1000.0
+LLM_BATCH_MAX_SIZE = int(os.getenv("HAILEI_LLM_BATCH_MAX_SIZE", "8"))
+# Only prompts asking for at most this many tokens are batched
+LLM_BATCH_MAX_TOKENS = int(os.getenv("HAILEI_LLM_BATCH_MAX_TOKENS", "600"))
+
+
+class SingleFlight:
+    """Shares one in-flight call among identical concurrent requests (thread-safe)
+
+    The call is only cancelled once every caller waiting on it has given up.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Tuple[Future, List[int]]] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: str, start: Callable[[], Future]) -> Tuple[Future, bool]:
+        """The in-flight future for key, starting it if needed; True when this caller started it"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call[1][0] += 1
+                self.shared += 1
+                return call[0], False
+            future = start()
+            self._calls[key] = (future, [1])
+            self.leaders += 1
+        future.add_done_callback(lambda done: self._finish(key, done))
+        return future, True
+
+    def _finish(self, key: str, future: Future):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call[0] is future:
+                del self._calls[key]
+
+    def abandon(self, key: str, future: Future):
+        """A caller stopped waiting; cancel the call if nobody else is"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None or call[0] is not future:
+                return
+            call[1][0] -= 1
+            if call[1][0] > 0:
+                return
+            del self._calls[key]
+        future.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "calls": self.leaders, "shared": self.shared}
+
+
+BATCH_INSTRUCTIONS = """Answer each of the {count} independent requests below on its own, exactly as if it had been sent alone.
+Return a JSON object {{"answers": [...]}} whose answers array holds the complete text answer to each request, in order.
+"""
+
+
+def batch_prompt(prompts: List[str]) -> str:
+    sections = [f"### Request {i + 1}\n{prompt.strip()}" for i, prompt in enumerate(prompts)]
+    return BATCH_INSTRUCTIONS.format(count=len(prompts)) + "\n" + "\n\n".join(sections)
+
+
+def split_batch(text: str, count: int) -> Optional[List[str]]:
+    """The per-request answers of a batched completion, or None if it cannot be split"""
+    data = parse_json(text, "{")
+    answers = data.get("answers") if isinstance(data, dict) else None
+    if not isinstance(answers, list) or len(answers) != count:
+        return None
+    return [answer if isinstance(answer, str) else json.dumps(answer) for answer in answers]
+
+
+def share(total: int, weights: List[int]) -> List[int]:
+    """Split an integer total in proportion to weights, keeping the sum exact"""
+    if not any(weights):
+        weights = [1] * len(weights)
+    shares = [total * weight // sum(weights) for weight in weights]
+    shares[-1] += total - sum(shares)
+    return shares
+
+
+@dataclass
+class PendingPrompt:
+    messages: List[Dict[str, str]]
+    max_tokens: int
+    timeout: Optional[float]
+    future: asyncio.Future = field(repr=False)
+
+
+class MicroBatcher:
+    """Collects compatible small prompts for a short window, then runs them as one request
+
+    Prompts are compatible when they share model, temperature and system
+    message and ask for plain text. Lives on the LLM client's event loop;
+    run_group receives each closed group and must resolve every future in it,
+    falling back to one request per prompt when a batch cannot be split.
+    """
+
+    def __init__(self, run_group: Callable[[Tuple, List[PendingPrompt]], Awaitable[None]],
+                 window: float = LLM_BATCH_WINDOW, max_size: int = LLM_BATCH_MAX_SIZE,
+                 max_tokens: int = LLM_BATCH_MAX_TOKENS):
+        self.run_group = run_group
+        self.window = window
+        self.max_size = max(1, max_size)
+        self.max_tokens = max_tokens
+        self._groups: Dict[Tuple, List[PendingPrompt]] = {}
+        self.batches = 0
+        self.batched_prompts = 0
+        self.fallbacks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_size > 1
+
+    def accepts(self, messages: List[Dict[str, str]], max_tokens: int, response_format: Any) -> bool:
+        return (
+            self.enabled and response_format is None and max_tokens <= self.max_tokens
+            and len(messages) == 2 and messages[0]["role"] == "system" and messages[1]["role"] == "user"
+        )
+
+    async def submit(self, messages: List[Dict[str, str]], model: str, max_tokens: int, temperature: float,
+                     timeout: Optional[float]) -> Any:
+        loop = asyncio.get_running_loop()
+        key = (model, temperature, messages[0]["content"])
+        pending = PendingPrompt(messages, max_tokens, timeout, loop.create_future())
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = []
+            loop.call_later(self.window, self._flush, key, group)
+        group.append(pending)
+        if len(group) >= self.max_size:
+            self._flush(key, group)
+        return await pending.future
+
+    def _flush(self, key: Tuple, group: List[PendingPrompt]):
+        # The timer of a group already flushed by size must not close its successor
+        if self._groups.get(key) is not group:
+            return
+        del self._groups[key]
+        live = [pending for pending in group if not pending.future.done()]
+        if live:
+            asyncio.ensure_future(self.run_group(key, live))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1000,
+            "max_size": self.max_size,
+            "batches": self.batches,
+            "batched_prompts": self.batched_prompts,
+            "fallbacks": self.fallbacks
+        }
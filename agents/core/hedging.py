@@ -0,0 +1,184 @@
+"""
+HAILEI Request Hedging - duplicates slow LLM calls to cut tail latency
+A call still running past a recent latency percentile gets a second copy; first answer wins
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+HEDGE_ENABLED = os.getenv("HAILEI_HEDGE_ENABLED", "0") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HAILEI_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HAILEI_HEDGE_MIN_SAMPLES", "20"))
+# Extra (duplicate) calls a single run may spend on hedging
+HEDGE_MAX_PER_RUN = int(os.getenv("HAILEI_HEDGE_MAX_PER_RUN", "2"))
+
+
+class LatencyHistory:
+    """Sliding window of recent call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class HedgeBudget:
+    """Number of duplicate calls one run may still fire"""
+
+    def __init__(self, max_hedges: int = HEDGE_MAX_PER_RUN):
+        self.remaining = max_hedges
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            self.used += 1
+            return True
+
+
+_run_budget: contextvars.ContextVar[Optional[HedgeBudget]] = contextvars.ContextVar("hedge_budget", default=None)
+
+
+# Set inside a duplicate call, which must reach the provider rather than join the original
+_hedge_copy: contextvars.ContextVar[bool] = contextvars.ContextVar("hedge_copy", default=False)
+
+
+def is_hedge_copy() -> bool:
+    return _hedge_copy.get()
+
+
+@contextmanager
+def hedge_budget(max_hedges: int = HEDGE_MAX_PER_RUN) -> Iterator[HedgeBudget]:
+    """Scope a hedge budget to one run; calls outside any run are never hedged"""
+    budget = HedgeBudget(max_hedges)
+    token = _run_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _run_budget.reset(token)
+
+
+class HedgedCaller:
+    """Runs a blocking call, firing one duplicate if it outlives the hedge delay
+
+    The losing call cannot be interrupted and runs to completion in the
+    background, so every hedge costs one extra completion's tokens; the
+    per-run budget bounds that overhead.
+    """
+
+    def __init__(self, percentile: float = HEDGE_PERCENTILE, enabled: bool = HEDGE_ENABLED, max_workers: int = 16):
+        self.percentile = percentile
+        self.enabled = enabled
+        self.history = LatencyHistory()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hailei-hedge")
+        self.stats_lock = threading.Lock()
+        self.calls = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        return self.history.percentile(self.percentile) if self.enabled else None
+
+    def _timed(self, func: Callable[[], Any], hedge: bool = False) -> Callable[[], Any]:
+        context = contextvars.copy_context()
+
+        def timed():
+            started = time.perf_counter()
+            call_context = context.copy()
+            if hedge:
+                call_context.run(_hedge_copy.set, True)
+            result = call_context.run(func)
+            # Cache hits say nothing about provider latency
+            if not getattr(result, "cached", False):
+                self.history.record(time.perf_counter() - started)
+            return result
+        return timed
+
+    def call(self, func: Callable[[], Any], acquire_slot: Callable[[], bool] = lambda: True,
+             release_slot: Callable[[], None] = lambda: None) -> Any:
+        """Return func()'s result, hedging it when enabled and the run has budget left
+
+        acquire_slot/release_slot guard the duplicate call with the caller's
+        concurrency limit; if no slot is free immediately, no hedge is fired.
+        The extra slot stays taken until both copies have finished, so calls
+        still in flight never exceed the limit.
+        """
+        with self.stats_lock:
+            self.calls += 1
+        delay = self.hedge_delay()
+        budget = _run_budget.get()
+        if delay is None or budget is None:
+            return self._timed(func)()
+
+        primary = self._executor.submit(self._timed(func))
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        if not acquire_slot():
+            return primary.result()
+        if not budget.take():
+            release_slot()
+            return primary.result()
+
+        hedge = self._executor.submit(self._timed(func, hedge=True))
+        # The caller releases its own slot when this returns, but the losing copy
+        # keeps running; the hedge's slot is released only once both have finished
+        running = [2]
+        running_lock = threading.Lock()
+
+        def copy_done(_):
+            with running_lock:
+                running[0] -= 1
+                last = running[0] == 0
+            if last:
+                release_slot()
+        primary.add_done_callback(copy_done)
+        hedge.add_done_callback(copy_done)
+        with self.stats_lock:
+            self.hedges_fired += 1
+
+        done, pending = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        winner = done.pop()
+        if winner.exception() is not None and pending:
+            # Prefer whichever copy succeeds
+            winner = pending.pop()
+        if winner is hedge:
+            with self.stats_lock:
+                self.hedges_won += 1
+        return winner.result()
+
+    def get_stats(self) -> Dict[str, Any]:
+        delay = self.hedge_delay()
+        with self.stats_lock:
+            return {
+                "enabled": self.enabled,
+                "percentile": self.percentile,
+                "samples": len(self.history),
+                "hedge_delay": f"{delay:.3f}s" if delay is not None else None,
+                "calls": self.calls,
+                "hedges_fired": self.hedges_fired,
+                "hedges_won": self.hedges_won
+            }
@@ -3,39 +3,198 @@ IPDAi API Endpoint - Accepts JSON input, returns structured course data
 For use in n8n workflow orchestration
 """
 
+import contextvars
 import json
-from typing import Dict, Any
-import openai
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterable, Iterator, Optional, Tuple
 import os
+import threading
+import time
 from datetime import datetime
 
+from pydantic import TypeAdapter
+
+from adaptation import retitle, stale_sections
+from hedging import HedgedCaller, hedge_budget, is_hedge_copy
+from ipdai_schema import COURSE_DESIGN, FRAMEWORKS, MODULES, CourseDesign, json_schema_format, validate_with_repair
+from json_stream import parse_json
+from llm_cache import cache_bypass
+from llm_client import get_client
+from prompts import registry as prompts
+from usage import usage_scope
+
+# Process-wide cap on concurrent LLM calls; callers that cannot get a slot
+# within LLM_SLOT_TIMEOUT seconds fall back to template generation
+MAX_LLM_CALLS = int(os.getenv("HAILEI_MAX_LLM_CALLS", "8"))
+LLM_SLOT_TIMEOUT = float(os.getenv("HAILEI_LLM_SLOT_TIMEOUT", "10"))
+_llm_slots = threading.BoundedSemaphore(MAX_LLM_CALLS)
+# Shared so the hedge delay is learned from every IPDAi call in the process
+_hedger = HedgedCaller()
+
+# Sections are generated concurrently; one that fails or runs past
+# SECTION_TIMEOUT seconds is replaced by its template
+SECTION_TIMEOUT = float(os.getenv("HAILEI_IPDAI_SECTION_TIMEOUT", "45"))
+_section_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("HAILEI_IPDAI_SECTION_WORKERS", "12")), thread_name_prefix="ipdai-section"
+)
+
+# Generate all sections in one structured-output call (needs a model that
+# supports JSON schema response formats, e.g. HAILEI_LLM_MODEL=gpt-4o-mini);
+# an invalid or failed response falls back to per-section generation
+SINGLE_CALL = os.getenv("HAILEI_IPDAI_SINGLE_CALL", "0") == "1"
+
+# A section generator: takes an LLM timeout, returns None when the template must be used
+SectionGenerator = Callable[[Optional[float]], Any]
+
+
+def llm_stats() -> Dict[str, Any]:
+    """Process-wide IPDAi LLM call limits and hedging counters"""
+    return {
+        "max_llm_calls": MAX_LLM_CALLS,
+        "llm_slot_timeout": LLM_SLOT_TIMEOUT,
+        "hedging": _hedger.get_stats()
+    }
+
+
 class IPDAiAPI:
+    # Input fields each generated section depends on (mirrors the templates in prompts.py)
+    SECTION_FIELDS = {
+        "learning_objectives": ("course_title", "course_description", "course_level", "goals"),
+        "pedagogical_frameworks": ("course_title", "course_description", "course_level", "course_domain"),
+        "course_modules": ("course_title", "course_description", "course_level", "weeks", "goals")
+    }
+    
     def __init__(self, api_key: str = None):
         """Initialize IPDAi with OpenAI API key"""
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        if self.api_key:
-            openai.api_key = self.api_key
+        self.llm = get_client(self.api_key) if self.api_key else None
     
-    def generate_with_ai(self, prompt: str, max_tokens: int = 800) -> str:
-        """Generate content using OpenAI API"""
-        if not self.api_key:
+    def _messages(self, prompt: str) -> list:
+        return prompts.messages(prompt)
+    
+    def generate_with_ai(self, prompt: str, max_tokens: int = 800, timeout: Optional[float] = None,
+                         bypass_cache: bool = False, response_format: Optional[Dict[str, Any]] = None) -> str:
+        """Generate content using OpenAI API
+        
+        With a timeout (seconds), the call is skipped when no budget is left
+        and abandoned once it runs over, so the caller uses its template.
+        Identical prompts are answered from the LLM response cache unless
+        bypass_cache is set, and concurrent identical prompts share one call.
+        A response_format, such as a JSON schema, constrains the output.
+        
+        Returns None, so the caller uses its template, when the call fails
+        after the client's retries or the provider's circuit breaker is open.
+        """
+        if not self.api_key or not self.llm.available():
+            return None
+        if timeout is not None and timeout <= 0:
+            return None
+        
+        slot_timeout = LLM_SLOT_TIMEOUT if timeout is None else min(LLM_SLOT_TIMEOUT, timeout)
+        if not _llm_slots.acquire(timeout=slot_timeout):
             return None
-            
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert instructional designer specializing in KDKA and PRRR pedagogical frameworks."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=0.7
+            def complete():
+                return self.llm.chat_sync(self._messages(prompt), max_tokens=max_tokens, timeout=timeout,
+                                          bypass_cache=bypass_cache, response_format=response_format,
+                                          coalesce=not is_hedge_copy())
+            
+            # A slow call may be duplicated once (see hedging.py); the hedge
+            # needs a free LLM slot of its own and is counted against the run.
+            # Concurrent identical prompts share one provider call (see coalescing.py),
+            # but the hedge itself must not join the call it is racing
+            completion = _hedger.call(
+                complete,
+                acquire_slot=lambda: _llm_slots.acquire(blocking=False),
+                release_slot=_llm_slots.release
             )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            return f"Error: {str(e)}"
+            return completion.text
+        except Exception:
+            return None
+        finally:
+            _llm_slots.release()
+    
+    def stream_with_ai(self, prompt: str, max_tokens: int = 800, bypass_cache: bool = False) -> Iterator[str]:
+        """generate_with_ai as a stream of text deltas; yields nothing without an API key or free LLM slot
+        
+        Streamed calls are not hedged. Provider errors propagate to the consumer.
+        """
+        if not self.api_key or not self.llm.available() or not _llm_slots.acquire(timeout=LLM_SLOT_TIMEOUT):
+            return
+        try:
+            yield from self.llm.chat_stream_sync(self._messages(prompt), max_tokens=max_tokens,
+                                                 bypass_cache=bypass_cache)
+        finally:
+            _llm_slots.release()
+    
+    def stream_course_input(self, input_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        process_course_input as a stream of events for incremental rendering:
+        
+        {"event": "token", "section": "learning_objectives", "delta": str}  - objective text as generated
+        {"event": "section", "section": str, "data": ...}                    - a finished section
+        {"event": "complete", "result": {...}}                               - the full output
+        {"event": "error", "detail": str}                                    - invalid input
+        
+        Frameworks and modules are generated in the background while the
+        objectives stream; a section whose generation fails uses its template.
+        """
+        course_title = input_data.get("course_title", "")
+        course_desc = input_data.get("course_description", "")
+        course_level = input_data.get("course_level", "Intermediate")
+        course_domain = input_data.get("course_domain", "")
+        goals = input_data.get("goals", [])
+        weeks = input_data.get("weeks", 8)
+        
+        if not course_title or not course_desc or len(goals) < 2:
+            yield {"event": "error", "detail": "Missing required fields: course_title, course_description, and at least 2 goals"}
+            return
+        
+        result = self._base_output(input_data)
+        generators, templates = self._section_generators(
+            course_title, course_desc, course_level, course_domain, weeks, goals
+        )
+        fallbacks = []
+        started = time.perf_counter()
+        with usage_scope("IPDAi") as meter, cache_bypass(bool(input_data.get("bypass_cache"))):
+            background = {
+                name: _section_executor.submit(contextvars.copy_context().run, generators[name], SECTION_TIMEOUT)
+                for name in ("pedagogical_frameworks", "course_modules")
+            }
+            
+            text = ""
+            try:
+                for delta in self.stream_with_ai(self._objectives_prompt(course_title, course_desc, course_level, goals)):
+                    text += delta
+                    yield {"event": "token", "section": "learning_objectives", "delta": delta}
+            except Exception:
+                text = ""
+            objectives = self._parse_objectives(text)
+            if objectives is None:
+                objectives = self._objectives_template(course_title)
+                if self.api_key:
+                    fallbacks.append("learning_objectives")
+            result["learning_objectives"] = objectives
+            yield {"event": "section", "section": "learning_objectives", "data": objectives}
+            
+            for name, future in background.items():
+                try:
+                    result[name] = future.result(timeout=SECTION_TIMEOUT)
+                except Exception:
+                    result[name] = None
+                if result[name] is None:
+                    result[name] = templates[name]()
+                    if self.api_key:
+                        fallbacks.append(name)
+                yield {"event": "section", "section": name, "data": result[name]}
+        
+        result["metadata"]["generation_mode"] = "streamed"
+        result["metadata"]["fallback_sections"] = fallbacks
+        result["metadata"]["usage"] = meter.to_dict()
+        result["metadata"]["processing_time"] = f"{time.perf_counter() - started:.3f}s"
+        yield {"event": "complete", "result": result}
     
-    def process_course_input(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    def process_course_input(self, input_data: Dict[str, Any], budget_seconds: Optional[float] = None) -> Dict[str, Any]:
         """
         Main processing function - takes course input, returns structured output
         
@@ -46,9 +205,17 @@ class IPDAiAPI:
             "course_level": str,
             "course_domain": str,
             "goals": [str],
-            "weeks": int
+            "weeks": int,
+            "deadline_ms": int (optional),
+            "bypass_cache": bool (optional, skip cached LLM responses),
+            "single_call": bool (optional, defaults to HAILEI_IPDAI_SINGLE_CALL)
         }
         
+        Objectives, frameworks and modules are generated concurrently. A section
+        that fails, or runs past the section timeout or budget_seconds (or
+        deadline_ms in the input), uses its template instead. In single-call
+        mode all three come from one schema-validated response instead.
+        
         Output Schema:
         {
             "agent": "IPDAi",
@@ -68,6 +235,8 @@ class IPDAiAPI:
         course_domain = input_data.get("course_domain", "")
         goals = input_data.get("goals", [])
         weeks = input_data.get("weeks", 8)
+        if budget_seconds is None and input_data.get("deadline_ms"):
+            budget_seconds = input_data["deadline_ms"] / 1000.0
         
         # Validate input
         if not course_title or not course_desc or len(goals) < 2:
@@ -75,67 +244,256 @@ class IPDAiAPI:
                 "error": "Missing required fields: course_title, course_description, and at least 2 goals"
             }
         
-        result = {
+        result = self._base_output(input_data)
+        
+        # Hedged duplicate LLM calls are budgeted, and token usage metered, per run
+        generators, templates = self._section_generators(
+            course_title, course_desc, course_level, course_domain, weeks, goals
+        )
+        single_call = bool(self.api_key) and input_data.get("single_call", SINGLE_CALL)
+        started = time.perf_counter()
+        with usage_scope("IPDAi") as meter, hedge_budget() as hedges, \
+                cache_bypass(bool(input_data.get("bypass_cache"))):
+            sections, fallbacks = None, []
+            if single_call:
+                sections = self._generate_design(course_title, course_desc, course_level, course_domain, weeks,
+                                                 goals, budget_seconds)
+            mode = "single_call" if sections is not None else "per_section"
+            if sections is None:
+                # Per-section generation gets whatever budget the single call left
+                if budget_seconds is not None:
+                    budget_seconds -= time.perf_counter() - started
+                sections, fallbacks = self._generate_sections(generators, templates, list(generators), budget_seconds)
+        result.update(sections)
+        result["metadata"]["generation_mode"] = mode
+        result["metadata"]["hedged_calls"] = hedges.used
+        result["metadata"]["fallback_sections"] = fallbacks
+        result["metadata"]["usage"] = meter.to_dict()
+        result["metadata"]["processing_time"] = f"{time.perf_counter() - started:.3f}s"
+        
+        return result
+    
+    def regenerate(self, previous_output: Dict[str, Any], previous_input: Dict[str, Any],
+                   input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Incremental regeneration - diffs input_data against the input of a previous
+        run and only calls the LLM for sections whose input fields changed.
+        Unchanged sections are copied from previous_output.
+        """
+        changed = {
+            name for name in set(previous_input) | set(input_data)
+            if previous_input.get(name) != input_data.get(name)
+        }
+        stale = {
+            section for section, fields in self.SECTION_FIELDS.items()
+            if section not in previous_output or changed.intersection(fields)
+        }
+        
+        course_title = input_data.get("course_title", "")
+        course_desc = input_data.get("course_description", "")
+        course_level = input_data.get("course_level", "Intermediate")
+        course_domain = input_data.get("course_domain", "")
+        goals = input_data.get("goals", [])
+        weeks = input_data.get("weeks", 8)
+        
+        if not course_title or not course_desc or len(goals) < 2:
+            return {
+                "error": "Missing required fields: course_title, course_description, and at least 2 goals"
+            }
+        
+        result = self._base_output(input_data)
+        result["metadata"]["changed_fields"] = sorted(changed)
+        result["metadata"]["regenerated_sections"] = sorted(stale)
+        
+        generators, templates = self._section_generators(
+            course_title, course_desc, course_level, course_domain, weeks, goals
+        )
+        started = time.perf_counter()
+        with usage_scope("IPDAi") as meter, hedge_budget() as hedges, \
+                cache_bypass(bool(input_data.get("bypass_cache"))):
+            sections, fallbacks = self._generate_sections(generators, templates, sorted(stale))
+        for section in self.SECTION_FIELDS:
+            result[section] = sections[section] if section in stale else previous_output[section]
+        result["metadata"]["hedged_calls"] = hedges.used
+        result["metadata"]["fallback_sections"] = fallbacks
+        result["metadata"]["usage"] = meter.to_dict()
+        result["metadata"]["processing_time"] = f"{time.perf_counter() - started:.3f}s"
+        
+        return result
+    
+    def adapt(self, previous_output: Dict[str, Any], previous_input: Dict[str, Any],
+              input_data: Dict[str, Any], source_run_id: Optional[str] = None,
+              similarity: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Adapt a near-identical prior course instead of generating from scratch.
+        Sections whose input fields (other than the title) changed are
+        regenerated, changed objectives with a short prompt seeded by the
+        previous ones; the rest are retitled copies of the prior course.
+        """
+        course_title = input_data.get("course_title", "")
+        course_desc = input_data.get("course_description", "")
+        course_level = input_data.get("course_level", "Intermediate")
+        course_domain = input_data.get("course_domain", "")
+        goals = input_data.get("goals", [])
+        weeks = input_data.get("weeks", 8)
+        
+        if not course_title or not course_desc or len(goals) < 2:
+            return {
+                "error": "Missing required fields: course_title, course_description, and at least 2 goals"
+            }
+        
+        old_title = previous_input.get("course_title", "")
+        stale = stale_sections(self.SECTION_FIELDS, previous_input, input_data)
+        result = self._base_output(input_data)
+        
+        generators, templates = self._section_generators(
+            course_title, course_desc, course_level, course_domain, weeks, goals
+        )
+        previous_objectives = retitle(previous_output["learning_objectives"], old_title, course_title)
+        generators["learning_objectives"] = lambda timeout: self._revise_objectives(
+            previous_objectives, course_title, course_desc, course_level, goals, timeout=timeout
+        )
+        started = time.perf_counter()
+        with usage_scope("IPDAi") as meter, hedge_budget() as hedges, \
+                cache_bypass(bool(input_data.get("bypass_cache"))):
+            sections, fallbacks = self._generate_sections(generators, templates, stale)
+        for section in self.SECTION_FIELDS:
+            result[section] = sections[section] if section in stale else retitle(
+                previous_output[section], old_title, course_title
+            )
+        
+        result["metadata"]["adapted_from"] = {"run_id": source_run_id, "similarity": similarity}
+        result["metadata"]["regenerated_sections"] = stale
+        result["metadata"]["hedged_calls"] = hedges.used
+        result["metadata"]["fallback_sections"] = fallbacks
+        result["metadata"]["usage"] = meter.to_dict()
+        result["metadata"]["processing_time"] = f"{time.perf_counter() - started:.3f}s"
+        return result
+    
+    def _revise_objectives(self, objectives: Dict[str, Any], course_title: str, course_desc: str,
+                           course_level: str, goals: list,
+                           timeout: Optional[float] = None) -> Optional[Dict[str, str]]:
+        """Revise adapted objectives with a short prompt; None when the LLM gives nothing usable"""
+        if not self.api_key:
+            return None
+        prompt = prompts.render(
+            "revise_objectives", course_title=course_title, course_description=course_desc,
+            course_level=course_level, goals=goals, tlo=objectives.get("tlo", ""), elo=objectives.get("elo", "")
+        )
+        return self._parse_objectives(self.generate_with_ai(prompt, 400, timeout=timeout))
+    
+    def _base_output(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Output envelope (course info and metadata) shared by every generation path"""
+        course_title = input_data.get("course_title", "")
+        return {
             "agent": "IPDAi",
             "course_title": course_title,
             "course_info": {
                 "title": course_title,
-                "description": course_desc,
-                "level": course_level,
-                "domain": course_domain,
-                "goals": goals,
-                "weeks": weeks
+                "description": input_data.get("course_description", ""),
+                "level": input_data.get("course_level", "Intermediate"),
+                "domain": input_data.get("course_domain", ""),
+                "goals": input_data.get("goals", []),
+                "weeks": input_data.get("weeks", 8)
             },
             "metadata": {
                 "generated_date": datetime.now().isoformat(),
                 "agent_version": "1.0",
-                "ai_enabled": bool(self.api_key)
+                "ai_enabled": bool(self.api_key),
+                "prompt_versions": prompts.fingerprints()
             }
         }
+    
+    def _section_generators(self, course_title: str, course_desc: str, course_level: str, course_domain: str,
+                            weeks: int, goals: list
+                            ) -> Tuple[Dict[str, SectionGenerator], Dict[str, Callable[[], Any]]]:
+        """Per-section (generators, templates)
         
-        # Generate Learning Objectives
-        objectives = self._generate_learning_objectives(course_title, course_desc, course_level, goals)
-        result["learning_objectives"] = objectives
-        
-        # Generate Pedagogical Frameworks
-        frameworks = self._generate_frameworks(course_title, course_desc, course_level, course_domain)
-        result["pedagogical_frameworks"] = frameworks
-        
-        # Generate Course Modules
-        modules = self._generate_modules(course_title, course_desc, course_level, weeks, goals)
-        result["course_modules"] = modules
-        
-        return result
+        A generator takes an LLM timeout and returns None when the LLM gave
+        nothing usable (no API key, breaker open, failed call, invalid output);
+        the caller then uses the section's template.
+        """
+        generators = {
+            "learning_objectives": lambda timeout: self._generate_learning_objectives(
+                course_title, course_desc, course_level, goals, timeout=timeout),
+            "pedagogical_frameworks": lambda timeout: self._generate_frameworks(
+                course_title, course_desc, course_level, course_domain, timeout=timeout),
+            "course_modules": lambda timeout: self._generate_modules(
+                course_title, course_desc, course_level, weeks, goals, timeout=timeout)
+        }
+        templates = {
+            "learning_objectives": lambda: self._objectives_template(course_title),
+            "pedagogical_frameworks": lambda: self._frameworks_template(course_title, course_domain),
+            "course_modules": lambda: self._modules_template(course_title, weeks)
+        }
+        return generators, templates
     
-    def _generate_learning_objectives(self, title: str, desc: str, level: str, goals: list) -> Dict[str, str]:
-        """Generate TLO and ELOs"""
-        if self.api_key:
-            prompt = f"""
-Create learning objectives for: {title}
-Description: {desc}
-Level: {level}
-Goals: {', '.join(goals)}
-
-Generate:
-1. ONE Terminal Learning Objective (TLO)
-2. 5-6 Enabling Learning Objectives (ELOs)
-
-Use Bloom's taxonomy verbs appropriate for {level} level.
-Format as:
-TLO: [objective]
-ELOs:
-• [objective 1]
-• [objective 2]
-• [etc.]
-"""
-            
-            result = self.generate_with_ai(prompt)
-            if result and "TLO:" in result:
-                parts = result.split('ELOs:')
-                tlo = parts[0].replace('TLO:', '').strip()
-                elo = parts[1].strip() if len(parts) > 1 else "• Generated objectives"
-                return {"tlo": tlo, "elo": elo}
+    def _generate_sections(self, generators: Dict[str, SectionGenerator], templates: Dict[str, Callable[[], Any]],
+                           names: Iterable[str], budget_seconds: Optional[float] = None):
+        """Generate the named sections concurrently, returning (sections, names that fell back to templates)"""
+        timeout = SECTION_TIMEOUT if budget_seconds is None else min(SECTION_TIMEOUT, budget_seconds)
+        expires_at = time.perf_counter() + timeout
+        # Each section runs in a copy of this context so it shares the run's hedge budget
+        futures = {
+            name: _section_executor.submit(contextvars.copy_context().run, generators[name], timeout)
+            for name in names
+        }
+        sections, fallbacks = {}, []
+        for name, future in futures.items():
+            try:
+                sections[name] = future.result(timeout=max(0.0, expires_at - time.perf_counter()))
+            except Exception:
+                # Timed out or failed; an overrunning LLM call finishes in the background
+                sections[name] = None
+            if sections[name] is None:
+                sections[name] = templates[name]()
+                if self.api_key:
+                    fallbacks.append(name)
+        return sections, fallbacks
+    
+    def _generate_design(self, title: str, desc: str, level: str, domain: str, weeks: int, goals: list,
+                         budget_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Generate objectives, frameworks and modules in one structured-output call
         
+        Returns None when the call fails, runs out of time or its response does
+        not validate against CourseDesign, even after repairing invalid fields.
+        """
+        prompt = prompts.render(
+            "course_design", course_title=title, course_description=desc, course_level=level,
+            course_domain=domain, goals=goals, weeks=weeks
+        )
+        timeout = SECTION_TIMEOUT if budget_seconds is None else min(SECTION_TIMEOUT, budget_seconds)
+        expires_at = time.perf_counter() + timeout
+        result = self.generate_with_ai(prompt, 600 + 250 * weeks, timeout=timeout,
+                                       response_format=json_schema_format(CourseDesign))
+        design = self._validated(COURSE_DESIGN, parse_json(result, "{"), expires_at)
+        if design is None or not design.course_modules:
+            return None
+        return design.to_sections(weeks)
+    
+    def _validated(self, adapter: TypeAdapter, data: Any, expires_at: Optional[float] = None) -> Any:
+        """Validate a parsed section, asking the LLM to fix only its invalid fields (see ipdai_schema)"""
+        def complete(prompt: str, max_tokens: int) -> Optional[str]:
+            timeout = None if expires_at is None else expires_at - time.perf_counter()
+            return self.generate_with_ai(prompt, max_tokens, timeout=timeout, response_format={"type": "json_object"})
+        return validate_with_repair(adapter, data, complete)
+    
+    def _objectives_prompt(self, title: str, desc: str, level: str, goals: list) -> str:
+        return prompts.render(
+            "learning_objectives", course_title=title, course_description=desc, course_level=level, goals=goals
+        )
+    
+    @staticmethod
+    def _parse_objectives(result: Optional[str]) -> Optional[Dict[str, str]]:
+        if result and "TLO:" in result:
+            parts = result.split('ELOs:')
+            tlo = parts[0].replace('TLO:', '').strip()
+            elo = parts[1].strip() if len(parts) > 1 else "• Generated objectives"
+            return {"tlo": tlo, "elo": elo}
+        return None
+    
+    @staticmethod
+    def _objectives_template(title: str) -> Dict[str, str]:
         # Fallback for specific course types
         if "artificial intelligence" in title.lower() or "ai" in title.lower():
             return {
@@ -148,23 +506,32 @@ ELOs:
                 "elo": "• Master fundamental principles\n• Apply theoretical frameworks\n• Analyze complex problems\n• Develop creative solutions\n• Communicate professionally"
             }
     
-    def _generate_frameworks(self, title: str, desc: str, level: str, domain: str) -> Dict[str, Dict[str, str]]:
-        """Generate KDKA and PRRR frameworks"""
-        if self.api_key:
-            prompt = f"""
-Create KDKA and PRRR frameworks for: {title}
-Description: {desc}
-Level: {level}
-
-KDKA: Knowledge, Delivery, Context, Assessment
-PRRR: Personal, Relatable, Relative, Real-world
-
-Return as JSON format.
-"""
-            
-            result = self.generate_with_ai(prompt, 600)
-            # Try to parse JSON from result (simplified)
-            
+    def _generate_learning_objectives(self, title: str, desc: str, level: str, goals: list,
+                                      timeout: Optional[float] = None) -> Optional[Dict[str, str]]:
+        """Generate TLO and ELOs; None when the LLM gives nothing usable"""
+        if not self.api_key:
+            return None
+        return self._parse_objectives(
+            self.generate_with_ai(self._objectives_prompt(title, desc, level, goals), timeout=timeout)
+        )
+    
+    def _generate_frameworks(self, title: str, desc: str, level: str, domain: str,
+                             timeout: Optional[float] = None) -> Optional[Dict[str, Dict[str, str]]]:
+        """Generate KDKA and PRRR frameworks; None when the LLM gives nothing usable"""
+        if not self.api_key:
+            return None
+        prompt = prompts.render(
+            "pedagogical_frameworks", course_title=title, course_description=desc, course_level=level,
+            course_domain=domain
+        )
+        
+        expires_at = None if timeout is None else time.perf_counter() + timeout
+        result = self.generate_with_ai(prompt, 600, timeout=timeout, response_format={"type": "json_object"})
+        frameworks = self._validated(FRAMEWORKS, parse_json(result, "{"), expires_at)
+        return frameworks.to_section() if frameworks is not None else None
+    
+    @staticmethod
+    def _frameworks_template(title: str, domain: str) -> Dict[str, Dict[str, str]]:
         # Fallback framework generation
         if "artificial intelligence" in title.lower():
             return {
@@ -197,8 +564,26 @@ Return as JSON format.
                 }
             }
     
-    def _generate_modules(self, title: str, desc: str, level: str, weeks: int, goals: list) -> list:
-        """Generate course modules"""
+    def _generate_modules(self, title: str, desc: str, level: str, weeks: int, goals: list,
+                          timeout: Optional[float] = None) -> Optional[list]:
+        """Generate course modules; None when the LLM gives nothing usable"""
+        if not self.api_key:
+            return None
+        prompt = prompts.render(
+            "course_modules", course_title=title, course_description=desc, course_level=level,
+            goals=goals, weeks=weeks
+        )
+        
+        expires_at = None if timeout is None else time.perf_counter() + timeout
+        result = self.generate_with_ai(prompt, 200 + 200 * weeks, timeout=timeout)
+        modules = self._validated(MODULES, parse_json(result, "["), expires_at)
+        if not modules:
+            return None
+        return [{"module_number": i + 1, **module.model_dump()} for i, module in enumerate(modules[:weeks])]
+    
+    @staticmethod
+    def _modules_template(title: str, weeks: int) -> list:
+        # Fallback module generation
         if "artificial intelligence" in title.lower():
             module_titles = [
                 "AI Fundamentals & History",
@@ -0,0 +1,175 @@
+"""
+IPDAi Output Schema - pydantic models for structured LLM responses
+Used to constrain the provider's JSON output and to validate it once on arrival
+"""
+
+import copy
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
+
+from json_stream import parse_json
+
+Model = TypeVar("Model", bound=BaseModel)
+
+# Repair prompts allowed per section before it falls back to its template
+REPAIR_ATTEMPTS = int(os.getenv("HAILEI_IPDAI_REPAIR_ATTEMPTS", "2"))
+
+
+class StrictModel(BaseModel):
+    # Structured outputs require every object to forbid unknown keys
+    model_config = ConfigDict(extra="forbid")
+
+
+class LearningObjectives(StrictModel):
+    tlo: str
+    elos: List[str]
+
+    def to_section(self) -> Dict[str, str]:
+        return {"tlo": self.tlo.strip(), "elo": "\n".join(f"• {elo.strip().lstrip('•').strip()}" for elo in self.elos)}
+
+
+class KDKA(StrictModel):
+    knowledge: str
+    delivery: str
+    context: str
+    assessment: str
+
+
+class PRRR(StrictModel):
+    personal: str
+    relatable: str
+    relative: str
+    realworld: str
+
+
+class Frameworks(StrictModel):
+    kdka: KDKA
+    prrr: PRRR
+
+    def to_section(self) -> Dict[str, Dict[str, str]]:
+        return self.model_dump()
+
+
+class Module(StrictModel):
+    title: str
+    objectives: str
+    activities: str
+    assessment: str
+
+
+class CourseDesign(StrictModel):
+    """Objectives, frameworks and modules of one course, generated in a single call"""
+    learning_objectives: LearningObjectives
+    pedagogical_frameworks: Frameworks
+    course_modules: List[Module]
+
+    def to_sections(self, weeks: int) -> Dict[str, Any]:
+        return {
+            "learning_objectives": self.learning_objectives.to_section(),
+            "pedagogical_frameworks": self.pedagogical_frameworks.to_section(),
+            "course_modules": [
+                {"module_number": i + 1, **module.model_dump()}
+                for i, module in enumerate(self.course_modules[:weeks])
+            ]
+        }
+
+
+def json_schema_format(model: Type[BaseModel]) -> Dict[str, Any]:
+    """response_format constraining a completion to model's JSON schema"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model.__name__, "strict": True, "schema": model.model_json_schema()}
+    }
+
+
+def parse_model(model: Type[Model], text: Optional[str]) -> Optional[Model]:
+    """Validate a completion against model, tolerating code fences, surrounding prose and truncation"""
+    data = parse_json(text, "{")
+    if data is None:
+        return None
+    try:
+        return model.model_validate(data)
+    except ValidationError:
+        return None
+
+
+# Validators compiled once per process
+FRAMEWORKS = TypeAdapter(Frameworks)
+MODULES = TypeAdapter(List[Module])
+COURSE_DESIGN = TypeAdapter(CourseDesign)
+
+REPAIR_PROMPT = """Some fields of this JSON are missing or invalid:
+
+{context}
+
+Problems (path: error):
+{problems}
+
+Return a JSON object {{"fixes": [{{"path": [...], "value": ...}}]}} with one fix per problem, using each path exactly as listed.
+Keep every value consistent with the rest of the JSON.
+"""
+
+
+def _parent(data: Any, loc: tuple) -> Any:
+    for key in loc[:-1]:
+        data = data[key]
+    return data
+
+
+def repair_prompt(data: Any, errors: List[Dict[str, Any]]) -> str:
+    """A prompt asking only for the fields named in errors, with their enclosing objects as context"""
+    parents = {}
+    for error in errors:
+        parents.setdefault(error["loc"][:-1], _parent(data, error["loc"]))
+    context = "\n".join(f"At {json.dumps(list(loc))}: {json.dumps(value)}" for loc, value in parents.items())
+    problems = "\n".join(f"{json.dumps(list(error['loc']))}: {error['msg']}" for error in errors)
+    return REPAIR_PROMPT.format(context=context, problems=problems)
+
+
+def apply_fixes(data: Any, fixes: Any, allowed: List[tuple]) -> int:
+    """Write the repair's values into data, at the requested paths only; returns how many applied"""
+    applied = 0
+    for fix in fixes if isinstance(fixes, list) else []:
+        path = tuple(fix.get("path") or ()) if isinstance(fix, dict) else ()
+        if path not in allowed or "value" not in fix:
+            continue
+        try:
+            _parent(data, path)[path[-1]] = fix["value"]
+        except (IndexError, KeyError, TypeError):
+            continue
+        applied += 1
+    return applied
+
+
+def validate_with_repair(adapter: TypeAdapter, data: Any, complete: Callable[[str, int], Optional[str]],
+                         attempts: int = REPAIR_ATTEMPTS) -> Any:
+    """Validate parsed JSON, regenerating only its missing or invalid fields
+
+    complete(prompt, max_tokens) returns the text of a JSON-mode completion
+    (or None). Unknown keys are dropped without asking. Returns the validated
+    value, or None when data is unusable or still invalid after attempts
+    repair prompts.
+    """
+    if data is None:
+        return None
+    data = copy.deepcopy(data)
+    while True:
+        try:
+            return adapter.validate_python(data)
+        except ValidationError as e:
+            errors = e.errors(include_url=False)
+        extra = [error["loc"] for error in errors if error["type"] == "extra_forbidden"]
+        if extra:
+            for loc in extra:
+                del _parent(data, loc)[loc[-1]]
+            continue
+        # An error at the root means the response has the wrong shape altogether
+        if attempts <= 0 or any(not error["loc"] for error in errors):
+            return None
+        attempts -= 1
+        fixes = parse_json(complete(repair_prompt(data, errors), min(600, 150 * len(errors))), "{")
+        if not isinstance(fixes, dict) or not apply_fixes(data, fixes.get("fixes"), [e["loc"] for e in errors]):
+            return None
@@ -0,0 +1,182 @@
+"""
+HAILEI Streaming JSON Parser - tolerant, incremental JSON extraction from LLM output
+Emits array items (e.g. course modules) as soon as they close and repairs truncated responses
+"""
+
+import json
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class JSONStreamParser:
+    """Parses one JSON value out of text arriving in chunks
+
+    Prose and code fences before the value are skipped, and anything after it
+    is ignored. feed() returns the items of the watched array that closed in
+    that chunk: the root array's items for root="[", or the items of the array
+    under items_key for root="{". close() returns the whole value, repaired
+    when the text stopped early: an unterminated string value is closed, an
+    unfinished key or scalar is dropped, and open brackets are closed.
+    """
+
+    def __init__(self, root: str = "[", items_key: Optional[str] = None):
+        if root not in _CLOSERS:
+            raise ValueError("root must be '{' or '['")
+        self.root = root
+        self.items_key = items_key
+        self.text = ""
+        self.done = False
+        self._pos = 0
+        self._started = False
+        # One entry per open container: [bracket, current key, expecting a key, start of current child]
+        self._stack: List[list] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._scalar_start: Optional[int] = None
+        # Longest prefix that is valid JSON once the brackets open at that point are closed
+        self._safe: Tuple[int, str] = (0, "")
+        self.items_emitted = 0
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume the next chunk; returns the watched array's items completed by it"""
+        if self.done or not chunk:
+            return []
+        if not self._started:
+            starts = chunk.find(self.root)
+            if starts == -1:
+                return []
+            chunk = chunk[starts:]
+            self._started = True
+        self.text += chunk
+        items: List[Any] = []
+        text = self.text
+        while self._pos < len(text) and not self.done:
+            self._step(text, self._pos, items)
+            self._pos += 1
+        if self.done:
+            self.text = text[:self._pos]
+        return items
+
+    def _watching(self) -> bool:
+        # True when the innermost open container is the watched array
+        depth = len(self._stack)
+        if self.items_key is None:
+            return depth == 1 and self._stack[0][0] == "["
+        return depth == 2 and self._stack[1][0] == "[" and self._stack[0][1] == self.items_key
+
+    def _closers(self) -> str:
+        return "".join(_CLOSERS[entry[0]] for entry in reversed(self._stack))
+
+    def _value_done(self, end: int, items: List[Any]):
+        """A value ending just before end finished inside the innermost container"""
+        if not self._stack:
+            return
+        top = self._stack[-1]
+        if top[0] == "[" and self._watching() and top[3] is not None:
+            try:
+                items.append(json.loads(self.text[top[3]:end]))
+                self.items_emitted += 1
+            except ValueError:
+                pass
+        top[3] = None
+        self._safe = (end, self._closers())
+
+    def _end_scalar(self, end: int, items: List[Any]):
+        if self._scalar_start is None:
+            return
+        self._scalar_start = None
+        self._value_done(end, items)
+
+    def _step(self, text: str, i: int, items: List[Any]):
+        char = text[i]
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                top = self._stack[-1]
+                if top[0] == "{" and top[2]:
+                    top[1] = _loads(text[self._string_start:i + 1])
+                    top[2] = False
+                else:
+                    self._value_done(i + 1, items)
+            return
+
+        if char in " \t\r\n":
+            self._end_scalar(i, items)
+            return
+        if char in ",}]":
+            self._end_scalar(i, items)
+            if char == ",":
+                top = self._stack[-1]
+                if top[0] == "{":
+                    top[2] = True
+                return
+            self._stack.pop()
+            if not self._stack:
+                self.done = True
+                self._safe = (i + 1, "")
+                return
+            self._value_done(i + 1, items)
+            return
+        if char == ":":
+            return
+
+        if self._stack and self._stack[-1][0] == "[" and self._stack[-1][3] is None:
+            self._stack[-1][3] = i
+        if char in _CLOSERS:
+            self._stack.append([char, None, char == "{", None])
+            self._safe = (i + 1, self._closers())
+        elif char == '"':
+            self._in_string = True
+            self._string_start = i
+        elif self._scalar_start is None:
+            self._scalar_start = i
+
+    def close(self) -> Any:
+        """The parsed value, repaired if the text ended early; None if nothing usable arrived"""
+        if not self._started:
+            return None
+        if self.done:
+            return _loads(self.text)
+        if self._in_string:
+            top = self._stack[-1]
+            if not (top[0] == "{" and top[2]):
+                # Keep a truncated string value rather than the whole object around it
+                text = self.text[:-1] if self._escaped else self.text
+                repaired = _loads(text + '"' + self._closers())
+                if repaired is not None:
+                    return repaired
+        elif self._scalar_start is not None:
+            repaired = _loads(self.text + self._closers())
+            if repaired is not None:
+                return repaired
+        end, closers = self._safe
+        return _loads(self.text[:end] + closers)
+
+
+def _loads(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def parse_json(text: Optional[str], root: str = "{") -> Any:
+    """One-shot tolerant parse of the first JSON object ("{") or array ("[") in text"""
+    if not text:
+        return None
+    parser = JSONStreamParser(root)
+    parser.feed(text)
+    return parser.close()
+
+
+def iter_items(chunks: Iterable[str], root: str = "[", items_key: Optional[str] = None) -> Iterator[Any]:
+    """Items of the watched array (see JSONStreamParser) as the chunks that complete them arrive"""
+    parser = JSONStreamParser(root, items_key)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
@@ -0,0 +1,245 @@
+"""
+HAILEI LLM Response Cache - memory LRU + SQLite tiers in front of chat completions
+Identical requests (model, messages, temperature, max_tokens) are answered without the provider
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+LLM_CACHE_ENABLED = os.getenv("HAILEI_LLM_CACHE", "1") != "0"
+LLM_CACHE_TTL = float(os.getenv("HAILEI_LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("HAILEI_LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_MEMORY_BYTES = int(os.getenv("HAILEI_LLM_CACHE_MEMORY_BYTES", str(16 * 1024 * 1024)))
+LLM_CACHE_DB = os.getenv("HAILEI_LLM_CACHE_DB", "hailei_llm_cache.db")  # empty string disables the disk tier
+LLM_CACHE_DISK_BYTES = int(os.getenv("HAILEI_LLM_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+
+
+def cache_key(model: str, messages: Any, temperature: float, max_tokens: int, response_format: Any = None) -> str:
+    payload = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+    if response_format is not None:
+        payload["response_format"] = response_format
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def cache_bypass(enabled: bool = True) -> Iterator[None]:
+    """Skip cache reads for LLM calls made inside the block; fresh results are still stored"""
+    token = _bypass.set(enabled)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def bypass_active() -> bool:
+    return _bypass.get()
+
+
+class MemoryTier:
+    """Thread-safe LRU bounded by entry count and total value size"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.evictions = 0
+        # key -> (expires_at, value), least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + ttl, value)
+            self.size_bytes += len(value)
+            while self._entries and (len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        _, value = self._entries.pop(key)
+        self.size_bytes -= len(value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskTier:
+    """SQLite tier bounded by total value size; least recently used rows go first
+
+    Each thread reuses its own connection. The total size is counted at
+    startup and then kept in memory, so it assumes one process owns the file.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        with self._lock, self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+            self._size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30)
+        return conn
+
+    def _delete(self, conn: sqlite3.Connection, where: str, params: tuple) -> int:
+        """Delete matching rows, keeping the size counter in step; returns the rows removed"""
+        removed, size = conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache WHERE {where}", params
+        ).fetchone()
+        if removed:
+            conn.execute(f"DELETE FROM llm_cache WHERE {where}", params)
+            self._size -= size
+        return removed
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._conn() as conn:
+            row = conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at < now:
+                self._delete(conn, "key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        return value
+
+    def set(self, key: str, value: str, ttl: float):
+        now = time.time()
+        with self._lock, self._conn() as conn:
+            self._delete(conn, "key = ? OR expires_at < ?", (key, now))
+            conn.execute(
+                "INSERT INTO llm_cache (key, value, size, expires_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now + ttl, now)
+            )
+            self._size += len(value)
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        while self._size > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used LIMIT 32").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._size <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._size -= size
+                self.evictions += 1
+
+    def size_bytes(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        with self._lock, self._conn() as conn:
+            return conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class LLMCache:
+    """Two-tier cache of completion payloads with hit/miss counters"""
+
+    def __init__(self, ttl: float = LLM_CACHE_TTL, memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+                 memory_bytes: int = LLM_CACHE_MEMORY_BYTES, disk_path: Optional[str] = LLM_CACHE_DB,
+                 disk_bytes: int = LLM_CACHE_DISK_BYTES):
+        self.ttl = ttl
+        self.memory = MemoryTier(memory_entries, memory_bytes)
+        self.disk = DiskTier(disk_path, disk_bytes) if disk_path else None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "stores": 0}
+        self._counter_lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def get(self, key: str, bypass: bool = False) -> Optional[Dict[str, Any]]:
+        if bypass or bypass_active():
+            self._count("bypassed")
+            return None
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return json.loads(value)
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value, self.ttl)
+                self._count("disk_hits")
+                return json.loads(value)
+        self._count("misses")
+        return None
+
+    def set(self, key: str, payload: Dict[str, Any]):
+        value = json.dumps(payload)
+        self.memory.set(key, value, self.ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, self.ttl)
+        self._count("stores")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._counter_lock:
+            counters = dict(self.counters)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        stats = {
+            **counters,
+            "hit_rate": round((counters["memory_hits"] + counters["disk_hits"]) / lookups, 3) if lookups else 0.0,
+            "ttl_seconds": self.ttl,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.size_bytes,
+            "memory_evictions": self.memory.evictions,
+            "disk_enabled": self.disk is not None
+        }
+        if self.disk is not None:
+            stats.update({
+                "disk_entries": len(self.disk),
+                "disk_bytes": self.disk.size_bytes(),
+                "disk_evictions": self.disk.evictions
+            })
+        return stats
+
+
+_shared_cache: Optional[LLMCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_cache() -> Optional[LLMCache]:
+    """Process-wide cache, or None when HAILEI_LLM_CACHE=0"""
+    global _shared_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMCache()
+        return _shared_cache
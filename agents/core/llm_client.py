@@ -0,0 +1,534 @@
+"""
+HAILEI LLM Client - asyncio-native chat completions over a shared keep-alive pool
+Every agent (FastAPI, executor threads, Streamlit) talks to the provider through here
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import openai
+
+from coalescing import MicroBatcher, PendingPrompt, SingleFlight, batch_prompt, share, split_batch
+from llm_cache import LLMCache, cache_key, get_cache
+from rate_limit import (
+    LLM_BACKOFF_MAX, LLM_MAX_QUEUE_WAIT, LLM_RPM, LLM_TPM, CircuitBreaker, TokenBucket, backoff_delay,
+    estimate_tokens
+)
+from usage import key_fingerprint, record_completion
+
+DEFAULT_MODEL = os.getenv("HAILEI_LLM_MODEL", "gpt-3.5-turbo")
+DEFAULT_BASE_URL = os.getenv("OPENAI_BASE_URL")  # None means the OpenAI API
+LLM_CONCURRENCY = int(os.getenv("HAILEI_LLM_CONCURRENCY", "16"))
+LLM_TIMEOUT = float(os.getenv("HAILEI_LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("HAILEI_LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_CONNECTIONS = int(os.getenv("HAILEI_LLM_MAX_CONNECTIONS", "32"))
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("HAILEI_LLM_KEEPALIVE_CONNECTIONS", "16"))
+LLM_MAX_RETRIES = int(os.getenv("HAILEI_LLM_MAX_RETRIES", "2"))
+
+Messages = List[Dict[str, str]]
+
+# Transient provider failures: retried with backoff and counted by the circuit breaker
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After), capped at LLM_BACKOFF_MAX"""
+    response = getattr(error, "response", None)
+    try:
+        return min(LLM_BACKOFF_MAX, float(response.headers["retry-after"]))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+@dataclass
+class Completion:
+    """Text and token usage of one chat completion"""
+    text: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+    cached: bool = False
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class AsyncLLMClient:
+    """Chat completion client with bounded concurrency and a pooled HTTP connection
+
+    All requests run on one background event loop owned by the client, so
+    the connection pool is shared no matter which loop or thread calls in:
+    `await chat(...)` from async code, `chat_sync(...)` from blocking code,
+    and `chat_stream(...)` / `chat_stream_sync(...)` for text as it is generated.
+    Responses are cached on (model, messages, temperature, max_tokens) unless
+    the call passes bypass_cache=True or runs inside llm_cache.cache_bypass().
+    Every completion, cached or not, is accounted in usage.py.
+
+    Provider calls pass through a gateway (see rate_limit.py): RPM/TPM token
+    buckets, jittered exponential backoff on 429/5xx/connection errors and a
+    circuit breaker that refuses calls while the provider keeps failing.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = DEFAULT_BASE_URL,
+                 max_concurrency: int = LLM_CONCURRENCY, timeout: float = LLM_TIMEOUT,
+                 max_connections: int = LLM_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = LLM_KEEPALIVE_CONNECTIONS,
+                 max_retries: int = LLM_MAX_RETRIES, cache: Optional[LLMCache] = None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.max_retries = max_retries
+        self.cache = cache if cache is not None else get_cache()
+        self.rpm = TokenBucket(LLM_RPM)
+        self.tpm = TokenBucket(LLM_TPM)
+        self.breaker = CircuitBreaker()
+        self.flights = SingleFlight()
+        self.batcher = MicroBatcher(self._run_batch)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[openai.AsyncOpenAI] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+        self.in_flight = 0
+        self.requests_total = 0
+        self.errors_total = 0
+        self.retries_total = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="hailei-llm-client", daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _connect(self):
+        # Runs on the client's loop so the pool and semaphore bind to it
+        if self._client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=LLM_CONNECT_TIMEOUT)
+            )
+            self._client = openai.AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url,
+                max_retries=0, http_client=http_client  # retries are the gateway's job
+            )
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    async def _gateway(self, attempt: Callable[[], Awaitable[Completion]], messages: Messages, max_tokens: int,
+                       timeout: Optional[float], can_retry: Callable[[], bool] = lambda: True) -> Completion:
+        """Run attempt() within the RPM/TPM budgets, retrying transient provider errors
+
+        Refuses immediately with CircuitOpenError while the breaker is open,
+        and with RateLimitExceeded when capacity is further away than the call's
+        timeout (or LLM_MAX_QUEUE_WAIT) allows.
+        """
+        self.breaker.allow()
+        max_wait = LLM_MAX_QUEUE_WAIT if timeout is None else min(LLM_MAX_QUEUE_WAIT, timeout)
+        reserved = estimate_tokens(messages) + max_tokens
+        try:
+            await self.rpm.acquire(1, max_wait)
+            await self.tpm.acquire(reserved, max_wait)
+        except BaseException:
+            self.breaker.release()
+            raise
+
+        retries = 0
+        while True:
+            try:
+                completion = await attempt()
+            except RETRYABLE_ERRORS as e:
+                self.breaker.record_failure()
+                if isinstance(e, openai.RateLimitError):
+                    # The provider disagrees with our budget; make everyone wait for a refill
+                    self.rpm.drain()
+                if retries >= self.max_retries or not can_retry() or self.breaker.is_open():
+                    raise
+                self.retries_total += 1
+                await asyncio.sleep(retry_after(e) or backoff_delay(retries))
+                retries += 1
+                await self.rpm.acquire(1)
+                continue
+            except BaseException:
+                # Client errors and cancellation say nothing about provider health
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            if completion.total_tokens:
+                self.tpm.refund(reserved - completion.total_tokens)
+            return completion
+
+    async def _chat(self, messages: Messages, model: str, max_tokens: int, temperature: float,
+                    timeout: Optional[float], response_format: Optional[Dict[str, Any]] = None) -> Completion:
+        self._connect()
+
+        async def attempt() -> Completion:
+            async with self._slots:
+                self.in_flight += 1
+                self.requests_total += 1
+                started = time.perf_counter()
+                try:
+                    response = await self._client.chat.completions.create(
+                        model=model, messages=messages, max_tokens=max_tokens, temperature=temperature,
+                        response_format=response_format if response_format is not None else openai.NOT_GIVEN,
+                        timeout=timeout if timeout is not None else self.timeout
+                    )
+                except Exception:
+                    self.errors_total += 1
+                    raise
+                finally:
+                    self.in_flight -= 1
+            usage = response.usage
+            return Completion(
+                text=(response.choices[0].message.content or "").strip(),
+                model=response.model or model,
+                prompt_tokens=usage.prompt_tokens if usage else 0,
+                completion_tokens=usage.completion_tokens if usage else 0,
+                latency=time.perf_counter() - started
+            )
+
+        return await self._gateway(attempt, messages, max_tokens, timeout)
+
+    async def _stream(self, messages: Messages, model: str, max_tokens: int, temperature: float,
+                      timeout: Optional[float], emit: Callable[[str], None]) -> Completion:
+        """Streamed _chat: emit() receives each text delta, the full completion is returned"""
+        self._connect()
+        emitted = False
+
+        async def attempt() -> Completion:
+            nonlocal emitted
+            async with self._slots:
+                self.in_flight += 1
+                self.requests_total += 1
+                started = time.perf_counter()
+                parts: List[str] = []
+                usage = None
+                resolved_model = model
+                try:
+                    stream = await self._client.chat.completions.create(
+                        model=model, messages=messages, max_tokens=max_tokens, temperature=temperature,
+                        stream=True, stream_options={"include_usage": True},
+                        timeout=timeout if timeout is not None else self.timeout
+                    )
+                    async for chunk in stream:
+                        resolved_model = chunk.model or resolved_model
+                        if chunk.usage is not None:
+                            usage = chunk.usage
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            parts.append(chunk.choices[0].delta.content)
+                            emitted = True
+                            emit(chunk.choices[0].delta.content)
+                except Exception:
+                    self.errors_total += 1
+                    raise
+                finally:
+                    self.in_flight -= 1
+            return Completion(
+                text="".join(parts).strip(),
+                model=resolved_model,
+                prompt_tokens=usage.prompt_tokens if usage else 0,
+                completion_tokens=usage.completion_tokens if usage else 0,
+                latency=time.perf_counter() - started
+            )
+
+        # Once text has reached the consumer a retry would repeat it
+        return await self._gateway(attempt, messages, max_tokens, timeout, can_retry=lambda: not emitted)
+
+    def _recorded(self, completion: Completion) -> Completion:
+        # Runs in the caller's context so the call lands on the caller's usage meter
+        record_completion(completion, self.api_key)
+        return completion
+
+    @staticmethod
+    def _from_cache(payload: Dict[str, Any]) -> Completion:
+        return Completion(**{**payload, "latency": 0.0, "cached": True})
+
+    @staticmethod
+    def _to_cache(completion: Completion) -> Dict[str, Any]:
+        payload = asdict(completion)
+        del payload["latency"], payload["cached"]
+        return payload
+
+    async def _dispatch(self, messages: Messages, model: str, max_tokens: int, temperature: float,
+                        timeout: Optional[float], response_format: Optional[Dict[str, Any]],
+                        coalesce: bool) -> Completion:
+        if coalesce and self.batcher.accepts(messages, max_tokens, response_format):
+            return await self.batcher.submit(messages, model, max_tokens, temperature, timeout)
+        return await self._chat(messages, model, max_tokens, temperature, timeout, response_format)
+
+    async def _settle(self, pending: PendingPrompt, call: Awaitable[Completion]):
+        try:
+            result = await call
+        except Exception as e:
+            if not pending.future.done():
+                pending.future.set_exception(e)
+        else:
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+    async def _run_batch(self, key: Tuple, group: List[PendingPrompt]):
+        """Answer a closed micro-batch with one JSON-mode request, split back per prompt"""
+        model, temperature, system = key
+        if len(group) == 1:
+            pending = group[0]
+            await self._settle(pending, self._chat(pending.messages, model, pending.max_tokens, temperature,
+                                                   pending.timeout))
+            return
+
+        prompts = [pending.messages[1]["content"] for pending in group]
+        timeouts = [pending.timeout for pending in group]
+        self.batcher.batches += 1
+        self.batcher.batched_prompts += len(group)
+        answers = None
+        try:
+            completion = await self._chat(
+                [{"role": "system", "content": system}, {"role": "user", "content": batch_prompt(prompts)}],
+                model, sum(pending.max_tokens for pending in group), temperature,
+                None if None in timeouts else max(timeouts), {"type": "json_object"}
+            )
+            answers = split_batch(completion.text, len(group))
+        except Exception:
+            pass
+        if answers is None:
+            self.batcher.fallbacks += 1
+            await asyncio.gather(*(
+                self._settle(pending, self._chat(pending.messages, model, pending.max_tokens, temperature,
+                                                 pending.timeout))
+                for pending in group
+            ))
+            return
+
+        # Attribute the batch's tokens to its members so each run's usage stays roughly right
+        prompt_tokens = share(completion.prompt_tokens, [len(prompt) for prompt in prompts])
+        completion_tokens = share(completion.completion_tokens, [len(answer) for answer in answers])
+        for pending, answer, prompt_share, completion_share in zip(group, answers, prompt_tokens, completion_tokens):
+            if not pending.future.done():
+                pending.future.set_result(Completion(
+                    text=answer.strip(), model=completion.model, prompt_tokens=prompt_share,
+                    completion_tokens=completion_share, latency=completion.latency
+                ))
+
+    def _start(self, key: str, messages: Messages, model: str, max_tokens: int, temperature: float,
+               timeout: Optional[float], response_format: Optional[Dict[str, Any]],
+               coalesce: bool) -> Tuple[Any, bool]:
+        """The provider call for this request and whether this caller owns it
+
+        With coalesce, a caller asking exactly what another caller is already
+        waiting for joins that call instead of starting its own.
+        """
+        def start():
+            return asyncio.run_coroutine_threadsafe(
+                self._dispatch(messages, model, max_tokens, temperature, timeout, response_format, coalesce),
+                self._ensure_loop()
+            )
+        if not coalesce:
+            return start(), True
+        return self.flights.do(key, start)
+
+    def _abandon(self, key: str, future: Any, coalesce: bool):
+        if coalesce:
+            self.flights.abandon(key, future)
+        else:
+            future.cancel()
+
+    async def chat(self, messages: Messages, model: str = DEFAULT_MODEL, max_tokens: int = 800,
+                   temperature: float = 0.7, timeout: Optional[float] = None,
+                   bypass_cache: bool = False, response_format: Optional[Dict[str, Any]] = None,
+                   coalesce: bool = True) -> Completion:
+        """Run one chat completion without blocking the caller's event loop
+
+        response_format is passed through to the provider, e.g. a JSON schema
+        for structured output (see ipdai_schema.json_schema_format). Identical
+        concurrent requests share one provider call unless coalesce is False;
+        the callers that joined it are recorded like cache hits.
+        """
+        key = cache_key(model, messages, temperature, max_tokens, response_format)
+        if self.cache is not None:
+            # SQLite lookups run off the caller's loop; to_thread keeps the bypass context
+            hit = await asyncio.to_thread(self.cache.get, key, bypass_cache)
+            if hit is not None:
+                return self._recorded(self._from_cache(hit))
+
+        future, leader = self._start(key, messages, model, max_tokens, temperature, timeout, response_format,
+                                     coalesce)
+        try:
+            # Shielded: cancelling this caller must not cancel a call others still wait on
+            completion = await asyncio.shield(asyncio.wrap_future(future))
+        except asyncio.CancelledError:
+            self._abandon(key, future, coalesce)
+            raise
+        if not leader:
+            return self._recorded(replace(completion, cached=True))
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, key, self._to_cache(completion))
+        return self._recorded(completion)
+
+    def chat_sync(self, messages: Messages, model: str = DEFAULT_MODEL, max_tokens: int = 800,
+                  temperature: float = 0.7, timeout: Optional[float] = None,
+                  bypass_cache: bool = False, response_format: Optional[Dict[str, Any]] = None,
+                  coalesce: bool = True) -> Completion:
+        """Blocking variant of chat() for threads and scripts without an event loop"""
+        key = cache_key(model, messages, temperature, max_tokens, response_format)
+        if self.cache is not None:
+            hit = self.cache.get(key, bypass_cache)
+            if hit is not None:
+                return self._recorded(self._from_cache(hit))
+
+        future, leader = self._start(key, messages, model, max_tokens, temperature, timeout, response_format,
+                                     coalesce)
+        wait = ((timeout if timeout is not None else self.timeout) + LLM_BACKOFF_MAX) * (self.max_retries + 1) \
+            + LLM_MAX_QUEUE_WAIT + LLM_CONNECT_TIMEOUT
+        try:
+            completion = future.result(wait)
+        except BaseException:
+            if not future.done():
+                self._abandon(key, future, coalesce)
+            raise
+        if not leader:
+            return self._recorded(replace(completion, cached=True))
+        if self.cache is not None:
+            self.cache.set(key, self._to_cache(completion))
+        return self._recorded(completion)
+
+    async def chat_stream(self, messages: Messages, model: str = DEFAULT_MODEL, max_tokens: int = 800,
+                          temperature: float = 0.7, timeout: Optional[float] = None,
+                          bypass_cache: bool = False) -> AsyncIterator[str]:
+        """Yield the completion text as it is generated; a cache hit arrives as one chunk"""
+        key = cache_key(model, messages, temperature, max_tokens) if self.cache is not None else None
+        if key is not None:
+            hit = await asyncio.to_thread(self.cache.get, key, bypass_cache)
+            if hit is not None:
+                yield self._recorded(self._from_cache(hit)).text
+                return
+
+        caller_loop = asyncio.get_running_loop()
+        deltas: asyncio.Queue = asyncio.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._stream(messages, model, max_tokens, temperature, timeout,
+                         lambda delta: caller_loop.call_soon_threadsafe(deltas.put_nowait, delta)),
+            self._ensure_loop()
+        )
+        future.add_done_callback(lambda _: caller_loop.call_soon_threadsafe(deltas.put_nowait, None))
+        try:
+            while True:
+                delta = await deltas.get()
+                if delta is None:
+                    break
+                yield delta
+            completion = future.result()
+        finally:
+            # Also reached when the consumer stops early
+            future.cancel()
+        if key is not None:
+            await asyncio.to_thread(self.cache.set, key, self._to_cache(completion))
+        self._recorded(completion)
+
+    def chat_stream_sync(self, messages: Messages, model: str = DEFAULT_MODEL, max_tokens: int = 800,
+                         temperature: float = 0.7, timeout: Optional[float] = None,
+                         bypass_cache: bool = False) -> Iterator[str]:
+        """Blocking variant of chat_stream(), e.g. for st.write_stream"""
+        key = cache_key(model, messages, temperature, max_tokens) if self.cache is not None else None
+        if key is not None:
+            hit = self.cache.get(key, bypass_cache)
+            if hit is not None:
+                yield self._recorded(self._from_cache(hit)).text
+                return
+
+        deltas: "queue.Queue[Optional[str]]" = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._stream(messages, model, max_tokens, temperature, timeout, deltas.put), self._ensure_loop()
+        )
+        future.add_done_callback(lambda _: deltas.put(None))
+        # Longest silence tolerated between two chunks
+        idle = (timeout if timeout is not None else self.timeout) + LLM_CONNECT_TIMEOUT
+        try:
+            while True:
+                try:
+                    delta = deltas.get(timeout=idle)
+                except queue.Empty:
+                    raise TimeoutError(f"No tokens received for {idle:.0f}s")
+                if delta is None:
+                    break
+                yield delta
+            completion = future.result()
+        finally:
+            future.cancel()
+        if key is not None:
+            self.cache.set(key, self._to_cache(completion))
+        self._recorded(completion)
+
+    async def aclose(self):
+        if self._loop is None:
+            return
+        if self._client is not None:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._client.close(), self._loop))
+            self._client = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    def available(self) -> bool:
+        """False while the circuit breaker refuses calls; callers should use templates"""
+        return not self.breaker.is_open()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url or "https://api.openai.com/v1",
+            "max_concurrency": self.max_concurrency,
+            "max_connections": self.max_connections,
+            "timeout": self.timeout,
+            "in_flight": self.in_flight,
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "retries_total": self.retries_total,
+            "rate_limits": {"requests": self.rpm.stats(), "tokens": self.tpm.stats()},
+            "circuit_breaker": self.breaker.stats(),
+            "coalescing": {"singleflight": self.flights.stats(), "batching": self.batcher.stats()},
+            "cache": self.cache.get_stats() if self.cache is not None else None
+        }
+
+
+_clients: Dict[Tuple[Optional[str], Optional[str]], AsyncLLMClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: Optional[str] = None, base_url: Optional[str] = DEFAULT_BASE_URL) -> AsyncLLMClient:
+    """Process-wide client per (api key, base url), so every caller shares one pool"""
+    key = (api_key or os.getenv("OPENAI_API_KEY"), base_url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = AsyncLLMClient(api_key=key[0], base_url=base_url)
+            _clients[key] = client
+        return client
+
+
+async def close_clients():
+    """Close every shared client's connection pool and event loop (call on shutdown)"""
+    with _clients_lock:
+        clients = list(_clients.values())
+    for client in clients:
+        await client.aclose()
+
+
+def client_stats() -> Dict[str, Dict[str, Any]]:
+    """get_stats() of every shared client, keyed by API key fingerprint and base url"""
+    with _clients_lock:
+        clients = list(_clients.items())
+    return {
+        f"{key_fingerprint(api_key)}@{client.base_url or 'https://api.openai.com/v1'}": client.get_stats()
+        for (api_key, _), client in clients
+    }
@@ -0,0 +1,328 @@
+"""
+Mock LLM Server - local OpenAI-compatible chat completions for offline benchmarks
+Point the stack at it with OPENAI_BASE_URL=http://localhost:8099/v1 (any API key works)
+
+Responses are canned but valid for everything HAILEI asks for: TLO/ELO
+text, KDKA/PRRR JSON, module arrays, batched prompts and field repairs.
+Requests with a JSON schema response_format get an object matching it.
+
+Latency, streaming speed, failure injection and a provider-side RPM limit
+are configurable with MOCK_LLM_* environment variables, command line flags,
+or at runtime with PUT /config.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_CONFIG = {
+    # Time to first token: lognormal with this median and spread (sigma of the underlying normal)
+    "latency_median": float(os.getenv("MOCK_LLM_LATENCY_MEDIAN", "0.8")),
+    "latency_sigma": float(os.getenv("MOCK_LLM_LATENCY_SIGMA", "0.5")),
+    # Generation speed after the first token
+    "tokens_per_second": float(os.getenv("MOCK_LLM_TOKENS_PER_SECOND", "60")),
+    # Probability of answering 429 / 500 instead of a completion
+    "rate_429": float(os.getenv("MOCK_LLM_RATE_429", "0")),
+    "rate_500": float(os.getenv("MOCK_LLM_RATE_500", "0")),
+    "retry_after": float(os.getenv("MOCK_LLM_RETRY_AFTER", "1")),
+    # Provider-side limit; requests beyond it in a 60s window get 429 (0 disables)
+    "rpm_limit": int(os.getenv("MOCK_LLM_RPM_LIMIT", "0")),
+    "seed": os.getenv("MOCK_LLM_SEED")
+}
+
+config: Dict[str, Any] = dict(DEFAULT_CONFIG)
+rng = random.Random(config["seed"])
+recent_requests: Deque[float] = deque()
+stats = {"requests": 0, "completions": 0, "streamed": 0, "injected_429": 0, "injected_500": 0,
+         "rate_limited": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+app = FastAPI(title="Mock LLM Server", description="OpenAI-compatible chat completions with canned content")
+
+
+def count_tokens(text: str) -> int:
+    # Same rough rule as the gateway's estimate: about four characters per token
+    return max(1, len(text) // 4)
+
+
+# ===== CANNED CONTENT =====
+
+OBJECTIVES_TEXT = """TLO: Students will analyze core concepts, evaluate practical applications, and create solutions to real-world problems.
+ELOs:
+• Identify the fundamental principles of the field
+• Explain how key concepts relate to one another
+• Apply core techniques to structured problems
+• Evaluate competing approaches using evidence
+• Create a project that integrates course concepts
+• Communicate findings to a professional audience"""
+
+FRAMEWORKS = {
+    "kdka": {
+        "knowledge": "Core concepts, principles and vocabulary of the field",
+        "delivery": "Interactive lectures, guided workshops and hands-on projects",
+        "context": "Case studies drawn from current industry practice",
+        "assessment": "Projects, quizzes, presentations and peer review"
+    },
+    "prrr": {
+        "personal": "Connections to learners' own goals and experiences",
+        "relatable": "Everyday examples and familiar analogies",
+        "relative": "Each module builds toward the course outcomes",
+        "realworld": "Authentic tasks modelled on professional work"
+    }
+}
+
+MODULE_TITLES = ["Foundations", "Core Concepts", "Methods and Tools", "Practical Applications",
+                 "Analysis and Critical Thinking", "Advanced Topics", "Real-World Cases", "Professional Practice",
+                 "Integration Project", "Emerging Trends", "Capstone Preparation", "Synthesis and Future Directions"]
+
+
+def requested_count(prompt: str, default: int = 3) -> int:
+    match = re.search(r"(?:exactly\s+)?(\d+)\s+(?:weekly\s+|course\s+)?modules", prompt, re.IGNORECASE)
+    return max(1, min(int(match.group(1)), 24)) if match else default
+
+
+def module(index: int) -> Dict[str, str]:
+    title = MODULE_TITLES[index % len(MODULE_TITLES)]
+    return {
+        "title": f"Module {index + 1}: {title}",
+        "objectives": f"Students will master {title.lower()} and apply them in guided practice",
+        "activities": f"Interactive sessions, hands-on exercises and case studies on {title.lower()}",
+        "assessment": f"Formative quiz and practical project on {title.lower()}"
+    }
+
+
+def instance(schema: Dict[str, Any], defs: Dict[str, Any], name: str, prompt: str) -> Any:
+    """Smallest sensible value matching a JSON schema, with canned content where HAILEI expects it"""
+    if "$ref" in schema:
+        ref = schema["$ref"].split("/")[-1]
+        return instance(defs[ref], defs, ref, prompt)
+    if "anyOf" in schema:
+        return instance(schema["anyOf"][0], defs, name, prompt)
+    kind = schema.get("type")
+    if kind == "object":
+        canned = FRAMEWORKS.get(name.lower()) if name.lower() in FRAMEWORKS else None
+        return {
+            key: canned[key] if canned and key in canned else instance(prop, defs, key, prompt)
+            for key, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        if name == "course_modules":
+            return [module(i) for i in range(requested_count(prompt))]
+        if name == "elos":
+            return [line.lstrip("• ") for line in OBJECTIVES_TEXT.splitlines()[2:]]
+        return [instance(schema.get("items", {}), defs, name, prompt) for _ in range(max(schema.get("minItems", 0), 3))]
+    if kind == "integer":
+        return schema.get("minimum", 1)
+    if kind == "number":
+        return float(schema.get("minimum", 1))
+    if kind == "boolean":
+        return True
+    if "enum" in schema:
+        return schema["enum"][0]
+    if name == "tlo":
+        return OBJECTIVES_TEXT.splitlines()[0].replace("TLO: ", "")
+    return f"Generated {name.replace('_', ' ')}"
+
+
+def canned_content(prompt: str, response_format: Optional[Dict[str, Any]]) -> str:
+    if response_format and response_format.get("type") == "json_schema":
+        schema = response_format["json_schema"]["schema"]
+        return json.dumps(instance(schema, schema.get("$defs", {}), response_format["json_schema"].get("name", ""), prompt))
+    if "Problems (path: error):" in prompt:
+        # A field repair (see ipdai_schema.validate_with_repair): fill each listed path
+        lines = prompt.split("Problems (path: error):")[1].splitlines()
+        paths = [json.loads(line.split("]:")[0] + "]") for line in lines if line.startswith("[")]
+        return json.dumps({"fixes": [{"path": path, "value": f"Canned {path[-1]}"} for path in paths]})
+    requests = re.split(r"^### Request \d+\n", prompt, flags=re.MULTILINE)
+    if len(requests) > 1:
+        # A micro-batch from the client (see coalescing.py): answer each request on its own
+        return json.dumps({"answers": [canned_content(request, None) for request in requests[1:]]})
+    if "KDKA" in prompt or "kdka" in prompt:
+        return json.dumps(FRAMEWORKS, indent=2)
+    if "JSON array" in prompt or (re.search(r"modules?\b", prompt, re.IGNORECASE) and "[" in prompt):
+        return json.dumps([module(i) for i in range(requested_count(prompt))], indent=2)
+    if "TLO" in prompt:
+        return OBJECTIVES_TEXT
+    if response_format and response_format.get("type") == "json_object":
+        return "{}"
+    return "This is a canned response from the mock LLM server."
+
+
+# ===== FAILURE AND LATENCY MODELS =====
+
+def injected_failure() -> Optional[JSONResponse]:
+    now = time.monotonic()
+    while recent_requests and now - recent_requests[0] > 60:
+        recent_requests.popleft()
+    if config["rpm_limit"] and len(recent_requests) >= config["rpm_limit"]:
+        stats["rate_limited"] += 1
+        retry = 60 - (now - recent_requests[0])
+        return error_response(429, "Rate limit reached for requests", "requests", retry)
+    recent_requests.append(now)
+    roll = rng.random()
+    if roll < config["rate_429"]:
+        stats["injected_429"] += 1
+        return error_response(429, "Rate limit reached (injected)", "requests", config["retry_after"])
+    if roll < config["rate_429"] + config["rate_500"]:
+        stats["injected_500"] += 1
+        return error_response(500, "The server had an error while processing your request (injected)", "server_error")
+    return None
+
+
+def error_response(status: int, message: str, code: str, retry_after: Optional[float] = None) -> JSONResponse:
+    headers = {"retry-after": f"{retry_after:.2f}"} if retry_after is not None else {}
+    return JSONResponse(
+        {"error": {"message": message, "type": code, "param": None, "code": code}},
+        status_code=status, headers=headers
+    )
+
+
+def first_token_delay() -> float:
+    if config["latency_median"] <= 0:
+        return 0.0
+    return rng.lognormvariate(math.log(config["latency_median"]), config["latency_sigma"])
+
+
+def token_chunks(text: str) -> List[str]:
+    """Split text into roughly token-sized pieces, keeping whitespace attached"""
+    return re.findall(r"\s*\S{1,4}", text) or [text]
+
+
+# ===== ENDPOINTS =====
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    failure = injected_failure()
+    if failure is not None:
+        return failure
+
+    messages = body.get("messages", [])
+    prompt = "\n".join(message.get("content") or "" for message in messages)
+    model = body.get("model", "gpt-3.5-turbo")
+    content = canned_content(messages[-1].get("content", "") if messages else "", body.get("response_format"))
+    chunks = token_chunks(content)
+    max_tokens = body.get("max_tokens")
+    finish_reason = "stop"
+    if max_tokens and len(chunks) > max_tokens:
+        chunks, finish_reason = chunks[:max_tokens], "length"
+    usage = {"prompt_tokens": count_tokens(prompt), "completion_tokens": len(chunks)}
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+    stats["prompt_tokens"] += usage["prompt_tokens"]
+    stats["completion_tokens"] += usage["completion_tokens"]
+    completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    per_token = 1.0 / config["tokens_per_second"] if config["tokens_per_second"] > 0 else 0.0
+
+    await asyncio.sleep(first_token_delay())
+
+    if body.get("stream"):
+        stats["streamed"] += 1
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        def chunk(delta: Dict[str, Any], reason: Optional[str] = None, **extra) -> str:
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                       "choices": [{"index": 0, "delta": delta, "finish_reason": reason}], **extra}
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def stream():
+            yield chunk({"role": "assistant", "content": ""})
+            for piece in chunks:
+                yield chunk({"content": piece})
+                await asyncio.sleep(per_token)
+            yield chunk({}, finish_reason)
+            if include_usage:
+                payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                           "model": model, "choices": [], "usage": usage}
+                yield f"data: {json.dumps(payload)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    # Non-streamed responses arrive once the whole completion is "generated"
+    await asyncio.sleep(per_token * len(chunks))
+    stats["completions"] += 1
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(chunks)},
+            "finish_reason": finish_reason
+        }],
+        "usage": usage
+    }
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [
+        {"id": name, "object": "model", "created": 0, "owned_by": "mock"}
+        for name in ("gpt-3.5-turbo", "gpt-4o-mini", "gpt-4o")
+    ]}
+
+
+@app.get("/config")
+async def get_config():
+    return config
+
+
+@app.put("/config")
+async def update_config(changes: Dict[str, Any]):
+    """Change latency or failure settings between benchmark phases"""
+    unknown = set(changes) - set(DEFAULT_CONFIG)
+    if unknown:
+        return JSONResponse({"error": f"Unknown settings: {sorted(unknown)}"}, status_code=400)
+    config.update(changes)
+    if "seed" in changes:
+        rng.seed(changes["seed"])
+    return config
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+@app.post("/stats/reset")
+async def reset_stats():
+    for key in stats:
+        stats[key] = 0
+    recent_requests.clear()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server for offline HAILEI benchmarks")
+    parser.add_argument("--port", type=int, default=int(os.getenv("MOCK_LLM_PORT", "8099")))
+    for key, value in DEFAULT_CONFIG.items():
+        if key == "seed":
+            parser.add_argument("--seed", default=value)
+        else:
+            parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+    config.update({key: getattr(args, key) for key in DEFAULT_CONFIG})
+    rng.seed(config["seed"])
+
+    print("🧪 Starting Mock LLM Server...")
+    print(f"📍 export OPENAI_BASE_URL=http://localhost:{args.port}/v1")
+    print(f"⚙️  {json.dumps(config)}")
+    uvicorn.run(app, host="0.0.0.0", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
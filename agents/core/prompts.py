@@ -0,0 +1,199 @@
+"""
+HAILEI Prompt Templates - registry of IPDAi prompts built on one shared static prefix
+Every section prompt starts with the same system message and course context, so
+provider-side prefix caching can reuse it across the sections of a course
+"""
+
+import hashlib
+from dataclasses import dataclass
+from string import Formatter
+from typing import Any, Dict, List, Tuple
+
+from rate_limit import estimate_tokens
+
+SYSTEM_PROMPT = (
+    "You are an expert instructional designer specializing in KDKA (Knowledge, Delivery, Context, Assessment) "
+    "and PRRR (Personal, Relatable, Relative, Real-world) pedagogical frameworks. "
+    "Create pedagogically sound, engaging educational content."
+)
+
+# Only fields every section depends on belong in the shared prefix (see IPDAiAPI.SECTION_FIELDS);
+# the rest go into each section's suffix
+COURSE_CONTEXT = """Course: {course_title}
+Description: {course_description}
+Level: {course_level}
+"""
+
+CONTEXT_FIELDS = ("course_title", "course_description", "course_level")
+
+
+def _fields(template: str) -> Tuple[str, ...]:
+    # Parsing also rejects malformed templates (unbalanced braces) at registration
+    return tuple(sorted({name for _, name, _, _ in Formatter().parse(template) if name}))
+
+
+def _literal(template: str) -> str:
+    return "".join(literal for literal, _, _, _ in Formatter().parse(template))
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A section prompt: the shared prefix followed by suffix, compiled at registration"""
+    name: str
+    suffix: str
+    fields: Tuple[str, ...]
+    fingerprint: str
+    static_tokens: int
+
+
+class PromptRegistry:
+    """Named prompt templates, each fingerprinted with its token overhead precomputed"""
+
+    def __init__(self, system: str = SYSTEM_PROMPT, context: str = COURSE_CONTEXT):
+        self.system = system
+        self.context = context
+        self.prefix_fingerprint = hashlib.sha256(f"{system}\n{context}".encode("utf-8")).hexdigest()[:12]
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, name: str, suffix: str) -> PromptTemplate:
+        suffix = suffix.strip() + "\n"
+        fields = _fields(suffix)
+        fingerprint = hashlib.sha256(f"{self.prefix_fingerprint}\n{suffix}".encode("utf-8")).hexdigest()[:12]
+        existing = self._templates.get(name)
+        if existing is not None and existing.fingerprint != fingerprint:
+            raise ValueError(f"Prompt template '{name}' is already registered with different content")
+        # Tokens of everything but the filled-in fields
+        static_tokens = estimate_tokens([
+            {"content": self.system}, {"content": _literal(self.context) + "\n" + _literal(suffix)}
+        ])
+        template = PromptTemplate(name, suffix, fields, fingerprint, static_tokens)
+        self._templates[name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def render(self, name: str, **values: Any) -> str:
+        """User message for template name: course context, then the section suffix
+
+        List values (e.g. goals) are joined with commas. Raises KeyError for
+        an unknown template or a missing field.
+        """
+        template = self._templates[name]
+        values = {key: ", ".join(value) if isinstance(value, (list, tuple)) else value for key, value in values.items()}
+        return self.context.format(**values) + "\n" + template.suffix.format(**values)
+
+    def messages(self, prompt: str) -> List[Dict[str, str]]:
+        """Chat messages for a rendered prompt, led by the shared system message"""
+        return [{"role": "system", "content": self.system}, {"role": "user", "content": prompt}]
+
+    def fingerprints(self) -> Dict[str, str]:
+        return {name: template.fingerprint for name, template in self._templates.items()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "prefix_fingerprint": self.prefix_fingerprint,
+            "prefix_static_tokens": estimate_tokens([{"content": self.system}, {"content": _literal(self.context)}]),
+            "templates": {
+                name: {"fingerprint": template.fingerprint, "static_tokens": template.static_tokens,
+                       "fields": [field for field in template.fields if field not in CONTEXT_FIELDS]}
+                for name, template in self._templates.items()
+            }
+        }
+
+
+registry = PromptRegistry()
+
+registry.register("learning_objectives", """
+Goals: {goals}
+
+Create learning objectives for this course using Bloom's taxonomy:
+1. ONE Terminal Learning Objective (TLO) - overarching outcome
+2. 5-6 Enabling Learning Objectives (ELOs) - specific skills
+
+Requirements:
+- Use Bloom's verbs appropriate for {course_level} level
+- Make objectives measurable and specific
+- Align with the course goals provided
+- Focus on what students will DO/DEMONSTRATE
+
+Format as:
+TLO: [single comprehensive objective]
+ELOs:
+• [objective 1]
+• [objective 2]
+• [etc.]
+""")
+
+registry.register("pedagogical_frameworks", """
+Domain: {course_domain}
+
+Create KDKA and PRRR pedagogical frameworks for this course.
+
+KDKA Model (Knowledge, Delivery, Context, Assessment):
+- Knowledge: What key knowledge will students acquire?
+- Delivery: How will content be delivered effectively?
+- Context: What real-world contexts will connect learning?
+- Assessment: How will learning be measured?
+
+PRRR Model (Personal, Relatable, Relative, Real-world):
+- Personal: How does content connect to student experiences?
+- Relatable: What examples/analogies make content relatable?
+- Relative: How does each element support course outcomes?
+- Real-world: What authentic applications will students engage with?
+
+Return as JSON format:
+{{"kdka": {{"knowledge": "...", "delivery": "...", "context": "...", "assessment": "..."}},
+ "prrr": {{"personal": "...", "relatable": "...", "relative": "...", "realworld": "..."}}}}
+""")
+
+registry.register("course_modules", """
+Goals: {goals}
+
+Create {weeks} course modules for this course with:
+- Progressive learning sequence
+- Clear module titles
+- Specific learning objectives for each module
+- Engaging activities aligned with course level
+- Appropriate assessments
+
+Format as JSON array:
+[
+  {{
+    "title": "Module Title",
+    "objectives": "What students will learn/do in this module",
+    "activities": "Learning activities and exercises",
+    "assessment": "How learning will be assessed"
+  }},
+  ...
+]
+""")
+
+registry.register("course_design", """
+Domain: {course_domain}
+Goals: {goals}
+Duration: {weeks} weeks
+
+Design this course. Return JSON with:
+1. learning_objectives: ONE Terminal Learning Objective (tlo) and 5-6 Enabling Learning Objectives (elos),
+   using Bloom's taxonomy verbs appropriate for {course_level} level
+2. pedagogical_frameworks: KDKA (knowledge, delivery, context, assessment) and
+   PRRR (personal, relatable, relative, realworld)
+3. course_modules: exactly {weeks} weekly modules, each with title, objectives, activities and assessment
+""")
+
+registry.register("revise_objectives", """
+Goals: {goals}
+
+Revise these learning objectives for the course.
+
+Current objectives:
+TLO: {tlo}
+ELOs:
+{elo}
+
+Change only what the description and goals require. Keep the format:
+TLO: [objective]
+ELOs:
+• [objective 1]
+""")
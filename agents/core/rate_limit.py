@@ -0,0 +1,182 @@
+"""
+HAILEI LLM Gateway Controls - provider rate limits, retry backoff and circuit breaking
+Keeps bursts at the provider's RPM/TPM limits instead of turning them into 429 cascades
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+LLM_RPM = float(os.getenv("HAILEI_LLM_RPM", "500"))  # 0 disables the limit
+LLM_TPM = float(os.getenv("HAILEI_LLM_TPM", "200000"))  # 0 disables the limit
+# Longest a call waits for rate-limit capacity before failing fast
+LLM_MAX_QUEUE_WAIT = float(os.getenv("HAILEI_LLM_MAX_QUEUE_WAIT", "30"))
+LLM_BACKOFF_BASE = float(os.getenv("HAILEI_LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("HAILEI_LLM_BACKOFF_MAX", "20"))
+BREAKER_FAILURES = int(os.getenv("HAILEI_LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("HAILEI_LLM_BREAKER_RESET", "30"))
+
+
+class GatewayError(Exception):
+    """An LLM call refused locally, before reaching the provider"""
+
+
+class CircuitOpenError(GatewayError):
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"LLM provider circuit open; retry in {retry_after:.1f}s")
+
+
+class RateLimitExceeded(GatewayError):
+    def __init__(self, wait: float):
+        self.wait = wait
+        super().__init__(f"LLM rate limit would delay this call by {wait:.1f}s")
+
+
+def estimate_tokens(messages: Any) -> int:
+    """Rough prompt size (about four characters per token) for TPM accounting"""
+    return sum(len(message.get("content") or "") for message in messages) // 4 + 4 * len(messages)
+
+
+def backoff_delay(attempt: int, base: float = LLM_BACKOFF_BASE, cap: float = LLM_BACKOFF_MAX) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; callers queue in arrival order
+
+    Lives on the LLM client's event loop. A waiting caller holds the lock while
+    it sleeps, so later callers cannot overtake it.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waits = 0
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float, max_wait: Optional[float] = None) -> float:
+        """Take amount tokens, sleeping until they are available; returns the time waited
+
+        Raises RateLimitExceeded instead of sleeping longer than max_wait.
+        """
+        if not self.enabled:
+            return 0.0
+        amount = min(amount, self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            wait = max(0.0, (amount - self.tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                raise RateLimitExceeded(wait)
+            if wait > 0:
+                self.waits += 1
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= amount
+            return wait
+
+    def refund(self, amount: float):
+        """Return tokens reserved for a call that used fewer than estimated"""
+        if self.enabled and amount > 0:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self):
+        """Empty the bucket, e.g. after the provider answered 429"""
+        if self.enabled:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"per_minute": None}
+        self._refill()
+        return {"per_minute": self.rate * 60, "available": round(self.tokens, 1), "waits": self.waits}
+
+
+class CircuitBreaker:
+    """Stops calling a failing provider: closed -> open after repeated failures,
+    open -> half-open after reset_timeout, half-open -> closed on one successful probe
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, reset_timeout: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def is_open(self) -> bool:
+        """True while calls are being refused (does not take the half-open probe)"""
+        with self._lock:
+            return self.state == "open" and self._retry_after() > 0
+
+    def allow(self):
+        """Admit one call or raise CircuitOpenError; half-open admits a single probe"""
+        with self._lock:
+            if self.state == "open":
+                if self._retry_after() > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self._retry_after())
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open":
+                if self._probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(0.0)
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opens += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """Give back a half-open probe that ended without a verdict (e.g. cancelled)"""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "opens": self.opens,
+                "rejected": self.rejected,
+                "retry_after": round(self._retry_after(), 1) if self.state == "open" else 0.0
+            }
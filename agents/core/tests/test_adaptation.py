@@ -0,0 +1,54 @@
+from adaptation import retitle, stale_sections, text_similarity
+
+SECTION_FIELDS = {
+    "learning_objectives": ("course_title", "course_description", "course_level", "goals"),
+    "pedagogical_frameworks": ("course_title", "course_description", "course_level", "course_domain"),
+    "course_modules": ("course_title", "course_description", "course_level", "weeks", "goals"),
+}
+
+COURSE = {
+    "course_title": "Intro to AI",
+    "course_description": "AI for everyone",
+    "course_level": "Introductory",
+    "course_domain": "CS",
+    "goals": ["a", "b"],
+    "weeks": 4,
+}
+
+
+def test_retitle_replaces_the_title_as_written_and_lower_cased():
+    section = {"tlo": "Master Intro to AI", "modules": [{"title": "intro to ai basics", "week": 1}]}
+
+    assert retitle(section, "Intro to AI", "Applied AI") == {
+        "tlo": "Master Applied AI", "modules": [{"title": "applied ai basics", "week": 1}]
+    }
+
+
+def test_retitle_always_returns_a_copy():
+    section = {"modules": [{"title": "Intro to AI"}]}
+    copied = retitle(section, "Intro to AI", "Intro to AI")
+    copied["modules"][0]["title"] = "changed"
+
+    assert section == {"modules": [{"title": "Intro to AI"}]}
+
+
+def test_title_only_change_leaves_every_section_reusable():
+    assert stale_sections(SECTION_FIELDS, COURSE, {**COURSE, "course_title": "Introduction to AI"}) == []
+
+
+def test_changed_fields_mark_the_sections_that_read_them():
+    assert stale_sections(SECTION_FIELDS, COURSE, {**COURSE, "goals": ["a", "c"]}) == [
+        "learning_objectives", "course_modules"
+    ]
+    assert stale_sections(SECTION_FIELDS, COURSE, {**COURSE, "course_domain": "Math"}) == ["pedagogical_frameworks"]
+    assert stale_sections(SECTION_FIELDS, COURSE, {**COURSE, "course_description": "AI for managers"}) == list(
+        SECTION_FIELDS
+    )
+
+
+def test_reworded_description_is_not_a_change():
+    reworded = {**COURSE, "course_description": "AI, for everyone!"}
+
+    assert text_similarity(COURSE["course_description"], reworded["course_description"]) == 1.0
+    assert stale_sections(SECTION_FIELDS, COURSE, reworded) == []
+    assert stale_sections(SECTION_FIELDS, COURSE, reworded, description_threshold=1.01) == list(SECTION_FIELDS)
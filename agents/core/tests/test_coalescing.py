@@ -0,0 +1,96 @@
+import asyncio
+from concurrent.futures import Future
+
+from coalescing import MicroBatcher, SingleFlight, share, split_batch
+
+SYSTEM = {"role": "system", "content": "You are an instructional designer"}
+
+
+def starter(started):
+    def start():
+        future = Future()
+        started.append(future)
+        return future
+    return start
+
+
+def test_identical_calls_share_one_in_flight_future():
+    flights = SingleFlight()
+    started = []
+
+    first, leader = flights.do("prompt", starter(started))
+    second, follower = flights.do("prompt", starter(started))
+    other, _ = flights.do("other prompt", starter(started))
+
+    assert second is first and other is not first
+    assert (leader, follower) == (True, False)
+    assert len(started) == 2
+    assert flights.stats() == {"in_flight": 2, "calls": 2, "shared": 1}
+
+    first.set_result("done")
+    again, leader = flights.do("prompt", starter(started))
+    assert again is not first and leader
+
+
+def test_call_is_cancelled_only_after_every_waiter_abandons():
+    flights = SingleFlight()
+    future, _ = flights.do("prompt", starter([]))
+    for _ in range(2):
+        flights.do("prompt", starter([]))
+
+    flights.abandon("prompt", future)
+    flights.abandon("prompt", future)
+    assert not future.cancelled()
+    assert flights.stats()["in_flight"] == 1
+
+    flights.abandon("prompt", future)
+    assert future.cancelled()
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_abandoning_a_replaced_call_leaves_the_new_one_running():
+    flights = SingleFlight()
+    old, _ = flights.do("prompt", starter([]))
+    old.set_result("done")
+    new, _ = flights.do("prompt", starter([]))
+
+    flights.abandon("prompt", old)
+
+    assert not new.cancelled()
+    assert flights.stats()["in_flight"] == 1
+
+
+def test_batcher_groups_compatible_prompts_by_window_and_size():
+    async def scenario():
+        groups = []
+
+        async def run_group(key, group):
+            groups.append([pending.messages[1]["content"] for pending in group])
+            for pending in group:
+                pending.future.set_result(pending.messages[1]["content"].upper())
+
+        batcher = MicroBatcher(run_group, window=0.02, max_size=3)
+
+        def ask(text, system=SYSTEM):
+            return batcher.submit([system, {"role": "user", "content": text}], "model", 100, 0.7, None)
+
+        other_system = {"role": "system", "content": "Something else"}
+        answers = await asyncio.gather(ask("a"), ask("b"), ask("c"), ask("d"), ask("e", other_system))
+        return answers, groups, batcher
+
+    answers, groups, batcher = asyncio.run(scenario())
+
+    assert answers == ["A", "B", "C", "D", "E"]
+    # The first group closes at max_size; the rest close when the window ends
+    assert sorted(groups) == [["a", "b", "c"], ["d"], ["e"]]
+    assert batcher.accepts([SYSTEM, {"role": "user", "content": "x"}], 100, None)
+    assert not batcher.accepts([SYSTEM, {"role": "user", "content": "x"}], 100, {"type": "json_object"})
+    assert not MicroBatcher(None, window=0).accepts([SYSTEM, {"role": "user", "content": "x"}], 100, None)
+
+
+def test_batched_answers_split_back_per_request():
+    assert split_batch('{"answers": ["one", {"two": 2}]}', 2) == ["one", '{"two": 2}']
+    assert split_batch('{"answers": ["one"]}', 2) is None
+    assert split_batch("not json", 1) is None
+    assert share(10, [1, 1, 1]) == [3, 3, 4]
+    assert share(7, [0, 0]) == [3, 4]
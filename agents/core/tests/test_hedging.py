@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from hedging import HEDGE_MIN_SAMPLES, HedgedCaller, hedge_budget, is_hedge_copy
+
+
+def warmed_caller():
+    """An enabled caller whose hedge delay is 10ms"""
+    caller = HedgedCaller(percentile=95, enabled=True, max_workers=4)
+    for _ in range(HEDGE_MIN_SAMPLES):
+        caller.history.record(0.01)
+    return caller
+
+
+def slow_original(seconds=0.3, hedge_result="hedge", hedge_error=None):
+    """The original copy is slow, the duplicate answers at once"""
+    def func():
+        if is_hedge_copy():
+            if hedge_error is not None:
+                raise hedge_error
+            return hedge_result
+        time.sleep(seconds)
+        return "original"
+    return func
+
+
+class Slots:
+    """acquire_slot/release_slot pair counting releases"""
+
+    def __init__(self, free=1):
+        self.semaphore = threading.Semaphore(free)
+        self.released = 0
+
+    def acquire(self):
+        return self.semaphore.acquire(blocking=False)
+
+    def release(self):
+        self.released += 1
+        self.semaphore.release()
+
+
+def test_hedge_slot_is_held_until_the_losing_copy_finishes():
+    caller = warmed_caller()
+    slots = Slots()
+
+    with hedge_budget(1) as budget:
+        started = time.perf_counter()
+        result = caller.call(slow_original(), slots.acquire, slots.release)
+        elapsed = time.perf_counter() - started
+
+    assert result == "hedge" and elapsed < 0.2
+    assert budget.used == 1
+    # The original is still running, so the duplicate's slot is still taken
+    assert slots.released == 0
+    time.sleep(0.35)
+    assert slots.released == 1
+    assert caller.get_stats()["hedges_fired"] == 1 and caller.get_stats()["hedges_won"] == 1
+
+
+def test_no_free_slot_or_no_budget_means_no_hedge():
+    caller = warmed_caller()
+    busy = Slots(free=0)
+    with hedge_budget(1) as budget:
+        assert caller.call(slow_original(0.05), busy.acquire, busy.release) == "original"
+    assert budget.used == 0
+
+    slots = Slots()
+    with hedge_budget(0):
+        assert caller.call(slow_original(0.05), slots.acquire, slots.release) == "original"
+    # A slot taken without budget to spend is handed straight back
+    assert slots.released == 1
+    assert caller.get_stats()["hedges_fired"] == 0
+
+
+def test_calls_outside_a_run_are_never_hedged():
+    caller = warmed_caller()
+    slots = Slots()
+
+    assert caller.call(slow_original(0.05), slots.acquire, slots.release) == "original"
+    assert caller.get_stats()["hedges_fired"] == 0 and slots.released == 0
+
+
+def test_a_failed_copy_falls_back_to_the_other():
+    caller = warmed_caller()
+    slots = Slots()
+
+    with hedge_budget(1):
+        result = caller.call(slow_original(0.1, hedge_error=RuntimeError("boom")), slots.acquire, slots.release)
+
+    assert result == "original"
+    time.sleep(0.05)  # done callbacks run just after the result is set
+    assert slots.released == 1
+    assert caller.get_stats()["hedges_won"] == 0
+
+
+def test_disabled_or_cold_caller_has_no_hedge_delay():
+    assert HedgedCaller(enabled=False).hedge_delay() is None
+    assert HedgedCaller(enabled=True).hedge_delay() is None
+    assert warmed_caller().hedge_delay() == pytest.approx(0.01)
@@ -0,0 +1,92 @@
+import json
+
+from ipdai_schema import FRAMEWORKS, MODULES, apply_fixes, repair_prompt, validate_with_repair
+
+FRAMEWORKS_DATA = {
+    "kdka": {"knowledge": "k", "delivery": "d", "context": "c", "assessment": "a"},
+    "prrr": {"personal": "p", "relatable": "r", "relative": "r", "realworld": "w"},
+}
+
+
+class FakeLLM:
+    """complete(prompt, max_tokens) returning canned replies and recording the prompts"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    def __call__(self, prompt, max_tokens):
+        self.prompts.append(prompt)
+        return self.replies.pop(0) if self.replies else None
+
+
+def test_valid_data_needs_no_llm_call():
+    llm = FakeLLM()
+    frameworks = validate_with_repair(FRAMEWORKS, FRAMEWORKS_DATA, llm)
+
+    assert frameworks.to_section() == FRAMEWORKS_DATA
+    assert llm.prompts == []
+
+
+def test_unknown_keys_are_dropped_without_asking():
+    data = {**FRAMEWORKS_DATA, "notes": "extra", "kdka": {**FRAMEWORKS_DATA["kdka"], "score": 5}}
+    llm = FakeLLM()
+
+    assert validate_with_repair(FRAMEWORKS, data, llm).to_section() == FRAMEWORKS_DATA
+    assert llm.prompts == []
+
+
+def test_only_invalid_fields_are_requested_and_patched():
+    data = {"kdka": {"knowledge": "k", "delivery": 3, "context": "c", "assessment": "a"},
+            "prrr": {"personal": "p", "relatable": "r", "relative": "r"}}
+    llm = FakeLLM(json.dumps({"fixes": [
+        {"path": ["kdka", "delivery"], "value": "Workshops"},
+        {"path": ["prrr", "realworld"], "value": "Internships"},
+        {"path": ["kdka", "knowledge"], "value": "not asked for"},
+    ]}))
+    frameworks = validate_with_repair(FRAMEWORKS, data, llm)
+
+    assert frameworks.kdka.delivery == "Workshops"
+    assert frameworks.prrr.realworld == "Internships"
+    assert frameworks.kdka.knowledge == "k"
+    assert len(llm.prompts) == 1
+    assert '["kdka", "delivery"]' in llm.prompts[0] and '["prrr", "realworld"]' in llm.prompts[0]
+    # The caller's data is left untouched
+    assert data["kdka"]["delivery"] == 3
+
+
+def test_repairs_stop_after_the_attempt_limit():
+    data = [{"title": "M1", "objectives": "o", "activities": "a"}]
+    useless = json.dumps({"fixes": [{"path": [0, "assessment"], "value": None}]})
+    llm = FakeLLM(useless, useless, useless)
+
+    assert validate_with_repair(MODULES, data, llm, attempts=2) is None
+    assert len(llm.prompts) == 2
+
+
+def test_wrong_shape_or_failed_repair_gives_none():
+    assert validate_with_repair(MODULES, {"not": "a list"}, FakeLLM()) is None
+    assert validate_with_repair(FRAMEWORKS, None, FakeLLM()) is None
+    assert validate_with_repair(FRAMEWORKS, {"kdka": FRAMEWORKS_DATA["kdka"]}, FakeLLM(None)) is None
+    assert validate_with_repair(FRAMEWORKS, {"kdka": FRAMEWORKS_DATA["kdka"]}, FakeLLM("not json")) is None
+
+
+def test_apply_fixes_ignores_paths_it_was_not_asked_for():
+    data = [{"title": "a"}, {"title": "b"}]
+    fixes = [
+        {"path": [1, "title"], "value": "B"},
+        {"path": [0, "title"], "value": "A"},
+        {"path": [5, "title"], "value": "out of range"},
+        "not a fix",
+    ]
+
+    assert apply_fixes(data, fixes, [(1, "title"), (5, "title")]) == 1
+    assert data == [{"title": "a"}, {"title": "B"}]
+
+
+def test_repair_prompt_shows_the_enclosing_objects():
+    data = [{"title": "M1", "objectives": 7}]
+    prompt = repair_prompt(data, [{"loc": (0, "objectives"), "msg": "Input should be a valid string"}])
+
+    assert 'At [0]: {"title": "M1", "objectives": 7}' in prompt
+    assert '[0, "objectives"]: Input should be a valid string' in prompt
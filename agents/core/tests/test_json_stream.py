@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from json_stream import JSONStreamParser, iter_items, parse_json
+
+MODULES = [
+    {"title": "Foundations", "objectives": "Define \"core\" terms", "weeks": 1},
+    {"title": "Practice, [part 2]", "objectives": "Apply {braces} safely", "weeks": 2},
+    {"title": "Capstone", "objectives": "Build", "weeks": 3},
+]
+
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_root_array_items_are_emitted_as_they_close(size):
+    text = "Here are the modules:\n```json\n" + json.dumps(MODULES, indent=2) + "\n```\nEnjoy!"
+    parser = JSONStreamParser("[")
+    emitted = []
+    for chunk in chunks(text, size):
+        emitted.append(parser.feed(chunk))
+
+    assert [item for batch in emitted for item in batch] == MODULES
+    assert parser.items_emitted == 3
+    assert parser.done
+    assert parser.close() == MODULES
+
+
+def test_an_item_is_emitted_by_the_chunk_that_closes_it():
+    parser = JSONStreamParser("[")
+
+    assert parser.feed('[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(': 2}') == [{"b": 2}]
+    assert parser.feed(', 3, "x"]') == [3, "x"]
+
+
+def test_items_under_a_key_of_a_root_object():
+    design = {"learning_objectives": {"tlo": "t", "elos": ["a"]}, "course_modules": MODULES}
+    items = list(iter_items(chunks(json.dumps(design), 5), root="{", items_key="course_modules"))
+
+    assert items == MODULES
+
+
+def test_truncated_string_value_is_closed():
+    assert parse_json('{"tlo": "Students will analyze', "{") == {"tlo": "Students will analyze"}
+
+
+def test_truncated_key_and_scalar_are_dropped():
+    assert parse_json('{"kdka": {"knowledge": "k"}, "prr', "{") == {"kdka": {"knowledge": "k"}}
+    assert parse_json('[{"weeks": 1}, {"weeks": 1', "[") == [{"weeks": 1}, {"weeks": 1}]
+    assert parse_json('{"a": 1, "b": tr', "{") == {"a": 1}
+
+
+def test_truncation_after_an_escape_is_repaired():
+    assert parse_json('{"t": "say \\"hi\\', "{") == {"t": 'say "hi'}
+
+
+def test_text_after_the_value_is_ignored():
+    assert parse_json('{"a": [1, 2]} and then {"b": 3}', "{") == {"a": [1, 2]}
+
+
+def test_nothing_usable():
+    assert parse_json(None) is None
+    assert parse_json("") is None
+    assert parse_json("no json here") is None
+    assert JSONStreamParser("[").close() is None
+
+
+def test_root_must_be_a_bracket():
+    with pytest.raises(ValueError):
+        JSONStreamParser("x")
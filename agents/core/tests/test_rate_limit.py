@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+
+from rate_limit import CircuitBreaker, CircuitOpenError, RateLimitExceeded, TokenBucket, backoff_delay
+
+
+def test_bucket_serves_its_burst_then_waits_for_refill():
+    async def scenario():
+        bucket = TokenBucket(per_minute=600, burst=2)  # 10 tokens a second
+        waits = [await bucket.acquire(1) for _ in range(3)]
+        return bucket, waits
+
+    bucket, waits = asyncio.run(scenario())
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.1, abs=0.02)
+    assert bucket.waits == 1
+
+
+def test_bucket_fails_fast_past_max_wait():
+    async def scenario():
+        bucket = TokenBucket(per_minute=60, burst=1)
+        await bucket.acquire(1)
+        started = time.perf_counter()
+        with pytest.raises(RateLimitExceeded) as error:
+            await bucket.acquire(1, max_wait=0.5)
+        return error.value, time.perf_counter() - started
+
+    error, elapsed = asyncio.run(scenario())
+
+    assert error.wait == pytest.approx(1.0, abs=0.05)
+    assert elapsed < 0.1
+
+
+def test_bucket_refund_drain_and_disabled():
+    bucket = TokenBucket(per_minute=60, burst=10)
+    bucket.tokens = 2
+    bucket.refund(5)
+    assert bucket.tokens == pytest.approx(7, abs=0.1)
+    bucket.refund(100)
+    assert bucket.tokens == 10
+    bucket.drain()
+    assert bucket.tokens <= 0.1
+
+    disabled = TokenBucket(per_minute=0)
+    assert not disabled.enabled
+    assert asyncio.run(disabled.acquire(10 ** 6)) == 0.0
+    assert disabled.stats() == {"per_minute": None}
+
+
+def test_waiting_callers_are_served_in_arrival_order():
+    async def scenario():
+        bucket = TokenBucket(per_minute=1200, burst=1)  # 20 tokens a second
+        order = []
+
+        async def caller(name, amount):
+            await bucket.acquire(amount)
+            order.append(name)
+
+        await bucket.acquire(1)
+        await asyncio.gather(caller("big", 1), caller("small", 0.1))
+        return order
+
+    assert asyncio.run(scenario()) == ["big", "small"]
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.allow()
+        breaker.record_failure()
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.failures == 0
+
+    for _ in range(3):
+        breaker.allow()
+        breaker.record_failure()
+
+    assert breaker.state == "open" and breaker.is_open()
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.allow()
+    assert 59 < error.value.retry_after <= 60
+    assert breaker.stats()["opens"] == 1 and breaker.stats()["rejected"] == 1
+
+
+def test_half_open_admits_one_probe_and_closes_on_success():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    assert not breaker.is_open()
+    breaker.allow()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.allow()
+
+
+def test_failed_probe_reopens_and_released_probe_can_be_retried():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.05)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.06)
+
+    breaker.allow()
+    breaker.release()
+    breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert breaker.stats()["opens"] == 2
+
+
+def test_backoff_is_full_jitter_up_to_the_cap():
+    delays = [backoff_delay(attempt, base=0.5, cap=4) for attempt in range(8) for _ in range(20)]
+
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert all(backoff_delay(0, base=0.5, cap=4) <= 0.5 for _ in range(50))
@@ -0,0 +1,144 @@
+"""
+HAILEI LLM Usage Accounting - tokens, estimated cost and latency of every LLM call
+Rolled up per agent and API key process-wide, and per run through a scoped meter
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+# USD per 1K tokens; override or extend with HAILEI_MODEL_PRICING='{"model": {"prompt": x, "completion": y}}'
+MODEL_PRICING = {
+    "gpt-3.5-turbo": {"prompt": 0.0005, "completion": 0.0015},
+    "gpt-4o-mini": {"prompt": 0.00015, "completion": 0.0006},
+    "gpt-4o": {"prompt": 0.0025, "completion": 0.01},
+    **json.loads(os.getenv("HAILEI_MODEL_PRICING", "{}"))
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    # Dated snapshots ("gpt-4o-2024-08-06") are priced as their base model
+    pricing = MODEL_PRICING.get(model) or next(
+        (price for name, price in MODEL_PRICING.items() if model.startswith(name)), None
+    )
+    if pricing is None:
+        return 0.0
+    return (prompt_tokens * pricing["prompt"] + completion_tokens * pricing["completion"]) / 1000
+
+
+def key_fingerprint(api_key: Optional[str]) -> str:
+    """Stable, non-reversible label for an API key"""
+    if not api_key:
+        return "none"
+    return "key-" + hashlib.sha256(api_key.encode()).hexdigest()[:8]
+
+
+@dataclass
+class Usage:
+    """Accumulated usage of a set of LLM calls"""
+    calls: int = 0
+    cached_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    latency: float = 0.0
+
+    def add(self, prompt_tokens: int, completion_tokens: int, cost: float, latency: float, cached: bool):
+        self.calls += 1
+        if cached:
+            # Served from the response cache: nothing was billed
+            self.cached_calls += 1
+            return
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost += cost
+        self.latency += latency
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "cached_calls": self.cached_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "estimated_cost_usd": round(self.cost, 6),
+            "llm_time": f"{self.latency:.3f}s"
+        }
+
+
+class UsageMeter:
+    """Usage of one agent run; shared by the threads working on that run"""
+
+    def __init__(self, agent: str):
+        self.agent = agent
+        self.usage = Usage()
+        self.by_model: Dict[str, Usage] = {}
+        self._lock = threading.Lock()
+
+    def add(self, model: str, prompt_tokens: int, completion_tokens: int, cost: float, latency: float, cached: bool):
+        with self._lock:
+            self.usage.add(prompt_tokens, completion_tokens, cost, latency, cached)
+            self.by_model.setdefault(model, Usage()).add(prompt_tokens, completion_tokens, cost, latency, cached)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.usage.to_dict(), "models": {model: usage.to_dict() for model, usage in self.by_model.items()}}
+
+
+class UsageLedger:
+    """Process-wide usage totals per agent and per API key"""
+
+    def __init__(self):
+        self.total = Usage()
+        self.by_agent: Dict[str, Usage] = {}
+        self.by_api_key: Dict[str, Usage] = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, api_key: str, prompt_tokens: int, completion_tokens: int,
+               cost: float, latency: float, cached: bool):
+        with self._lock:
+            for usage in (self.total, self.by_agent.setdefault(agent, Usage()),
+                          self.by_api_key.setdefault(api_key, Usage())):
+                usage.add(prompt_tokens, completion_tokens, cost, latency, cached)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total": self.total.to_dict(),
+                "agents": {agent: usage.to_dict() for agent, usage in self.by_agent.items()},
+                "api_keys": {key: usage.to_dict() for key, usage in self.by_api_key.items()}
+            }
+
+
+ledger = UsageLedger()
+
+_meter: contextvars.ContextVar[Optional[UsageMeter]] = contextvars.ContextVar("usage_meter", default=None)
+
+
+@contextmanager
+def usage_scope(agent: str) -> Iterator[UsageMeter]:
+    """Meter the LLM calls made inside the block (and threads started with its context)"""
+    meter = UsageMeter(agent)
+    token = _meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _meter.reset(token)
+
+
+def record_completion(completion: Any, api_key: Optional[str]):
+    """Account one completion against the current run meter and the ledger"""
+    cost = estimate_cost(completion.model, completion.prompt_tokens, completion.completion_tokens)
+    meter = _meter.get()
+    if meter is not None:
+        meter.add(completion.model, completion.prompt_tokens, completion.completion_tokens,
+                  cost, completion.latency, completion.cached)
+    ledger.record(
+        meter.agent if meter is not None else "unscoped", key_fingerprint(api_key),
+        completion.prompt_tokens, completion.completion_tokens, cost, completion.latency, completion.cached
+    )
@@ -0,0 +1,103 @@
+"""
+HAILEI Admission Control - bounds admitted workflow work and sheds the excess
+Saturated requests get 429 with a Retry-After estimate instead of all slowing down together
+"""
+
+import math
+import os
+import time
+from typing import Any, Callable, Dict
+
+DEFAULT_MAX_QUEUED = int(os.getenv("HAILEI_MAX_QUEUED", "32"))
+
+
+class AdmissionRejected(Exception):
+    """Raised when the server is saturated; retry_after is in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Admits at most max_in_flight running plus max_queued waiting units of work
+
+    Admitted work still waits for a scheduler slot; this only decides whether
+    a request gets in at all. Retry-After is estimated from a moving average
+    of recent workflow durations and the current backlog.
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int = DEFAULT_MAX_QUEUED,
+                 smoothing: float = 0.2):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queued = max(0, max_queued)
+        self.smoothing = smoothing
+        self.admitted = 0
+        self.avg_duration = 1.0
+        self.accepted_total = 0
+        self.rejected_total = 0
+
+    @property
+    def limit(self) -> int:
+        return self.max_in_flight + self.max_queued
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.admitted - self.max_in_flight)
+
+    @property
+    def saturated(self) -> bool:
+        return self.admitted >= self.limit
+
+    def retry_after(self) -> int:
+        """Seconds until enough backlog drains for one more unit to be admitted"""
+        waves = (self.queue_depth + 1) / self.max_in_flight
+        return max(1, math.ceil(waves * self.avg_duration))
+
+    def acquire(self, units: int = 1) -> float:
+        """Admit units of work or raise AdmissionRejected; returns the admission time"""
+        units = min(max(1, units), self.limit)
+        if self.admitted + units > self.limit:
+            self.rejected_total += 1
+            raise AdmissionRejected(
+                f"Server at capacity ({self.admitted} workflows admitted, limit {self.limit})",
+                self.retry_after()
+            )
+        self.admitted += units
+        self.accepted_total += 1
+        return time.perf_counter()
+
+    def release(self, admitted_at: float, units: int = 1):
+        units = min(max(1, units), self.limit)
+        self.admitted = max(0, self.admitted - units)
+        if units == 1:
+            duration = time.perf_counter() - admitted_at
+            self.avg_duration = (1 - self.smoothing) * self.avg_duration + self.smoothing * duration
+
+    def release_once(self, admitted_at: float, units: int = 1) -> Callable[[], None]:
+        """Release callback that only releases on its first call
+
+        A streamed response calls it from both its body and its background
+        task: the body's finally never runs if the client disconnects before
+        the first chunk, so the background task is what guarantees the release.
+        """
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.release(admitted_at, units)
+        return release
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "admitted": self.admitted,
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued,
+            "queue_depth": self.queue_depth,
+            "saturated": self.saturated,
+            "avg_workflow_duration": f"{self.avg_duration:.2f}s",
+            "accepted_total": self.accepted_total,
+            "rejected_total": self.rejected_total
+        }
@@ -0,0 +1,158 @@
+"""
+HAILEI Checkpoint Store - durable per-stage workflow outputs in SQLite
+A failed run can resume from the last completed agent instead of starting over
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Relative paths resolve against the server's working directory
+DEFAULT_CHECKPOINT_DB = os.getenv("HAILEI_CHECKPOINT_DB", "hailei_checkpoints.db")
+# Runs are kept for CHECKPOINT_TTL_HOURS and at most CHECKPOINT_MAX_RUNS are kept (0 disables either)
+CHECKPOINT_TTL_HOURS = float(os.getenv("HAILEI_CHECKPOINT_TTL_HOURS", "168"))
+CHECKPOINT_MAX_RUNS = int(os.getenv("HAILEI_CHECKPOINT_MAX_RUNS", "1000"))
+# Retention is enforced once every this many started runs
+PRUNE_INTERVAL = 50
+
+
+class CheckpointStore:
+    """Stores workflow run inputs and stage outputs keyed by run id and input hash
+
+    Calls block on SQLite; async callers run them in a worker thread. Runs
+    older than ttl_hours, and all but the max_runs most recent, are pruned
+    together with their stage outputs.
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_DB, ttl_hours: float = CHECKPOINT_TTL_HOURS,
+                 max_runs: int = CHECKPOINT_MAX_RUNS):
+        self.path = path
+        self.ttl_hours = ttl_hours
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        self._starts = 0
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    input TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS stage_checkpoints (
+                    run_id TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    input_hash TEXT NOT NULL,
+                    output TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (run_id, stage, input_hash)
+                );
+                CREATE INDEX IF NOT EXISTS runs_updated_at ON runs (updated_at);
+            """)
+        self.prune()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def start_run(self, run_id: str, input_data: Dict[str, Any]):
+        now = datetime.now().isoformat()
+        self._starts += 1
+        if self._starts % PRUNE_INTERVAL == 0:
+            self.prune()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, input, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (run_id, json.dumps(input_data), "running", now, now)
+            )
+            conn.execute(
+                "UPDATE runs SET status = 'running', error = NULL, updated_at = ? WHERE run_id = ?",
+                (now, run_id)
+            )
+
+    def finish_run(self, run_id: str, status: str, error: Optional[str] = None):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE runs SET status = ?, error = ?, updated_at = ? WHERE run_id = ?",
+                (status, error, datetime.now().isoformat(), run_id)
+            )
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT input, status, error, created_at, updated_at FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            stages = [
+                stage for (stage,) in conn.execute(
+                    "SELECT stage FROM stage_checkpoints WHERE run_id = ? ORDER BY created_at", (run_id,)
+                )
+            ]
+        return {
+            "run_id": run_id,
+            "input": json.loads(row[0]),
+            "status": row[1],
+            "error": row[2],
+            "created_at": row[3],
+            "updated_at": row[4],
+            "completed_stages": stages
+        }
+
+    def completed_runs(self, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+        """(run_id, input) of the most recent completed runs, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT run_id, input FROM runs WHERE status = 'completed' ORDER BY updated_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [(run_id, json.loads(input_data)) for run_id, input_data in reversed(rows)]
+
+    def load(self, run_id: str, stage: str, input_hash: str) -> Optional[Any]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT output FROM stage_checkpoints WHERE run_id = ? AND stage = ? AND input_hash = ?",
+                (run_id, stage, input_hash)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_outputs(self, run_id: str) -> Dict[str, Any]:
+        """Most recent checkpointed output of every stage in a run"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT stage, output FROM stage_checkpoints WHERE run_id = ? ORDER BY created_at", (run_id,)
+            ).fetchall()
+        return {stage: json.loads(output) for stage, output in rows}
+
+    def save(self, run_id: str, stage: str, input_hash: str, output: Any):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO stage_checkpoints (run_id, stage, input_hash, output, created_at) VALUES (?, ?, ?, ?, ?)",
+                (run_id, stage, input_hash, json.dumps(output), datetime.now().isoformat())
+            )
+
+    def prune(self) -> int:
+        """Delete expired runs and runs beyond the row cap; returns how many were removed"""
+        with self._lock, self._connect() as conn:
+            removed = 0
+            if self.ttl_hours > 0:
+                cutoff = (datetime.now() - timedelta(hours=self.ttl_hours)).isoformat()
+                removed += conn.execute("DELETE FROM runs WHERE updated_at < ?", (cutoff,)).rowcount
+            if self.max_runs > 0:
+                removed += conn.execute(
+                    "DELETE FROM runs WHERE run_id NOT IN (SELECT run_id FROM runs ORDER BY updated_at DESC LIMIT ?)",
+                    (self.max_runs,)
+                ).rowcount
+            if removed:
+                conn.execute("DELETE FROM stage_checkpoints WHERE run_id NOT IN (SELECT run_id FROM runs)")
+        return removed
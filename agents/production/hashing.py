@@ -0,0 +1,40 @@
+"""
+Canonical hashing for workflow payloads
+Produces the same digest for equal data regardless of key order or formatting
+"""
+
+import hashlib
+import json
+from typing import Any
+
+
+def canonical_json(data: Any) -> str:
+    """Serialize data with sorted keys and no insignificant whitespace"""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def canonical_hash(data: Any) -> str:
+    """SHA-256 hex digest of the canonical JSON form of data"""
+    return hashlib.sha256(canonical_json(data).encode("utf-8")).hexdigest()
+
+
+# Metadata keys that change on every run without changing the content
+VOLATILE_METADATA_KEYS = ("generated_date", "source_data_date", "approval_date", "processing_time", "usage")
+
+
+def strip_volatile(data: Any) -> Any:
+    """Copy of data without volatile metadata keys, at any depth"""
+    if isinstance(data, dict):
+        return {
+            key: strip_volatile(value)
+            for key, value in data.items()
+            if key not in VOLATILE_METADATA_KEYS
+        }
+    if isinstance(data, (list, tuple)):
+        return [strip_volatile(item) for item in data]
+    return data
+
+
+def stable_hash(data: Any) -> str:
+    """Canonical hash that ignores volatile metadata such as generated_date"""
+    return canonical_hash(strip_volatile(data))
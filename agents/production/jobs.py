@@ -0,0 +1,176 @@
+"""
+HAILEI Job Manager - asynchronous workflow jobs on a bounded in-process worker pool
+Lets n8n submit a course and poll for the result instead of holding a connection open
+"""
+
+import asyncio
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+DEFAULT_JOB_WORKERS = int(os.getenv("HAILEI_JOB_WORKERS", "2"))
+DEFAULT_JOB_QUEUE_SIZE = int(os.getenv("HAILEI_JOB_QUEUE_SIZE", "100"))
+DEFAULT_JOBS_RETAINED = int(os.getenv("HAILEI_JOBS_RETAINED", "500"))
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue cannot accept more work; retry_after is in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class Job:
+    """A queued or running workflow execution"""
+    id: str
+    payload: Dict[str, Any]
+    tenant: str = "default"
+    priority: str = "bulk"
+    status: str = "queued"
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    partial_results: Dict[str, Any] = field(default_factory=dict)
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "tenant": self.tenant,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "agents_completed": list(self.partial_results),
+            "partial_results": self.partial_results,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+JobRunner = Callable[[Job], Awaitable[Any]]
+
+
+class JobManager:
+    """Queues jobs and executes them on a fixed number of worker tasks
+
+    Retry-After for a full queue is estimated from the queue depth, the
+    worker count and a moving average of recent job durations.
+    """
+
+    def __init__(self, runner: JobRunner, workers: int = DEFAULT_JOB_WORKERS,
+                 max_queued: int = DEFAULT_JOB_QUEUE_SIZE, max_retained: int = DEFAULT_JOBS_RETAINED,
+                 smoothing: float = 0.2):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.max_retained = max_retained
+        self.smoothing = smoothing
+        self.avg_duration = 1.0
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks = []
+
+    def _ensure_workers(self):
+        # Workers start lazily so they bind to the server's running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+            self._worker_tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job.status == "cancelled":
+                # Cancelled while still queued
+                self._queue.task_done()
+                continue
+            started = time.perf_counter()
+            try:
+                job.status = "running"
+                job.started_at = datetime.now()
+                # The runner gets its own task so cancelling one job never
+                # takes the worker down with it
+                job.task = asyncio.ensure_future(self.runner(job))
+                job.result = await job.task
+                job.status = "completed"
+            except asyncio.CancelledError:
+                if not job.task.cancelled():
+                    job.task.cancel()
+                    raise
+                job.status = "cancelled"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.task = None
+                job.finished_at = datetime.now()
+                if job.status != "cancelled":
+                    # Cancelled jobs stop early and would skew the estimate
+                    duration = time.perf_counter() - started
+                    self.avg_duration = (1 - self.smoothing) * self.avg_duration + self.smoothing * duration
+                self._queue.task_done()
+
+    def _evict_finished(self):
+        while len(self.jobs) > self.max_retained:
+            oldest = next((job_id for job_id, job in self.jobs.items() if job.finished), None)
+            if oldest is None:
+                break
+            del self.jobs[oldest]
+
+    def submit(self, payload: Dict[str, Any], tenant: str = "default", priority: str = "bulk") -> Job:
+        """Queue a job and return immediately; raises JobQueueFull when saturated"""
+        self._ensure_workers()
+        job = Job(id=uuid.uuid4().hex, payload=payload, tenant=tenant, priority=priority)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Job queue is full ({self.max_queued} jobs waiting)", self.retry_after())
+        self.jobs[job.id] = job
+        self._evict_finished()
+        return job
+
+    def retry_after(self) -> int:
+        """Seconds until the workers have drained enough of the queue for one more job"""
+        queue_depth = self._queue.qsize() if self._queue is not None else 0
+        waves = (queue_depth + 1) / self.workers
+        return max(1, math.ceil(waves * self.avg_duration))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; finished jobs are left as they are"""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            job.status = "cancelled"
+            job.finished_at = datetime.now()
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queued": self.max_queued,
+            "avg_job_duration": f"{self.avg_duration:.2f}s",
+            "jobs_by_status": counts
+        }
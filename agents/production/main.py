@@ -3,43 +3,155 @@ HAILEI Agent API - Production FastAPI Server for Render Deployment
 All 6 agents in one service for n8n Cloud integration
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 import os
+import sys
+import copy
 import json
+import uuid
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 import uvicorn
 
+from admission import AdmissionController, AdmissionRejected
+from checkpoints import CheckpointStore
+from hashing import canonical_hash, stable_hash
+from jobs import JobManager, JobQueueFull
+from memo import StageMemo
+from pipeline import ModulePipeline
+from scheduler import TenantScheduler
+from similarity import SimilarityIndex
+from usage import EMPTY_USAGE, UsageLedger
+from workflow_engine import Deadline, Stage, WorkflowEngine
+
+# Helpers shared with the core agents; appended so this directory's modules win name clashes
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+from adaptation import retitle, stale_sections
+
 # Embedded Mock Agents for Production
 class MockIPDAi:
+    # Course input fields each generated section depends on; used to
+    # regenerate only the sections affected by an edit
+    SECTION_FIELDS = {
+        "learning_objectives": ("course_title", "course_description", "course_level", "goals"),
+        "pedagogical_frameworks": ("course_title", "course_description", "course_level", "course_domain"),
+        "course_modules": ("course_title", "course_description", "course_level", "weeks", "goals")
+    }
+    
     def process_course_input(self, course_input):
+        return self.build_output(course_input, {
+            "learning_objectives": self.generate_objectives(course_input),
+            "pedagogical_frameworks": self.generate_frameworks(course_input),
+            "course_modules": self.generate_modules(course_input)
+        })
+    
+    def regenerate(self, previous_output, previous_input, course_input):
+        """Recompute only the sections whose input fields changed since the previous run"""
+        changed = {
+            name for name in set(previous_input) | set(course_input)
+            if previous_input.get(name) != course_input.get(name)
+        }
+        generators = {
+            "learning_objectives": self.generate_objectives,
+            "pedagogical_frameworks": self.generate_frameworks,
+            "course_modules": self.generate_modules
+        }
+        sections = {}
+        regenerated = []
+        for section, generate in generators.items():
+            if section not in previous_output or changed.intersection(self.SECTION_FIELDS[section]):
+                sections[section] = generate(course_input)
+                regenerated.append(section)
+            else:
+                sections[section] = previous_output[section]
+        
+        result = self.build_output(course_input, sections)
+        result["metadata"]["changed_fields"] = sorted(changed)
+        result["metadata"]["regenerated_sections"] = regenerated
+        return result
+    
+    def adapt(self, previous_output, previous_input, course_input, source_run_id=None, similarity=None):
+        """Reuse a near-identical prior course's sections, retitled for this course; sections
+        whose other input fields (e.g. goals, or a substantially reworded description) changed are regenerated"""
+        old_title = previous_input.get("course_title", "")
+        new_title = course_input.get("course_title", "")
+        stale = stale_sections(self.SECTION_FIELDS, previous_input, course_input)
+        generators = {
+            "learning_objectives": self.generate_objectives,
+            "pedagogical_frameworks": self.generate_frameworks,
+            "course_modules": self.generate_modules
+        }
+        sections = {
+            section: generators[section](course_input) if section in stale
+            else retitle(previous_output[section], old_title, new_title)
+            for section in self.SECTION_FIELDS
+        }
+        result = self.build_output(course_input, sections)
+        result["metadata"]["adapted_from"] = {
+            "run_id": source_run_id, "similarity": similarity, "regenerated_sections": stale
+        }
+        return result
+    
+    def generate_objectives(self, course_input):
         course_title = course_input.get("course_title", "Unknown Course")
-        course_level = course_input.get("course_level", "Intermediate")
-        goals = course_input.get("goals", [])
-        weeks = course_input.get("weeks", 8)
         
-        # Generate objectives based on course type
         if "artificial intelligence" in course_title.lower():
-            tlo = "Students will analyze AI concepts, evaluate machine learning applications, and create intelligent solutions for real-world problems."
-            elo = "• Identify types of machine learning algorithms\n• Explain neural network fundamentals\n• Evaluate AI applications across industries\n• Analyze ethical implications of AI systems\n• Communicate AI concepts to diverse audiences"
-            
-            kdka = {
-                "knowledge": "AI fundamentals, machine learning types, neural networks, ethics",
-                "delivery": "Interactive demos, case studies, hands-on AI tools",
-                "context": "Real AI applications in healthcare, business, technology",
-                "assessment": "AI tool projects, case analysis, ethical discussions"
+            return {
+                "tlo": "Students will analyze AI concepts, evaluate machine learning applications, and create intelligent solutions for real-world problems.",
+                "elo": "• Identify types of machine learning algorithms\n• Explain neural network fundamentals\n• Evaluate AI applications across industries\n• Analyze ethical implications of AI systems\n• Communicate AI concepts to diverse audiences"
             }
-            
-            prrr = {
-                "personal": "Career opportunities in AI and tech industry",
-                "relatable": "Everyday AI (Siri, Netflix, GPS), social media algorithms",
-                "relative": "Progressive understanding from basics to applications",
-                "realworld": "Industry case studies, AI tool usage, career pathways"
+        return {
+            "tlo": f"Students will analyze {course_title} concepts and apply them to solve real-world problems.",
+            "elo": f"• Understand core {course_title} principles\n• Apply theoretical knowledge practically\n• Evaluate different approaches and solutions\n• Communicate findings effectively"
+        }
+    
+    def generate_frameworks(self, course_input):
+        course_title = course_input.get("course_title", "Unknown Course")
+        
+        if "artificial intelligence" in course_title.lower():
+            return {
+                "kdka": {
+                    "knowledge": "AI fundamentals, machine learning types, neural networks, ethics",
+                    "delivery": "Interactive demos, case studies, hands-on AI tools",
+                    "context": "Real AI applications in healthcare, business, technology",
+                    "assessment": "AI tool projects, case analysis, ethical discussions"
+                },
+                "prrr": {
+                    "personal": "Career opportunities in AI and tech industry",
+                    "relatable": "Everyday AI (Siri, Netflix, GPS), social media algorithms",
+                    "relative": "Progressive understanding from basics to applications",
+                    "realworld": "Industry case studies, AI tool usage, career pathways"
+                }
+            }
+        return {
+            "kdka": {
+                "knowledge": f"Core concepts and principles of {course_title}",
+                "delivery": "Interactive lectures, case studies, hands-on projects",
+                "context": f"Real-world applications of {course_title}",
+                "assessment": "Projects, quizzes, presentations, peer discussions"
+            },
+            "prrr": {
+                "personal": f"Career applications of {course_title}",
+                "relatable": f"Everyday examples of {course_title} concepts",
+                "relative": "Building from basic to advanced concepts",
+                "realworld": f"Industry applications of {course_title}"
             }
-            
-            modules = [
+        }
+    
+    def generate_modules(self, course_input):
+        course_title = course_input.get("course_title", "Unknown Course")
+        weeks = course_input.get("weeks", 8)
+        
+        if "artificial intelligence" in course_title.lower():
+            return [
                 {
                     "module_number": 1,
                     "title": "AI Fundamentals & History",
@@ -55,35 +167,19 @@ class MockIPDAi:
                     "assessment": "Formative quiz, practical project, peer discussion on machine learning"
                 }
             ]
-        else:
-            # Generic course generation
-            tlo = f"Students will analyze {course_title} concepts and apply them to solve real-world problems."
-            elo = f"• Understand core {course_title} principles\n• Apply theoretical knowledge practically\n• Evaluate different approaches and solutions\n• Communicate findings effectively"
-            
-            kdka = {
-                "knowledge": f"Core concepts and principles of {course_title}",
-                "delivery": "Interactive lectures, case studies, hands-on projects",
-                "context": f"Real-world applications of {course_title}",
-                "assessment": "Projects, quizzes, presentations, peer discussions"
+        return [
+            {
+                "module_number": i + 1,
+                "title": f"Module {i + 1}: {course_title} Fundamentals",
+                "objectives": f"Students will master key concepts in {course_title} and apply them practically",
+                "activities": f"Interactive sessions, hands-on exercises, case studies related to {course_title}",
+                "assessment": f"Formative quiz, practical project, peer discussion on {course_title}"
             }
-            
-            prrr = {
-                "personal": f"Career applications of {course_title}",
-                "relatable": f"Everyday examples of {course_title} concepts",
-                "relative": "Building from basic to advanced concepts",
-                "realworld": f"Industry applications of {course_title}"
-            }
-            
-            modules = [
-                {
-                    "module_number": i + 1,
-                    "title": f"Module {i + 1}: {course_title} Fundamentals",
-                    "objectives": f"Students will master key concepts in {course_title} and apply them practically",
-                    "activities": f"Interactive sessions, hands-on exercises, case studies related to {course_title}",
-                    "assessment": f"Formative quiz, practical project, peer discussion on {course_title}"
-                }
-                for i in range(min(weeks // 2, 6))
-            ]
+            for i in range(min(weeks // 2, 6))
+        ]
+    
+    def build_output(self, course_input, sections):
+        course_title = course_input.get("course_title", "Unknown Course")
         
         return {
             "agent": "IPDAi",
@@ -92,63 +188,59 @@ class MockIPDAi:
             "course_info": {
                 "title": course_title,
                 "description": course_input.get("course_description", f"A comprehensive introduction to {course_title}"),
-                "level": course_level,
-                "goals": goals,
-                "weeks": weeks
+                "level": course_input.get("course_level", "Intermediate"),
+                "goals": course_input.get("goals", []),
+                "weeks": course_input.get("weeks", 8)
             },
-            "learning_objectives": {
-                "tlo": tlo,
-                "elo": elo
-            },
-            "pedagogical_frameworks": {
-                "kdka": kdka,
-                "prrr": prrr
-            },
-            "course_modules": modules,
+            "learning_objectives": sections["learning_objectives"],
+            "pedagogical_frameworks": sections["pedagogical_frameworks"],
+            "course_modules": sections["course_modules"],
             "metadata": {
                 "generated_date": datetime.now().isoformat(),
-                "agent_version": "1.0",
-                "processing_time": "2.3s"
+                "agent_version": "1.0"
             }
         }
 
 class MockCAuthAi:
     def process_ipdai_output(self, ipdai_data):
-        course_title = ipdai_data.get("course_title", "Unknown Course")
         modules = ipdai_data.get("course_modules", [])
-        
-        detailed_modules = []
-        for module in modules:
-            detailed_module = {
-                "module_number": module["module_number"],
-                "title": module["title"],
-                "objectives": module["objectives"],
-                "detailed_content": {
-                    "lecture_notes": f"Comprehensive lecture notes covering {module['title']} with theoretical foundations and practical examples aligned with PRRR framework.",
-                    "activities": [
-                        f"Interactive workshop on {module['title']}",
-                        f"Case study analysis related to {module['title']}",
-                        f"Hands-on project applying {module['title']} concepts"
-                    ],
-                    "assessments": [
-                        f"Formative quiz on {module['title']} fundamentals",
-                        f"Practical project demonstrating {module['title']} skills",
-                        f"Peer discussion forum on {module['title']} applications"
-                    ],
-                    "readings": [
-                        f"Required textbook chapter on {module['title']}",
-                        f"Supplementary articles on {module['title']} trends",
-                        f"Case studies in {module['title']} applications"
-                    ]
-                },
-                "prrr_alignment": {
-                    "personal": f"Connect {module['title']} to student career goals",
-                    "relatable": f"Use everyday examples of {module['title']}",
-                    "relative": f"Show how {module['title']} supports course objectives",
-                    "realworld": f"Industry applications of {module['title']}"
-                }
+        detailed_modules = [self.author_module(module) for module in modules]
+        return self.build_output(ipdai_data, detailed_modules)
+    
+    def author_module(self, module):
+        """Write detailed content for a single module"""
+        return {
+            "module_number": module["module_number"],
+            "title": module["title"],
+            "objectives": module["objectives"],
+            "detailed_content": {
+                "lecture_notes": f"Comprehensive lecture notes covering {module['title']} with theoretical foundations and practical examples aligned with PRRR framework.",
+                "activities": [
+                    f"Interactive workshop on {module['title']}",
+                    f"Case study analysis related to {module['title']}",
+                    f"Hands-on project applying {module['title']} concepts"
+                ],
+                "assessments": [
+                    f"Formative quiz on {module['title']} fundamentals",
+                    f"Practical project demonstrating {module['title']} skills",
+                    f"Peer discussion forum on {module['title']} applications"
+                ],
+                "readings": [
+                    f"Required textbook chapter on {module['title']}",
+                    f"Supplementary articles on {module['title']} trends",
+                    f"Case studies in {module['title']} applications"
+                ]
+            },
+            "prrr_alignment": {
+                "personal": f"Connect {module['title']} to student career goals",
+                "relatable": f"Use everyday examples of {module['title']}",
+                "relative": f"Show how {module['title']} supports course objectives",
+                "realworld": f"Industry applications of {module['title']}"
             }
-            detailed_modules.append(detailed_module)
+        }
+    
+    def build_output(self, ipdai_data, detailed_modules):
+        course_title = ipdai_data.get("course_title", "Unknown Course")
         
         return {
             "agent": "CAuthAi",
@@ -170,48 +262,51 @@ class MockCAuthAi:
             "metadata": {
                 "generated_date": datetime.now().isoformat(),
                 "agent_version": "1.0",
-                "source_data_date": ipdai_data.get("metadata", {}).get("generated_date", ""),
-                "processing_time": "3.7s"
+                "source_data_date": ipdai_data.get("metadata", {}).get("generated_date", "")
             }
         }
 
 class MockSearchAi:
     def process_cauthai_output(self, cauthai_data):
-        course_title = cauthai_data.get("course_title", "Unknown Course")
         detailed_modules = cauthai_data.get("detailed_modules", [])
-        
-        enriched_modules = []
-        for module in detailed_modules:
-            enriched_module = module.copy()
-            enriched_module["knowledge_sources"] = {
-                "academic_sources": [
-                    f"IEEE papers on {module['title']}",
-                    f"ACM Digital Library resources for {module['title']}",
-                    f"Nature articles related to {module['title']}"
-                ],
-                "educational_resources": [
-                    f"Khan Academy content on {module['title']}",
-                    f"Coursera courses covering {module['title']}",
-                    f"edX materials for {module['title']}"
-                ],
-                "industry_sources": [
-                    f"Industry reports on {module['title']}",
-                    f"Company case studies in {module['title']}",
-                    f"Professional blogs about {module['title']}"
-                ],
-                "multimedia": [
-                    f"YouTube educational videos on {module['title']}",
-                    f"TED talks related to {module['title']}",
-                    f"Interactive simulations for {module['title']}"
-                ]
-            }
-            enriched_module["resource_quality"] = {
-                "academic_credibility": "verified",
-                "currency": "current within 2 years",
-                "accessibility": "meets WCAG 2.1 standards",
-                "licensing": "educational use approved"
-            }
-            enriched_modules.append(enriched_module)
+        enriched_modules = [self.enrich_module(module) for module in detailed_modules]
+        return self.build_output(cauthai_data, enriched_modules)
+    
+    def enrich_module(self, module):
+        """Attach knowledge sources to a single authored module"""
+        enriched_module = module.copy()
+        enriched_module["knowledge_sources"] = {
+            "academic_sources": [
+                f"IEEE papers on {module['title']}",
+                f"ACM Digital Library resources for {module['title']}",
+                f"Nature articles related to {module['title']}"
+            ],
+            "educational_resources": [
+                f"Khan Academy content on {module['title']}",
+                f"Coursera courses covering {module['title']}",
+                f"edX materials for {module['title']}"
+            ],
+            "industry_sources": [
+                f"Industry reports on {module['title']}",
+                f"Company case studies in {module['title']}",
+                f"Professional blogs about {module['title']}"
+            ],
+            "multimedia": [
+                f"YouTube educational videos on {module['title']}",
+                f"TED talks related to {module['title']}",
+                f"Interactive simulations for {module['title']}"
+            ]
+        }
+        enriched_module["resource_quality"] = {
+            "academic_credibility": "verified",
+            "currency": "current within 2 years",
+            "accessibility": "meets WCAG 2.1 standards",
+            "licensing": "educational use approved"
+        }
+        return enriched_module
+    
+    def build_output(self, cauthai_data, enriched_modules):
+        course_title = cauthai_data.get("course_title", "Unknown Course")
         
         return {
             "agent": "SearchAi",
@@ -228,8 +323,164 @@ class MockSearchAi:
             "metadata": {
                 "generated_date": datetime.now().isoformat(),
                 "agent_version": "1.0",
-                "source_data_date": cauthai_data.get("metadata", {}).get("generated_date", ""),
-                "processing_time": "1.8s"
+                "source_data_date": cauthai_data.get("metadata", {}).get("generated_date", "")
+            }
+        }
+
+class MockTFDAi:
+    def process_searchai_output(self, searchai_data):
+        return self.plan_lms(
+            searchai_data.get("course_title", "Unknown Course"),
+            searchai_data.get("enriched_modules", []),
+            source_agent="SearchAi"
+        )
+
+    def plan_lms(self, course_title, modules, source_agent="IPDAi"):
+        """LMS mapping only needs the module list, not the enriched content; source_agent
+        names the stage the modules came from (IPDAi in the workflow DAG)"""
+        return {
+            "agent": "TFDAi",
+            "status": "completed",
+            "course_title": course_title,
+            "source_agent": source_agent,
+            "technical_specifications": {
+                "target_lms": "Canvas",
+                "scorm_version": "SCORM 2004",
+                "mobile_compatible": True,
+                "accessibility_compliant": "WCAG 2.1 AA",
+                "responsive_design": True,
+                "api_integration": ["LTI 1.3", "REST API"]
+            },
+            "lms_mapping": {
+                "modules": len(modules),
+                "quizzes": len(modules) * 2,
+                "discussions": len(modules),
+                "assignments": len(modules) * 3,
+                "estimated_deployment_time": "2-3 hours"
+            },
+            "integration_requirements": [
+                "LTI 1.3 support",
+                "Grade passback enabled",
+                "Single sign-on (SSO)",
+                "Mobile app compatibility",
+                "Analytics integration"
+            ],
+            "deployment_checklist": [
+                "Content validation complete",
+                "Accessibility audit passed",
+                "LMS compatibility verified",
+                "User acceptance testing scheduled"
+            ],
+            "metadata": {
+                "generated_date": datetime.now().isoformat(),
+                "agent_version": "1.0",
+                "deployment": "render",
+                "api_version": "1.0.0"
+            }
+        }
+
+class MockEditorAi:
+    def process_tfdai_output(self, tfdai_data):
+        course_title = tfdai_data.get("course_title", "Unknown Course")
+        
+        return {
+            "agent": "EditorAi",
+            "status": "completed",
+            "course_title": course_title,
+            "source_agent": "TFDAi",
+            "review_results": {
+                "grammar_check": "passed",
+                "clarity_score": 94,
+                "blooms_alignment": "verified",
+                "accessibility_score": 96,
+                "kdka_compliance": "validated",
+                "prrr_integration": "confirmed",
+                "readability_grade": "appropriate",
+                "content_consistency": "excellent"
+            },
+            "enhancements_made": [
+                "Improved sentence structure for clarity",
+                "Added comprehensive alt text for visual elements",
+                "Verified Bloom's taxonomy verb usage across all modules",
+                "Enhanced PRRR framework integration",
+                "Standardized formatting and terminology",
+                "Optimized content for mobile accessibility"
+            ],
+            "quality_metrics": {
+                "readability_level": "appropriate for course level",
+                "content_length": "optimal for learning objectives",
+                "engagement_score": 91,
+                "pedagogical_soundness": "excellent",
+                "accessibility_compliance": "WCAG 2.1 AA",
+                "mobile_optimization": "fully responsive"
+            },
+            "validation_checklist": [
+                "Grammar and spelling verified",
+                "Learning objectives alignment confirmed",
+                "Accessibility standards met",
+                "Mobile responsiveness tested",
+                "Content accuracy validated"
+            ],
+            "metadata": {
+                "generated_date": datetime.now().isoformat(),
+                "agent_version": "1.0",
+                "deployment": "render",
+                "api_version": "1.0.0"
+            }
+        }
+
+class MockEthosAi:
+    def process_editorai_output(self, editorai_data):
+        course_title = editorai_data.get("course_title", "Unknown Course")
+        
+        return {
+            "agent": "EthosAi",
+            "status": "completed",
+            "course_title": course_title,
+            "source_agent": "EditorAi",
+            "ethical_audit": {
+                "bias_detection": "no bias detected",
+                "inclusivity_score": 96,
+                "cultural_sensitivity": "reviewed and approved",
+                "privacy_compliance": "FERPA compliant",
+                "accessibility_audit": "exceeds UDL guidelines",
+                "ethical_ai_usage": "transparent and appropriate",
+                "data_protection": "privacy by design implemented"
+            },
+            "compliance_checklist": {
+                "academic_integrity": True,
+                "inclusive_language": True,
+                "cultural_awareness": True,
+                "accessibility_standards": True,
+                "ethical_ai_use": True,
+                "student_privacy": True,
+                "data_security": True,
+                "copyright_compliance": True
+            },
+            "recommendations": [
+                "Continue monitoring for bias in future updates",
+                "Regular accessibility audits recommended quarterly",
+                "Student feedback integration suggested for continuous improvement",
+                "Cultural sensitivity review annual recommended",
+                "Privacy impact assessment completed successfully"
+            ],
+            "final_approval": {
+                "ethical_clearance": "approved",
+                "ready_for_deployment": True,
+                "approval_date": datetime.now().isoformat(),
+                "approval_level": "full production clearance",
+                "compliance_officer": "EthosAi v1.0"
+            },
+            "audit_trail": {
+                "reviewed_components": ["content", "assessments", "activities", "resources"],
+                "ethical_frameworks_applied": ["Universal Design for Learning", "Cultural Responsiveness", "Academic Integrity"],
+                "stakeholder_considerations": ["students", "instructors", "institution", "broader_community"]
+            },
+            "metadata": {
+                "generated_date": datetime.now().isoformat(),
+                "agent_version": "1.0",
+                "deployment": "render",
+                "api_version": "1.0.0"
             }
         }
 
@@ -260,6 +511,13 @@ class CourseInput(BaseModel):
     course_domain: str = ""
     goals: List[str]
     weeks: int = 8
+    deadline_ms: Optional[int] = None  # overall time budget; X-Deadline-Ms header also accepted
+    reuse_similar: bool = False  # adapt a near-identical prior run instead of generating from scratch
+
+class BatchRequest(BaseModel):
+    courses: List[CourseInput]
+    max_concurrency: Optional[int] = None
+    order: str = "submission"  # "submission" or "completion"
 
 class HealthResponse(BaseModel):
     status: str
@@ -267,11 +525,47 @@ class HealthResponse(BaseModel):
     agents_available: int
     environment: str
     version: str
+    workflows_in_flight: int = 0
+    queue_depth: int = 0
+    jobs_queued: int = 0
 
 # Initialize agents
 ipdai = MockIPDAi()
 cauthai = MockCAuthAi()
 searchai = MockSearchAi()
+tfdai = MockTFDAi()
+editorai = MockEditorAi()
+ethosai = MockEthosAi()
+
+# Memoize every agent's processing functions so retried or repeated payloads
+# (single endpoints and the chained workflow alike) are served from cache
+stage_memo = StageMemo()
+stage_memo.wrap_agent(ipdai, "IPDAi", ["process_course_input"])
+stage_memo.wrap_agent(cauthai, "CAuthAi", ["process_ipdai_output", "author_module"])
+stage_memo.wrap_agent(searchai, "SearchAi", ["process_cauthai_output", "enrich_module"])
+stage_memo.wrap_agent(tfdai, "TFDAi", ["process_searchai_output", "plan_lms"])
+stage_memo.wrap_agent(editorai, "EditorAi", ["process_tfdai_output"])
+stage_memo.wrap_agent(ethosai, "EthosAi", ["process_editorai_output"])
+
+# LLM usage and processing time of every agent call, per agent, tenant and run
+usage_ledger = UsageLedger()
+
+def record_usage(agent: str, result: Dict[str, Any], seconds: float, tenant: str = "default",
+                 run_id: Optional[str] = None):
+    """Stamp the measured processing time and the agent's reported usage into its
+    metadata, and account them in the ledger"""
+    metadata = result.get("metadata")
+    if metadata is None:
+        return
+    metadata["processing_time"] = f"{seconds:.3f}s"
+    usage = metadata.setdefault("usage", dict(EMPTY_USAGE))
+    usage_ledger.record(agent, usage, seconds, tenant, run_id)
+
+def metered_call(agent: str, tenant: str, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    record_usage(agent, result, time.perf_counter() - started, tenant)
+    return result
 
 @app.get("/", response_model=Dict[str, Any])
 async def root():
@@ -290,22 +584,25 @@ async def root():
 async def health_check():
     """Detailed health check for monitoring"""
     return HealthResponse(
-        status="healthy",
+        status="saturated" if admission.saturated else "healthy",
         timestamp=datetime.now().isoformat(),
         agents_available=6,
         environment=os.getenv("RENDER", "development"),
-        version="1.0.0"
+        version="1.0.0",
+        workflows_in_flight=sum(scheduler.in_flight.values()),
+        queue_depth=scheduler.queue_depth() + admission.queue_depth,
+        jobs_queued=job_manager.stats()["queue_depth"]
     )
 
 @app.post("/ipdai")
-async def ipdai_endpoint(course_input: CourseInput):
+async def ipdai_endpoint(course_input: CourseInput, request: Request):
     """
     IPDAi - Instructional Planning and Design Agent
     Creates foundational course structure, objectives, and frameworks
     """
     try:
         input_dict = course_input.dict()
-        result = ipdai.process_course_input(input_dict)
+        result = metered_call("IPDAi", request_tenant(request), ipdai.process_course_input, input_dict)
         
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
@@ -320,13 +617,13 @@ async def ipdai_endpoint(course_input: CourseInput):
         raise HTTPException(status_code=500, detail=f"IPDAi processing error: {str(e)}")
 
 @app.post("/cauthai")
-async def cauthai_endpoint(ipdai_data: Dict[str, Any]):
+async def cauthai_endpoint(ipdai_data: Dict[str, Any], request: Request):
     """
     CAuthAi - Course Authoring Agent  
     Takes IPDAi output and creates detailed course content and activities
     """
     try:
-        result = cauthai.process_ipdai_output(ipdai_data)
+        result = metered_call("CAuthAi", request_tenant(request), cauthai.process_ipdai_output, ipdai_data)
         
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
@@ -341,13 +638,13 @@ async def cauthai_endpoint(ipdai_data: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=f"CAuthAi processing error: {str(e)}")
 
 @app.post("/searchai")
-async def searchai_endpoint(cauthai_data: Dict[str, Any]):
+async def searchai_endpoint(cauthai_data: Dict[str, Any], request: Request):
     """
     SearchAi - Semantic Search & Enrichment Agent
     Takes CAuthAi output and enriches with knowledge sources
     """
     try:
-        result = searchai.process_cauthai_output(cauthai_data)
+        result = metered_call("SearchAi", request_tenant(request), searchai.process_cauthai_output, cauthai_data)
         
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
@@ -362,271 +659,645 @@ async def searchai_endpoint(cauthai_data: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=f"SearchAi processing error: {str(e)}")
 
 @app.post("/tfdai")
-async def tfdai_endpoint(searchai_data: Dict[str, Any]):
+async def tfdai_endpoint(searchai_data: Dict[str, Any], request: Request):
     """
     TFDAi - Technical & Functional Design Agent
     Takes SearchAi output and creates LMS technical specifications
     """
     try:
-        course_title = searchai_data.get("course_title", "Unknown Course")
-        modules = searchai_data.get("enriched_modules", [])
-        
-        result = {
-            "agent": "TFDAi",
-            "status": "completed",
-            "course_title": course_title,
-            "source_agent": "SearchAi",
-            "technical_specifications": {
-                "target_lms": "Canvas",
-                "scorm_version": "SCORM 2004",
-                "mobile_compatible": True,
-                "accessibility_compliant": "WCAG 2.1 AA",
-                "responsive_design": True,
-                "api_integration": ["LTI 1.3", "REST API"]
-            },
-            "lms_mapping": {
-                "modules": len(modules),
-                "quizzes": len(modules) * 2,
-                "discussions": len(modules),
-                "assignments": len(modules) * 3,
-                "estimated_deployment_time": "2-3 hours"
-            },
-            "integration_requirements": [
-                "LTI 1.3 support",
-                "Grade passback enabled",
-                "Single sign-on (SSO)",
-                "Mobile app compatibility",
-                "Analytics integration"
-            ],
-            "deployment_checklist": [
-                "Content validation complete",
-                "Accessibility audit passed",
-                "LMS compatibility verified",
-                "User acceptance testing scheduled"
-            ],
-            "metadata": {
-                "generated_date": datetime.now().isoformat(),
-                "agent_version": "1.0",
-                "deployment": "render",
-                "api_version": "1.0.0",
-                "processing_time": "2.1s"
-            }
-        }
-        
-        return result
+        return metered_call("TFDAi", request_tenant(request), tfdai.process_searchai_output, searchai_data)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"TFDAi processing error: {str(e)}")
 
 @app.post("/editorai")
-async def editorai_endpoint(tfdai_data: Dict[str, Any]):
+async def editorai_endpoint(tfdai_data: Dict[str, Any], request: Request):
     """
     EditorAi - Content Review & Enhancement Agent
     Takes TFDAi output and reviews for quality, accessibility, and alignment
     """
     try:
-        course_title = tfdai_data.get("course_title", "Unknown Course")
-        
-        result = {
-            "agent": "EditorAi",
-            "status": "completed",
-            "course_title": course_title,
-            "source_agent": "TFDAi",
-            "review_results": {
-                "grammar_check": "passed",
-                "clarity_score": 94,
-                "blooms_alignment": "verified",
-                "accessibility_score": 96,
-                "kdka_compliance": "validated",
-                "prrr_integration": "confirmed",
-                "readability_grade": "appropriate",
-                "content_consistency": "excellent"
-            },
-            "enhancements_made": [
-                "Improved sentence structure for clarity",
-                "Added comprehensive alt text for visual elements",
-                "Verified Bloom's taxonomy verb usage across all modules",
-                "Enhanced PRRR framework integration",
-                "Standardized formatting and terminology",
-                "Optimized content for mobile accessibility"
-            ],
-            "quality_metrics": {
-                "readability_level": "appropriate for course level",
-                "content_length": "optimal for learning objectives",
-                "engagement_score": 91,
-                "pedagogical_soundness": "excellent",
-                "accessibility_compliance": "WCAG 2.1 AA",
-                "mobile_optimization": "fully responsive"
-            },
-            "validation_checklist": [
-                "Grammar and spelling verified",
-                "Learning objectives alignment confirmed",
-                "Accessibility standards met",
-                "Mobile responsiveness tested",
-                "Content accuracy validated"
-            ],
-            "metadata": {
-                "generated_date": datetime.now().isoformat(),
-                "agent_version": "1.0",
-                "deployment": "render",
-                "api_version": "1.0.0",
-                "processing_time": "3.2s"
-            }
-        }
-        
-        return result
+        return metered_call("EditorAi", request_tenant(request), editorai.process_tfdai_output, tfdai_data)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"EditorAi processing error: {str(e)}")
 
 @app.post("/ethosai")
-async def ethosai_endpoint(editorai_data: Dict[str, Any]):
+async def ethosai_endpoint(editorai_data: Dict[str, Any], request: Request):
     """
     EthosAi - Ethical Oversight Agent  
     Takes EditorAi output and ensures ethical compliance and inclusivity
     """
     try:
-        course_title = editorai_data.get("course_title", "Unknown Course")
-        
-        result = {
-            "agent": "EthosAi",
-            "status": "completed",
-            "course_title": course_title,
-            "source_agent": "EditorAi",
-            "ethical_audit": {
-                "bias_detection": "no bias detected",
-                "inclusivity_score": 96,
-                "cultural_sensitivity": "reviewed and approved",
-                "privacy_compliance": "FERPA compliant",
-                "accessibility_audit": "exceeds UDL guidelines",
-                "ethical_ai_usage": "transparent and appropriate",
-                "data_protection": "privacy by design implemented"
-            },
-            "compliance_checklist": {
-                "academic_integrity": True,
-                "inclusive_language": True,
-                "cultural_awareness": True,
-                "accessibility_standards": True,
-                "ethical_ai_use": True,
-                "student_privacy": True,
-                "data_security": True,
-                "copyright_compliance": True
-            },
-            "recommendations": [
-                "Continue monitoring for bias in future updates",
-                "Regular accessibility audits recommended quarterly",
-                "Student feedback integration suggested for continuous improvement",
-                "Cultural sensitivity review annual recommended",
-                "Privacy impact assessment completed successfully"
-            ],
-            "final_approval": {
-                "ethical_clearance": "approved",
-                "ready_for_deployment": True,
-                "approval_date": datetime.now().isoformat(),
-                "approval_level": "full production clearance",
-                "compliance_officer": "EthosAi v1.0"
-            },
-            "audit_trail": {
-                "reviewed_components": ["content", "assessments", "activities", "resources"],
-                "ethical_frameworks_applied": ["Universal Design for Learning", "Cultural Responsiveness", "Academic Integrity"],
-                "stakeholder_considerations": ["students", "instructors", "institution", "broader_community"]
-            },
-            "metadata": {
-                "generated_date": datetime.now().isoformat(),
-                "agent_version": "1.0",
-                "deployment": "render",
-                "api_version": "1.0.0",
-                "processing_time": "1.9s"
-            }
-        }
-        
-        return result
+        return metered_call("EthosAi", request_tenant(request), ethosai.process_editorai_output, editorai_data)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"EthosAi processing error: {str(e)}")
 
-@app.post("/complete-workflow")
-async def complete_workflow_endpoint(course_input: CourseInput):
-    """
-    Complete HAILEI workflow - runs all 6 agents in sequence
-    Optimized for production deployment
+def ipdai_stage(run):
+    """Full IPDAi generation, only the changed sections when regenerating a previous
+    run, or an adaptation of a near-identical prior run"""
+    previous = run.state.get("previous_outputs", {}).get("IPDAi")
+    if previous is not None:
+        return ipdai.regenerate(previous, run.state["previous_input"], run.input)
+    similar = run.state.get("similar_run")
+    if similar is not None:
+        return ipdai.adapt(similar["ipdai_output"], similar["input"], run.input,
+                           similar["run_id"], similar["similarity"])
+    return ipdai.process_course_input(run.input)
+
+def reuse_previous(step, previous_by_hash):
+    """Wrap a per-module step so modules unchanged since the previous run are spliced in"""
+    def reuse_or_run(module):
+        previous = previous_by_hash.get(stable_hash(module))
+        return copy.deepcopy(previous) if previous is not None else step(module)
+    return reuse_or_run
+
+def previous_module_maps(run):
+    """Map unchanged module hashes to the previous run's authored and enriched modules"""
+    previous = run.state.get("previous_outputs", {})
+    source_modules = previous.get("IPDAi", {}).get("course_modules", [])
+    detailed_modules = previous.get("CAuthAi", {}).get("detailed_modules", [])
+    enriched_modules = previous.get("SearchAi", {}).get("enriched_modules", [])
+    authored = {stable_hash(src): out for src, out in zip(source_modules, detailed_modules)}
+    enriched = {stable_hash(src): out for src, out in zip(detailed_modules, enriched_modules)}
+    return authored, enriched
+
+async def cauthai_stage(run):
+    """Author modules one at a time, feeding each into SearchAi as soon as it is ready"""
+    ipdai_result = run.results["IPDAi"]
+    authored, enriched = previous_module_maps(run)
+    pipeline = ModulePipeline([
+        reuse_previous(cauthai.author_module, authored),
+        reuse_previous(searchai.enrich_module, enriched)
+    ])
+    run.state["module_pipeline"] = pipeline.start(ipdai_result.get("course_modules", []))
+    try:
+        detailed_modules = await pipeline.stage_output(0)
+    except asyncio.CancelledError:
+        # Cancelled or out of budget: stop authoring, and let SearchAi fall back
+        # to enriching whatever CAuthAi output replaces this one
+        pipeline.cancel()
+        run.state.pop("module_pipeline", None)
+        raise
+    return cauthai.build_output(ipdai_result, detailed_modules)
+
+async def searchai_stage(run):
+    """Collect the modules the pipeline has already been enriching in order"""
+    cauthai_result = run.results["CAuthAi"]
+    pipeline = run.state.get("module_pipeline")
+    if pipeline is None:
+        _, enriched = previous_module_maps(run)
+        pipeline = ModulePipeline([reuse_previous(searchai.enrich_module, enriched)])
+        enriched_modules = await pipeline.run(cauthai_result.get("detailed_modules", []))
+    else:
+        try:
+            enriched_modules = await pipeline.stage_output(1)
+        except asyncio.CancelledError:
+            pipeline.cancel()
+            raise
+    return searchai.build_output(cauthai_result, enriched_modules)
+
+# Courses run at once by /complete-workflow/batch (default, and cap on a request's override)
+BATCH_CONCURRENCY = int(os.getenv("HAILEI_BATCH_CONCURRENCY", "4"))
+MAX_BATCH_CONCURRENCY = int(os.getenv("HAILEI_MAX_BATCH_CONCURRENCY", "16"))
+
+# Completed stage results per run, so a retried run resumes where it stopped
+checkpoint_store = CheckpointStore() if os.getenv("HAILEI_CHECKPOINTS", "1") != "0" else None
+
+def tfdai_stage(run):
+    return tfdai.plan_lms(
+        run.results["IPDAi"].get("course_title", "Unknown Course"),
+        run.results["IPDAi"].get("course_modules", [])
+    )
+
+# Template agents used as deadline fallbacks, outside the memo cache
+fallback_ipdai = MockIPDAi()
+fallback_cauthai = MockCAuthAi()
+fallback_searchai = MockSearchAi()
+fallback_tfdai = MockTFDAi()
+fallback_editorai = MockEditorAi()
+fallback_ethosai = MockEthosAi()
+
+# Workflow DAG - each stage declares only the outputs it actually reads, so
+# independent branches run concurrently and wall-clock time is the critical path:
+#   IPDAi -> CAuthAi -> SearchAi   (pipelined per module)
+#   IPDAi -> TFDAi -> EditorAi -> EthosAi
+# Weights split a run's deadline budget; a stage that runs out of budget is
+# replaced by its fallback, which skips memo lookups and module pipelining
+workflow = WorkflowEngine([
+    Stage("IPDAi", ipdai_stage, weight=3,
+          fallback=lambda run: fallback_ipdai.process_course_input(run.input)),
+    Stage("CAuthAi", cauthai_stage, ("IPDAi",), weight=2,
+          fallback=lambda run: fallback_cauthai.process_ipdai_output(run.results["IPDAi"])),
+    Stage("SearchAi", searchai_stage, ("CAuthAi",),
+          fallback=lambda run: fallback_searchai.process_cauthai_output(run.results["CAuthAi"])),
+    Stage("TFDAi", tfdai_stage, ("IPDAi",),
+          fallback=lambda run: fallback_tfdai.plan_lms(
+              run.results["IPDAi"].get("course_title", "Unknown Course"),
+              run.results["IPDAi"].get("course_modules", [])
+          )),
+    Stage("EditorAi", lambda run: editorai.process_tfdai_output(run.results["TFDAi"]), ("TFDAi",),
+          fallback=lambda run: fallback_editorai.process_tfdai_output(run.results["TFDAi"])),
+    Stage("EthosAi", lambda run: ethosai.process_editorai_output(run.results["EditorAi"]), ("EditorAi",),
+          fallback=lambda run: fallback_ethosai.process_editorai_output(run.results["EditorAi"])),
+], checkpoints=checkpoint_store)
+
+def build_final_course(course_input: CourseInput, run) -> Dict[str, Any]:
+    """Build the final course structure combining all agent outputs"""
+    ipdai_result = run.results["IPDAi"]
+    searchai_result = run.results["SearchAi"]
+    tfdai_result = run.results["TFDAi"]
+    editorai_result = run.results["EditorAi"]
+    ethosai_result = run.results["EthosAi"]
+    workflow_end = datetime.now()
+    
+    return {
+        # Set when IPDAi adapted a near-identical prior run instead of generating this course
+        "adapted_from": ipdai_result.get("metadata", {}).get("adapted_from"),
+        "course_info": {
+            "title": course_input.course_title,
+            "description": course_input.course_description,
+            "level": course_input.course_level,
+            "domain": course_input.course_domain,
+            "duration_weeks": course_input.weeks,
+            "goals": course_input.goals
+        },
+        "learning_objectives": ipdai_result.get("learning_objectives", {}),
+        "pedagogical_frameworks": ipdai_result.get("pedagogical_frameworks", {}),
+        "course_modules": searchai_result.get("enriched_modules", []),
+        "technical_specifications": tfdai_result.get("technical_specifications", {}),
+        "lms_integration": tfdai_result.get("lms_mapping", {}),
+        "deployment_requirements": tfdai_result.get("integration_requirements", []),
+        "quality_assurance": {
+            "content_review": editorai_result.get("review_results", {}),
+            "enhancements_made": editorai_result.get("enhancements_made", []),
+            "quality_metrics": editorai_result.get("quality_metrics", {})
+        },
+        "ethical_compliance": {
+            "ethical_audit": ethosai_result.get("ethical_audit", {}),
+            "compliance_checklist": ethosai_result.get("compliance_checklist", {}),
+            "final_approval": ethosai_result.get("final_approval", {}),
+            "recommendations": ethosai_result.get("recommendations", [])
+        },
+        "deployment_status": {
+            "ready_for_deployment": ethosai_result.get("final_approval", {}).get("ready_for_deployment", False),
+            "ethical_clearance": ethosai_result.get("final_approval", {}).get("ethical_clearance", "pending"),
+            "quality_score": editorai_result.get("quality_metrics", {}).get("engagement_score", 0),
+            "approval_level": ethosai_result.get("final_approval", {}).get("approval_level", "pending")
+        },
+        "production_metadata": {
+            "workflow": "HAILEI Complete Production",
+            "run_id": run.run_id,
+            "regenerated_from": run.state.get("regenerated_from"),
+            "agents_processed": ["IPDAi", "CAuthAi", "SearchAi", "TFDAi", "EditorAi", "EthosAi"],
+            "deployment": "render",
+            "api_version": "1.0.0",
+            "environment": os.getenv("RENDER", "development"),
+            "start_time": run.start_time.isoformat(),
+            "end_time": workflow_end.isoformat(),
+            "total_processing_time": f"{run.total_time:.2f}s",
+            "stage_timings": run.stage_timings(),
+            "usage": (usage_ledger.run_usage(run.run_id) or {}).get("total"),
+            "deadline_ms": int(run.deadline.budget * 1000) if run.deadline else None,
+            "deadline_fallbacks": [name for name, timing in run.timings.items() if timing.fallback],
+            "agents_successful": len(run.results),
+            "generated_date": workflow_end.isoformat()
+        }
+    }
+
+scheduler = TenantScheduler()
+admission = AdmissionController(max_in_flight=scheduler.capacity)
+
+def admit_request(units: int = 1) -> float:
+    """Admit a request or shed it with 429 + Retry-After when saturated"""
+    try:
+        return admission.acquire(units)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+@contextmanager
+def admitted(units: int = 1):
+    admitted_at = admit_request(units)
+    try:
+        yield
+    finally:
+        admission.release(admitted_at, units)
+
+def streaming_response(body, release, **kwargs) -> StreamingResponse:
+    try:
+        return StreamingResponse(body, background=BackgroundTask(release), **kwargs)
+    except BaseException:
+        release()
+        raise
+
+def request_tenant(request: Request) -> str:
+    return request.headers.get("x-tenant-id", "default")
+
+def request_priority(request: Request, default: str = "interactive") -> str:
+    return request.headers.get("x-priority", default)
+
+def request_deadline_ms(request: Request, course_input: CourseInput) -> Optional[int]:
+    """The tighter of the X-Deadline-Ms header and the CourseInput deadline_ms field"""
+    budgets = [course_input.deadline_ms]
+    header = request.headers.get("x-deadline-ms")
+    if header:
+        try:
+            budgets.append(int(header))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="X-Deadline-Ms must be an integer number of milliseconds")
+    budgets = [budget for budget in budgets if budget]
+    return min(budgets) if budgets else None
+
+def workflow_input(course_input: CourseInput) -> Dict[str, Any]:
+    """Course fields the agents read; request options are kept out so they never change cache keys"""
+    return course_input.dict(exclude={"deadline_ms", "reuse_similar"})
+
+# Past run inputs, so near-identical courses can adapt a prior generation
+similarity_index = SimilarityIndex()
+_similarity_loader: Optional[threading.Thread] = None
+_similarity_loader_lock = threading.Lock()
+
+def _load_similarity_index():
+    for past_run_id, past_input in checkpoint_store.completed_runs(similarity_index.max_runs):
+        if past_run_id not in similarity_index:
+            similarity_index.add(past_run_id, past_input)
+
+def load_similarity_index():
+    """Index recently completed runs in a background thread, once; queries meanwhile see a partial index"""
+    global _similarity_loader
+    if checkpoint_store is None:
+        return
+    with _similarity_loader_lock:
+        if _similarity_loader is None:
+            _similarity_loader = threading.Thread(
+                target=_load_similarity_index, name="hailei-similarity-load", daemon=True
+            )
+            _similarity_loader.start()
+
+@app.on_event("startup")
+async def start_similarity_index():
+    load_similarity_index()
+
+def find_similar_run(input_data: Dict[str, Any], exclude: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Closest prior run above the similarity threshold that has a checkpointed IPDAi output
+    
+    Blocks on MinHash and SQLite; async callers run it in a worker thread.
     """
+    if checkpoint_store is None:
+        return None
+    load_similarity_index()
+    for run_id, score in similarity_index.query(input_data, exclude=exclude):
+        ipdai_output = checkpoint_store.load_outputs(run_id).get("IPDAi")
+        if ipdai_output is not None:
+            record = checkpoint_store.get_run(run_id)
+            return {"run_id": run_id, "similarity": score, "input": record["input"], "ipdai_output": ipdai_output}
+    return None
+
+async def run_workflow(input_data: Dict[str, Any], tenant: str = "default", priority: str = "interactive",
+                       reuse_similar: bool = False, **kwargs):
+    """Run the workflow DAG once the scheduler grants this tenant a slot"""
+    state = dict(kwargs.pop("state", None) or {})
+    if reuse_similar and "previous_outputs" not in state:
+        similar = await asyncio.to_thread(find_similar_run, input_data, kwargs.get("run_id"))
+        if similar is not None:
+            state["similar_run"] = similar
+    on_stage_complete = kwargs.pop("on_stage_complete", None)
+    
+    async def account_stage(name, result, run):
+        timing = run.timings[name]
+        # Restored checkpoints keep the time and usage of the run that produced them
+        if not timing.restored:
+            record_usage(name, result, timing.duration, tenant, run.run_id)
+        if on_stage_complete is not None:
+            await on_stage_complete(name, result, run)
+    
+    async with scheduler.slot(tenant, priority):
+        run = await workflow.run(input_data, state=state, on_stage_complete=account_stage, **kwargs)
+    if run.run_id is not None:
+        await asyncio.to_thread(similarity_index.add, run.run_id, input_data)
+    return run
+
+class ClientDisconnected(Exception):
+    """Raised when the client went away while its workflow was running"""
+
+DISCONNECT_POLL_INTERVAL = float(os.getenv("HAILEI_DISCONNECT_POLL_INTERVAL", "0.5"))
+
+async def cancel_on_disconnect(request: Request, coro):
+    """Await coro, cancelling it if the client disconnects in the meantime"""
+    task = asyncio.ensure_future(coro)
     try:
-        workflow_start = datetime.now()
-        
-        # Step 1: IPDAi
-        input_dict = course_input.dict()
-        ipdai_result = ipdai.process_course_input(input_dict)
-        
-        # Step 2: CAuthAi
-        cauthai_result = cauthai.process_ipdai_output(ipdai_result)
-        
-        # Step 3: SearchAi
-        searchai_result = searchai.process_cauthai_output(cauthai_result)
-        
-        # Step 4: TFDAi
-        tfdai_result = await tfdai_endpoint(searchai_result)
-        
-        # Step 5: EditorAi
-        editorai_result = await editorai_endpoint(tfdai_result)
-        
-        # Step 6: EthosAi
-        ethosai_result = await ethosai_endpoint(editorai_result)
-        
-        workflow_end = datetime.now()
-        processing_time = (workflow_end - workflow_start).total_seconds()
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        task.cancel()
+
+async def run_course_workflow(course_input: CourseInput, request: Request, run_id: str, **kwargs) -> Dict[str, Any]:
+    """Admit, schedule and run one course for a blocking endpoint, cancelling it on disconnect"""
+    deadline_ms = request_deadline_ms(request, course_input)
+    with admitted():
+        try:
+            run = await cancel_on_disconnect(request, run_workflow(
+                workflow_input(course_input), request_tenant(request), request_priority(request),
+                run_id=run_id, deadline=Deadline.from_ms(deadline_ms),
+                reuse_similar=course_input.reuse_similar, **kwargs
+            ))
+            return build_final_course(course_input, run)
         
-        # Build the final course structure combining all agent outputs
-        final_course = {
-            "course_info": {
-                "title": course_input.course_title,
-                "description": course_input.course_description,
-                "level": course_input.course_level,
-                "domain": course_input.course_domain,
-                "duration_weeks": course_input.weeks,
-                "goals": course_input.goals
-            },
-            "learning_objectives": ipdai_result.get("learning_objectives", {}),
-            "pedagogical_frameworks": ipdai_result.get("pedagogical_frameworks", {}),
-            "course_modules": searchai_result.get("enriched_modules", []),
-            "technical_specifications": tfdai_result.get("technical_specifications", {}),
-            "lms_integration": tfdai_result.get("lms_mapping", {}),
-            "deployment_requirements": tfdai_result.get("integration_requirements", []),
-            "quality_assurance": {
-                "content_review": editorai_result.get("review_results", {}),
-                "enhancements_made": editorai_result.get("enhancements_made", []),
-                "quality_metrics": editorai_result.get("quality_metrics", {})
-            },
-            "ethical_compliance": {
-                "ethical_audit": ethosai_result.get("ethical_audit", {}),
-                "compliance_checklist": ethosai_result.get("compliance_checklist", {}),
-                "final_approval": ethosai_result.get("final_approval", {}),
-                "recommendations": ethosai_result.get("recommendations", [])
-            },
-            "deployment_status": {
-                "ready_for_deployment": ethosai_result.get("final_approval", {}).get("ready_for_deployment", False),
-                "ethical_clearance": ethosai_result.get("final_approval", {}).get("ethical_clearance", "pending"),
-                "quality_score": editorai_result.get("quality_metrics", {}).get("engagement_score", 0),
-                "approval_level": ethosai_result.get("final_approval", {}).get("approval_level", "pending")
-            },
-            "production_metadata": {
-                "workflow": "HAILEI Complete Production",
-                "agents_processed": ["IPDAi", "CAuthAi", "SearchAi", "TFDAi", "EditorAi", "EthosAi"],
-                "deployment": "render",
-                "api_version": "1.0.0",
-                "environment": os.getenv("RENDER", "development"),
-                "start_time": workflow_start.isoformat(),
-                "end_time": workflow_end.isoformat(),
-                "total_processing_time": f"{processing_time:.2f}s",
-                "agents_successful": 6,
-                "generated_date": workflow_end.isoformat()
-            }
+        except ClientDisconnected:
+            # Nobody is listening any more; the status code only shows up in access logs
+            raise HTTPException(status_code=499, detail="Client closed request", headers={"X-Run-Id": run_id})
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Complete workflow error: {str(e)} (resume with POST /runs/{run_id}/resume)",
+                headers={"X-Run-Id": run_id}
+            )
+
+@app.post("/complete-workflow")
+async def complete_workflow_endpoint(course_input: CourseInput, request: Request):
+    """
+    Complete HAILEI workflow - runs all 6 agents as a dependency DAG
+    Independent agents run concurrently, so latency follows the critical path.
+    An X-Deadline-Ms header or deadline_ms field bounds the run; agents that
+    run out of budget return template output
+    """
+    return await run_course_workflow(course_input, request, uuid.uuid4().hex)
+
+@app.post("/complete-workflow/batch")
+async def complete_workflow_batch_endpoint(batch: BatchRequest, request: Request):
+    """
+    Batch HAILEI workflow - runs many courses concurrently up to a limit
+    Identical courses in the batch are generated once; results stream back as
+    NDJSON, one line per submitted course, in submission or completion order
+    """
+    if batch.order not in ("submission", "completion"):
+        raise HTTPException(status_code=400, detail="order must be 'submission' or 'completion'")
+    
+    limit = max(1, min(batch.max_concurrency or BATCH_CONCURRENCY, MAX_BATCH_CONCURRENCY))
+    tenant = request_tenant(request)
+    priority = request_priority(request, "bulk")
+    slots = asyncio.Semaphore(limit)
+    deadlines = [request_deadline_ms(request, course) for course in batch.courses]
+    
+    # Group submission indexes by canonical course hash so duplicates share one run
+    groups: Dict[str, List[int]] = {}
+    for index, course in enumerate(batch.courses):
+        groups.setdefault(canonical_hash(workflow_input(course)), []).append(index)
+    
+    async def run_course(indexes):
+        course = batch.courses[indexes[0]]
+        run_id = uuid.uuid4().hex
+        async with slots:
+            try:
+                run = await run_workflow(
+                    workflow_input(course), tenant, priority, run_id=run_id,
+                    deadline=Deadline.from_ms(deadlines[indexes[0]]), reuse_similar=course.reuse_similar
+                )
+                outcome = {"status": "completed", "run_id": run_id, "result": build_final_course(course, run)}
+            except Exception as e:
+                outcome = {"status": "failed", "run_id": run_id, "error": f"Complete workflow error: {str(e)}"}
+        return indexes, outcome
+    
+    def batch_line(index, first_index, outcome):
+        line = {
+            "index": index,
+            "course_title": batch.courses[index].course_title,
+            "duplicate_of": first_index if index != first_index else None,
+            **outcome
         }
-        
-        return final_course
+        return json.dumps(line) + "\n"
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Complete workflow error: {str(e)}")
+    async def stream():
+        tasks = [asyncio.ensure_future(run_course(indexes)) for indexes in groups.values()]
+        ready: Dict[int, str] = {}
+        next_index = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                indexes, outcome = await finished
+                for index in indexes:
+                    line = batch_line(index, indexes[0], outcome)
+                    if batch.order == "completion":
+                        yield line
+                    else:
+                        ready[index] = line
+                while next_index in ready:
+                    yield ready.pop(next_index)
+                    next_index += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+            release()
+    
+    headers = {
+        "X-Batch-Size": str(len(batch.courses)),
+        "X-Batch-Unique": str(len(groups)),
+        "X-Batch-Concurrency": str(limit)
+    }
+    # A batch is admitted as `limit` units of work, the most it can run at once
+    release = admission.release_once(admit_request(limit), limit)
+    return streaming_response(stream(), release, media_type="application/x-ndjson", headers=headers)
+
+@app.get("/runs/{run_id}")
+async def get_run(run_id: str):
+    """Status and checkpointed stages of a workflow run"""
+    record = await asyncio.to_thread(checkpoint_store.get_run, run_id) if checkpoint_store else None
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Run not found: {run_id}")
+    return record
+
+@app.post("/runs/similar")
+async def similar_runs(course_input: CourseInput, threshold: Optional[float] = None, limit: int = 5):
+    """
+    Prior runs whose course is near-identical to this one (MinHash similarity)
+    Runs must share the course level and week count to match
+    """
+    kwargs = {"threshold": threshold} if threshold is not None else {}
+    load_similarity_index()
+    matches = await asyncio.to_thread(similarity_index.query, workflow_input(course_input), limit=limit, **kwargs)
+    runs = []
+    for run_id, score in matches:
+        record = await asyncio.to_thread(checkpoint_store.get_run, run_id) if checkpoint_store else None
+        if record is not None:
+            runs.append({
+                "run_id": run_id,
+                "similarity": score,
+                "course_title": record["input"].get("course_title"),
+                "status": record["status"],
+                "created_at": record["created_at"]
+            })
+    return {"matches": runs, "indexed_runs": len(similarity_index)}
+
+@app.post("/runs/{run_id}/regenerate")
+async def regenerate_run(run_id: str, course_input: CourseInput, request: Request):
+    """
+    Incrementally regenerate a previous run for an edited CourseInput
+    Only the IPDAi sections and modules affected by the changed fields are
+    recomputed; unchanged modules are spliced in from the previous run
+    """
+    record = await asyncio.to_thread(checkpoint_store.get_run, run_id) if checkpoint_store else None
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Run not found: {run_id}")
+    
+    state = {
+        "regenerated_from": run_id,
+        "previous_input": record["input"],
+        "previous_outputs": await asyncio.to_thread(checkpoint_store.load_outputs, run_id)
+    }
+    return await run_course_workflow(course_input, request, uuid.uuid4().hex, state=state)
+
+@app.post("/runs/{run_id}/resume")
+async def resume_run(run_id: str, request: Request):
+    """
+    Resume a failed workflow run - completed agents are restored from their
+    checkpoints and only the remaining agents are executed
+    """
+    record = await asyncio.to_thread(checkpoint_store.get_run, run_id) if checkpoint_store else None
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Run not found: {run_id}")
+    
+    course_input = CourseInput(**record["input"])
+    return await run_course_workflow(course_input, request, run_id)
+
+def encode_stream_event(event: Dict[str, Any], use_sse: bool) -> str:
+    """Frame one workflow event as an SSE message or an NDJSON line"""
+    data = json.dumps(event)
+    if use_sse:
+        return f"event: {event['event']}\ndata: {data}\n\n"
+    return data + "\n"
+
+@app.post("/complete-workflow/stream")
+async def complete_workflow_stream_endpoint(course_input: CourseInput, request: Request, format: str = "ndjson"):
+    """
+    Streaming HAILEI workflow - emits each agent's result as soon as it finishes,
+    followed by the merged course document. NDJSON by default; server-sent events
+    with ?format=sse or an Accept: text/event-stream header
+    """
+    use_sse = format == "sse" or "text/event-stream" in request.headers.get("accept", "")
+    run_id = uuid.uuid4().hex
+    deadline_ms = request_deadline_ms(request, course_input)
+    events: asyncio.Queue = asyncio.Queue()
+    
+    async def on_stage_complete(name, result, run):
+        await events.put({
+            "event": "stage",
+            "agent": name,
+            "timing": run.timings[name].to_dict(run.started_at),
+            "result": result
+        })
+    
+    async def produce():
+        try:
+            run = await run_workflow(
+                workflow_input(course_input), request_tenant(request), request_priority(request),
+                on_stage_complete=on_stage_complete, run_id=run_id, deadline=Deadline.from_ms(deadline_ms),
+                reuse_similar=course_input.reuse_similar
+            )
+            await events.put({"event": "complete", "result": build_final_course(course_input, run)})
+        except Exception as e:
+            await events.put({"event": "error", "run_id": run_id, "detail": f"Complete workflow error: {str(e)}"})
+        finally:
+            await events.put(None)
+    
+    async def stream():
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield encode_stream_event(event, use_sse)
+        finally:
+            # Also reached when the client disconnects mid-stream, which
+            # cancels the run and every agent still in flight
+            producer.cancel()
+            release()
+    
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    # Admit before the response starts so a saturated server can still answer 429
+    release = admission.release_once(admit_request())
+    return streaming_response(
+        stream(), release, media_type=media_type, headers={"Cache-Control": "no-cache", "X-Run-Id": run_id}
+    )
+
+async def run_workflow_job(job):
+    """Job runner - records each agent's result on the job as it completes"""
+    course_input = CourseInput(**job.payload)
+    
+    async def on_stage_complete(name, result, run):
+        job.partial_results[name] = result
+    
+    # The deadline budget starts when a worker picks the job up, not at submission
+    run = await run_workflow(
+        workflow_input(course_input), job.tenant, job.priority, on_stage_complete=on_stage_complete,
+        run_id=job.id, deadline=Deadline.from_ms(course_input.deadline_ms),
+        reuse_similar=course_input.reuse_similar
+    )
+    return build_final_course(course_input, run)
+
+job_manager = JobManager(run_workflow_job)
+
+@app.post("/jobs", status_code=202)
+async def submit_job(course_input: CourseInput, request: Request):
+    """
+    Queue a complete HAILEI workflow and return immediately with a job id
+    Poll GET /jobs/{job_id} for status, partial results and the final course
+    """
+    try:
+        payload = {**course_input.dict(), "deadline_ms": request_deadline_ms(request, course_input)}
+        job = job_manager.submit(payload, request_tenant(request), request_priority(request, "bulk"))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "created_at": job.created_at.isoformat()
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, per-agent partial results and final output of a workflow job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict()
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running workflow job; agents already finished keep their partial results"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return {"job_id": job.id, "status": "cancelling" if job.task is not None else job.status}
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    """Per-tenant queue depth, in-flight work and wait times, plus admission control"""
+    return {**scheduler.stats(), "admission": admission.stats()}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the per-agent memoization cache"""
+    return stage_memo.get_stats()
+
+@app.get("/usage")
+async def usage_stats():
+    """LLM tokens, estimated cost and processing time per agent and per tenant"""
+    return usage_ledger.stats()
+
+@app.get("/runs/{run_id}/usage")
+async def run_usage(run_id: str):
+    """Per-agent usage of a recent workflow run"""
+    usage = usage_ledger.run_usage(run_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail=f"No usage recorded for run: {run_id}")
+    return usage
 
 @app.get("/agents/status")
 async def agents_status():
@@ -642,6 +1313,10 @@ async def agents_status():
         },
         "workflow_endpoints": {
             "complete": "/complete-workflow",
+            "stream": "/complete-workflow/stream",
+            "batch": "/complete-workflow/batch",
+            "jobs": "/jobs",
+            "usage": "/usage",
             "health": "/health",
             "docs": "/docs"
         },
@@ -649,7 +1324,8 @@ async def agents_status():
             "platform": "render",
             "environment": os.getenv("RENDER", "development"),
             "version": "1.0.0"
-        }
+        },
+        "jobs": job_manager.stats()
     }
 
 # Production server configuration
@@ -0,0 +1,162 @@
+"""
+HAILEI Stage Memoization - caches agent outputs keyed on a canonical input hash
+Retried or repeated requests with the same payload skip the agent entirely
+"""
+
+import copy
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from hashing import stable_hash
+
+DEFAULT_MEMO_MAX_ENTRIES = int(os.getenv("HAILEI_MEMO_MAX_ENTRIES", "1024"))
+DEFAULT_MEMO_TTL = float(os.getenv("HAILEI_MEMO_TTL", "3600"))
+DEFAULT_MEMO_DB = os.getenv("HAILEI_MEMO_DB")  # on-disk tier is off unless set
+
+
+class MemoryTier:
+    """Thread-safe LRU of (expires_at, value) entries"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskTier:
+    """SQLite-backed tier that survives restarts; expired rows are purged lazily"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._lock:
+            conn = sqlite3.connect(self.path, timeout=30)
+            try:
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS stage_memo (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                    )
+            finally:
+                conn.close()
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            conn = sqlite3.connect(self.path, timeout=30)
+            try:
+                with conn:
+                    return conn.execute(sql, params).fetchall()
+            finally:
+                conn.close()
+
+    def get(self, key: str) -> Optional[Any]:
+        rows = self._execute("SELECT value, expires_at FROM stage_memo WHERE key = ?", (key,))
+        if not rows:
+            return None
+        value, expires_at = rows[0]
+        if expires_at < time.time():
+            self._execute("DELETE FROM stage_memo WHERE key = ?", (key,))
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: float):
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO stage_memo (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), now + ttl)
+        )
+        self._execute("DELETE FROM stage_memo WHERE expires_at < ?", (now,))
+
+
+class StageMemo:
+    """Two-tier memoization for agent processing functions"""
+
+    def __init__(self, max_entries: int = DEFAULT_MEMO_MAX_ENTRIES, ttl: float = DEFAULT_MEMO_TTL,
+                 disk_path: Optional[str] = DEFAULT_MEMO_DB):
+        self.ttl = ttl
+        self.memory = MemoryTier(max_entries)
+        self.disk = DiskTier(disk_path) if disk_path else None
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str, outcome: str):
+        with self._stats_lock:
+            counters = self.stats.setdefault(name, {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def lookup(self, key: str) -> Tuple[Optional[Any], Optional[str]]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value, "memory_hits"
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value, self.ttl)
+                return value, "disk_hits"
+        return None, None
+
+    def store(self, key: str, value: Any):
+        self.memory.set(key, value, self.ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, self.ttl)
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """Memoize func under name; callers always receive their own copy of the result"""
+
+        @functools.wraps(func)
+        def memoized(*args, **kwargs):
+            key = f"{name}:{stable_hash({'args': args, 'kwargs': kwargs})}"
+            value, tier = self.lookup(key)
+            if value is not None:
+                self._count(name, tier)
+                return copy.deepcopy(value)
+
+            self._count(name, "misses")
+            result = func(*args, **kwargs)
+            if not (isinstance(result, dict) and "error" in result):
+                self.store(key, copy.deepcopy(result))
+            return result
+
+        return memoized
+
+    def wrap_agent(self, agent: Any, name: str, methods: Sequence[str]) -> Any:
+        """Replace the given methods on an agent instance with memoized versions"""
+        for method in methods:
+            setattr(agent, method, self.wrap(f"{name}.{method}", getattr(agent, method)))
+        return agent
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            per_function = {name: dict(counters) for name, counters in self.stats.items()}
+        return {
+            "memory_entries": len(self.memory),
+            "disk_enabled": self.disk is not None,
+            "ttl_seconds": self.ttl,
+            "functions": per_function
+        }
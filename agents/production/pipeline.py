@@ -0,0 +1,95 @@
+"""
+HAILEI Module Pipeline - streams course modules through per-module agent stages
+Module 1 can be enriched by SearchAi while CAuthAi is still authoring module 2
+"""
+
+import asyncio
+import os
+from typing import Any, Callable, List, Optional, Sequence
+
+DEFAULT_PIPELINE_WORKERS = int(os.getenv("HAILEI_PIPELINE_WORKERS", "4"))
+
+
+class ModulePipeline:
+    """Runs every item through a chain of stages with bounded parallelism
+
+    Each item moves to the next stage as soon as it leaves the previous one.
+    At most `max_workers` items are in flight at once, and each stage's
+    outputs are reassembled in the original item order.
+    """
+
+    def __init__(self, stages: Sequence[Callable[[Any], Any]], max_workers: int = DEFAULT_PIPELINE_WORKERS):
+        if not stages:
+            raise ValueError("ModulePipeline needs at least one stage")
+        self.stages = list(stages)
+        self.max_workers = max(1, max_workers)
+        self._outputs: List[List[Any]] = []
+        self._remaining: List[int] = []
+        self._done: List[asyncio.Future] = []
+        self._tasks: List[asyncio.Task] = []
+        self._failed_at: Optional[int] = None
+
+    def start(self, items: Sequence[Any]) -> "ModulePipeline":
+        """Schedule all items; must be called from a running event loop"""
+        loop = asyncio.get_running_loop()
+        count = len(items)
+        self._outputs = [[None] * count for _ in self.stages]
+        self._remaining = [count for _ in self.stages]
+        self._done = [loop.create_future() for _ in self.stages]
+        self._failed_at = None
+        if count == 0:
+            for future in self._done:
+                future.set_result([])
+            return self
+
+        slots = asyncio.Semaphore(self.max_workers)
+        self._tasks = [
+            asyncio.ensure_future(self._process(index, item, slots))
+            for index, item in enumerate(items)
+        ]
+        return self
+
+    async def _process(self, index: int, item: Any, slots: asyncio.Semaphore):
+        loop = asyncio.get_running_loop()
+        stage_index = 0
+        try:
+            async with slots:
+                value = item
+                for stage_index, func in enumerate(self.stages):
+                    # Items stop before a stage that has already failed, but still
+                    # finish the stages before it
+                    if self._failed_at is not None and stage_index >= self._failed_at:
+                        return
+                    value = await loop.run_in_executor(None, func, value)
+                    self._outputs[stage_index][index] = value
+                    self._remaining[stage_index] -= 1
+                    if self._remaining[stage_index] == 0:
+                        self._done[stage_index].set_result(self._outputs[stage_index])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail(stage_index, e)
+
+    def _fail(self, stage_index: int, error: Exception):
+        """Fail the stage that raised and every stage after it; earlier stages still complete"""
+        if self._failed_at is None or stage_index < self._failed_at:
+            self._failed_at = stage_index
+        for future in self._done[stage_index:]:
+            if not future.done():
+                future.set_exception(error)
+                # Mark as retrieved so stages nobody awaits don't log a warning
+                future.exception()
+
+    def cancel(self):
+        for task in self._tasks:
+            if not task.done():
+                task.cancel()
+
+    async def stage_output(self, stage_index: int) -> List[Any]:
+        """Wait until every item has cleared the given stage; outputs are in item order"""
+        return await asyncio.shield(self._done[stage_index])
+
+    async def run(self, items: Sequence[Any]) -> List[Any]:
+        """Run all items through every stage and return the final stage's outputs"""
+        self.start(items)
+        return await self.stage_output(len(self.stages) - 1)
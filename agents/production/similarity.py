@@ -0,0 +1,147 @@
+"""
+HAILEI Course Similarity Index - MinHash/LSH over past course inputs
+Near-identical requests ("Intro to AI" vs "Introduction to Artificial Intelligence")
+find the closest prior run so its generation can be adapted instead of redone
+"""
+
+import hashlib
+import os
+import random
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+DEFAULT_SIMILARITY_THRESHOLD = float(os.getenv("HAILEI_SIMILARITY_THRESHOLD", "0.8"))
+DEFAULT_SIMILARITY_MAX_RUNS = int(os.getenv("HAILEI_SIMILARITY_MAX_RUNS", "1000"))
+
+# Common abbreviations in course titles, expanded before shingling
+ABBREVIATIONS = {
+    "intro": "introduction",
+    "ai": "artificial intelligence",
+    "ml": "machine learning",
+    "dl": "deep learning",
+    "nlp": "natural language processing",
+    "cs": "computer science",
+    "stats": "statistics",
+    "fundamentals": "foundations",
+    "basics": "foundations",
+    "mgmt": "management",
+    "dev": "development",
+    "&": "and"
+}
+STOPWORDS = {"a", "an", "the", "to", "of", "for", "in", "on", "and", "with", "course"}
+
+# Fields that fix the shape of the output; runs only match when these are equal
+STRUCTURAL_FIELDS = ("course_level", "weeks")
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normalize(text: str) -> List[str]:
+    tokens = []
+    for token in re.findall(r"[a-z0-9&]+", text.lower()):
+        tokens.extend(ABBREVIATIONS.get(token, token).split())
+    return [token for token in tokens if token not in STOPWORDS]
+
+
+def course_text(course: Dict[str, Any]) -> str:
+    parts = [course.get("course_title", ""), course.get("course_description", ""), course.get("course_domain", "")]
+    parts.extend(course.get("goals", []))
+    return " ".join(parts)
+
+
+def shingles(course: Dict[str, Any], size: int = 4) -> Set[str]:
+    """Character shingles of the normalized course text, robust to small wording changes"""
+    text = " ".join(normalize(course_text(course)))
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def structure_key(course: Dict[str, Any]) -> Tuple:
+    return tuple(course.get(field) for field in STRUCTURAL_FIELDS)
+
+
+class MinHasher:
+    """Fixed family of universal hash functions producing MinHash signatures"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.params = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+
+    def signature(self, items: Set[str]) -> Tuple[int, ...]:
+        hashes = [int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big") for item in items]
+        return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self.params)
+
+    @staticmethod
+    def similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+        return sum(1 for x, y in zip(left, right) if x == y) / len(left)
+
+
+class SimilarityIndex:
+    """LSH-banded MinHash index of run inputs, bounded to the most recent runs
+
+    Banding only narrows the candidates; every candidate is scored on its full
+    signature and must match the structural fields exactly.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, max_runs: int = DEFAULT_SIMILARITY_MAX_RUNS):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_runs = max_runs
+        self._runs: "OrderedDict[str, Tuple[Tuple, Tuple[int, ...]]]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, run_id: str, course: Dict[str, Any]):
+        signature = self.hasher.signature(shingles(course))
+        with self._lock:
+            if run_id in self._runs:
+                self._remove(run_id)
+            self._runs[run_id] = (structure_key(course), signature)
+            for key in self._band_keys(signature):
+                self._buckets[key].add(run_id)
+            while len(self._runs) > self.max_runs:
+                self._remove(next(iter(self._runs)))
+
+    def _remove(self, run_id: str):
+        _, signature = self._runs.pop(run_id)
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(run_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def query(self, course: Dict[str, Any], threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+              limit: int = 5, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Prior runs at or above threshold, most similar first"""
+        signature = self.hasher.signature(shingles(course))
+        structure = structure_key(course)
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            scored = [
+                (run_id, self.hasher.similarity(signature, self._runs[run_id][1]))
+                for run_id in candidates
+                if run_id != exclude and self._runs[run_id][0] == structure
+            ]
+        matches = [(run_id, round(score, 3)) for run_id, score in scored if score >= threshold]
+        return sorted(matches, key=lambda match: -match[1])[:limit]
+
+    def __contains__(self, run_id: str) -> bool:
+        return run_id in self._runs
+
+    def __len__(self) -> int:
+        return len(self._runs)
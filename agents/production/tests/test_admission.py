@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def test_units_count_against_the_limit_until_released():
+    admission = AdmissionController(max_in_flight=2, max_queued=2)
+    batch = admission.acquire(3)
+    single = admission.acquire()
+
+    assert admission.admitted == 4 and admission.saturated
+    with pytest.raises(AdmissionRejected):
+        admission.acquire()
+
+    admission.release(batch, 3)
+    assert admission.admitted == 1 and not admission.saturated
+    admission.release(single)
+    assert admission.admitted == 0
+    assert admission.stats()["accepted_total"] == 2 and admission.stats()["rejected_total"] == 1
+
+
+def test_oversized_requests_are_capped_at_the_limit():
+    admission = AdmissionController(max_in_flight=1, max_queued=1)
+    admitted_at = admission.acquire(10)
+
+    assert admission.admitted == 2
+    admission.release(admitted_at, 10)
+    assert admission.admitted == 0
+
+
+def test_retry_after_grows_with_backlog_and_average_duration():
+    admission = AdmissionController(max_in_flight=2, max_queued=4)
+    admission.avg_duration = 4.0
+    for _ in range(6):
+        admission.acquire()
+
+    # Five waiting units ahead (4 queued + this one) at two at a time: 2.5 waves of 4s
+    assert admission.queue_depth == 4
+    assert admission.retry_after() == 10
+    with pytest.raises(AdmissionRejected) as error:
+        admission.acquire()
+    assert error.value.retry_after == 10
+
+
+def test_only_single_unit_releases_feed_the_average_duration():
+    admission = AdmissionController(max_in_flight=4, smoothing=0.5)
+    admission.avg_duration = 0.0
+
+    admission.release(admission.acquire(3) - 10.0, 3)
+    assert admission.avg_duration == 0.0
+
+    admission.release(time.perf_counter() - 2.0)
+    assert admission.avg_duration == pytest.approx(1.0, abs=0.01)
+
+
+def test_release_once_releases_on_the_first_call_only():
+    admission = AdmissionController(max_in_flight=3, max_queued=0)
+    release = admission.release_once(admission.acquire(2), 2)
+    other = admission.acquire()
+
+    release()
+    release()
+    # A second release would have freed the other request's unit too
+    assert admission.admitted == 1
+    admission.release(other)
+    assert admission.admitted == 0
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from workflow_engine import Deadline, Stage, WorkflowEngine, WorkflowError
+
+
+def sleeper(seconds, value):
+    async def func(run):
+        await asyncio.sleep(seconds)
+        return value
+    return func
+
+
+def test_budget_is_split_by_weight_along_the_heaviest_remaining_chain():
+    engine = WorkflowEngine([
+        Stage("a", sleeper(0, None), weight=1),
+        Stage("b", sleeper(0, None), ("a",), weight=3),
+        Stage("c", sleeper(0, None), ("a",), weight=1),
+    ])
+    deadline = Deadline(8.0)
+
+    assert engine.path_weight == {"a": 4, "b": 3, "c": 1}
+    assert engine.stage_budget(engine.stages["a"], deadline) == pytest.approx(2.0, abs=0.05)
+    assert engine.stage_budget(engine.stages["b"], deadline) == pytest.approx(8.0, abs=0.05)
+    assert engine.stage_budget(engine.stages["c"], deadline) == pytest.approx(8.0, abs=0.05)
+
+
+def test_overrunning_stage_is_replaced_by_its_fallback():
+    engine = WorkflowEngine([
+        Stage("slow", sleeper(1.0, "real"), fallback=lambda run: "template"),
+        Stage("after", lambda run: run.results["slow"] + "!", ("slow",)),
+    ])
+    run = asyncio.run(engine.run({}, deadline=Deadline(0.2)))
+
+    assert run.results == {"slow": "template", "after": "template!"}
+    assert run.timings["slow"].fallback
+    assert run.timings["slow"].duration < 0.5
+    assert run.stage_timings()["slow"]["deadline_fallback"] is True
+
+
+def test_stage_within_budget_keeps_its_real_output():
+    engine = WorkflowEngine([Stage("fast", sleeper(0.01, "real"), fallback=lambda run: "template")])
+    run = asyncio.run(engine.run({}, deadline=Deadline(1.0)))
+
+    assert run.results == {"fast": "real"}
+    assert not run.timings["fast"].fallback
+
+
+def test_stage_without_fallback_fails_the_run_when_over_budget():
+    engine = WorkflowEngine([Stage("slow", sleeper(1.0, "real"))])
+    with pytest.raises(WorkflowError, match="slow exceeded its deadline budget") as error:
+        asyncio.run(engine.run({}, deadline=Deadline(0.1)))
+
+    assert error.value.stage == "slow"
+
+
+def test_expired_deadline_goes_straight_to_the_fallback():
+    calls = []
+
+    def real(run):
+        calls.append("real")
+        return "real"
+
+    engine = WorkflowEngine([Stage("stage", real, fallback=lambda run: "template")])
+    run = asyncio.run(engine.run({}, deadline=Deadline(-1.0)))
+
+    assert run.results == {"stage": "template"}
+    assert calls == []
+
+
+def test_deadline_from_ms():
+    assert Deadline.from_ms(None) is None
+    assert Deadline.from_ms(0) is None
+    assert Deadline.from_ms(1500).budget == 1.5
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from jobs import JobManager, JobQueueFull
+
+
+def test_full_queue_retry_after_follows_depth_workers_and_job_duration():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def runner(job):
+            await release.wait()
+            return job.payload
+
+        manager = JobManager(runner, workers=2, max_queued=4)
+        manager.avg_duration = 3.0
+        for n in range(2):
+            manager.submit({"n": n})
+        await asyncio.sleep(0)  # both workers pick a job up
+        for n in range(4):
+            manager.submit({"n": n})
+        with pytest.raises(JobQueueFull) as error:
+            manager.submit({"n": "overflow"})
+        release.set()
+        await asyncio.sleep(0.01)
+        return manager, error.value.retry_after
+
+    manager, retry_after = asyncio.run(scenario())
+
+    # Five jobs ahead (4 queued + this one) on two workers: 2.5 waves of 3s
+    assert retry_after == 8
+    assert manager.stats()["jobs_by_status"] == {"completed": 6}
+
+
+def test_average_duration_learns_from_finished_jobs_but_not_cancelled_ones():
+    async def scenario():
+        async def runner(job):
+            await asyncio.sleep(job.payload["seconds"])
+
+        manager = JobManager(runner, workers=1, smoothing=0.5)
+        manager.avg_duration = 0.0
+        manager.submit({"seconds": 0.04})
+        await asyncio.sleep(0.08)
+        learned = manager.avg_duration
+        slow = manager.submit({"seconds": 5})
+        await asyncio.sleep(0.01)
+        manager.cancel(slow.id)
+        await asyncio.sleep(0.01)
+        return learned, manager.avg_duration, slow.status
+
+    learned, after_cancel, status = asyncio.run(scenario())
+
+    assert learned == pytest.approx(0.02, abs=0.01)
+    assert after_cancel == learned
+    assert status == "cancelled"
@@ -0,0 +1,72 @@
+import time
+
+from hashing import stable_hash
+from memo import StageMemo
+
+
+def counting(results=None):
+    calls = []
+
+    def agent(course):
+        calls.append(course)
+        return results.pop(0) if results else {"title": course["course_title"], "modules": [1, 2]}
+    return agent, calls
+
+
+def test_key_ignores_key_order_and_volatile_metadata():
+    first = {"course_title": "AI", "goals": ["a", "b"], "metadata": {"generated_date": "2024-01-01", "level": 1}}
+    reordered = {"metadata": {"level": 1, "generated_date": "2025-06-30"}, "goals": ["a", "b"], "course_title": "AI"}
+
+    assert stable_hash(first) == stable_hash(reordered)
+    assert stable_hash(first) != stable_hash({**first, "goals": ["b", "a"]})
+
+    memo = StageMemo(disk_path=None)
+    agent, calls = counting()
+    process = memo.wrap("IPDAi.process", agent)
+    process(first)
+    process(reordered)
+    process({**first, "course_title": "ML"})
+
+    assert len(calls) == 2
+    assert memo.get_stats()["functions"]["IPDAi.process"] == {"memory_hits": 1, "disk_hits": 0, "misses": 2}
+
+
+def test_entries_expire_after_the_ttl():
+    memo = StageMemo(ttl=0.05, disk_path=None)
+    agent, calls = counting()
+    process = memo.wrap("agent", agent)
+
+    process({"course_title": "AI"})
+    process({"course_title": "AI"})
+    time.sleep(0.06)
+    process({"course_title": "AI"})
+
+    assert len(calls) == 2
+
+
+def test_disk_tier_survives_a_restart_until_it_expires(tmp_path):
+    path = str(tmp_path / "memo.db")
+    agent, calls = counting()
+    StageMemo(ttl=0.2, disk_path=path).wrap("agent", agent)({"course_title": "AI"})
+
+    restarted = StageMemo(ttl=0.2, disk_path=path)
+    restarted.wrap("agent", agent)({"course_title": "AI"})
+    assert len(calls) == 1
+    assert restarted.get_stats()["functions"]["agent"]["disk_hits"] == 1
+
+    time.sleep(0.21)
+    StageMemo(ttl=0.2, disk_path=path).wrap("agent", agent)({"course_title": "AI"})
+    assert len(calls) == 2
+
+
+def test_errors_are_not_cached_and_callers_get_their_own_copy():
+    memo = StageMemo(disk_path=None)
+    agent, calls = counting([{"error": "missing goals"}, {"modules": [1]}])
+    process = memo.wrap("agent", agent)
+
+    assert process({"course_title": "AI"}) == {"error": "missing goals"}
+    result = process({"course_title": "AI"})
+    result["modules"].append("changed")
+
+    assert process({"course_title": "AI"}) == {"modules": [1]}
+    assert len(calls) == 2
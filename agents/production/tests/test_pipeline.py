@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from pipeline import ModulePipeline
+
+
+def test_outputs_keep_item_order_at_every_stage():
+    def author(n):
+        time.sleep(0.01 * (5 - n))
+        return n * 10
+
+    async def scenario():
+        pipeline = ModulePipeline([author, lambda n: n + 1], max_workers=3).start([1, 2, 3, 4])
+        return await pipeline.stage_output(0), await pipeline.stage_output(1)
+
+    assert asyncio.run(scenario()) == ([10, 20, 30, 40], [11, 21, 31, 41])
+
+
+def test_parallelism_is_bounded_by_max_workers():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def stage(n):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return n
+
+    assert asyncio.run(ModulePipeline([stage], max_workers=2).run(list(range(6)))) == list(range(6))
+    assert peak[0] == 2
+
+
+def test_failure_fails_only_the_stage_that_raised_and_later_ones():
+    def enrich(n):
+        if n == 30:
+            raise RuntimeError("enrich failed")
+        return n
+
+    async def scenario():
+        pipeline = ModulePipeline([lambda n: n * 10, enrich, lambda n: n], max_workers=2).start([1, 2, 3, 4, 5])
+        first = await pipeline.stage_output(0)
+        errors = []
+        for stage_index in (1, 2):
+            with pytest.raises(RuntimeError, match="enrich failed"):
+                await pipeline.stage_output(stage_index)
+            errors.append(stage_index)
+        return first, errors
+
+    assert asyncio.run(scenario()) == ([10, 20, 30, 40, 50], [1, 2])
+
+
+def test_empty_input_and_no_stages():
+    assert asyncio.run(ModulePipeline([lambda n: n]).run([])) == []
+    with pytest.raises(ValueError):
+        ModulePipeline([])
@@ -0,0 +1,107 @@
+import asyncio
+
+from scheduler import TenantScheduler, parse_weights
+
+
+async def hold(scheduler, tenant, priority, gate, entered=None):
+    async with scheduler.slot(tenant, priority):
+        if entered is not None:
+            entered.append(tenant)
+        await gate.wait()
+
+
+def test_tenants_are_served_in_proportion_to_their_weights():
+    async def scenario():
+        scheduler = TenantScheduler(capacity=1, interactive_reserve=0, weights={"a": 2, "b": 1})
+        gate = asyncio.Event()
+        order = []
+
+        async def job(tenant):
+            async with scheduler.slot(tenant, "bulk"):
+                order.append(tenant)
+
+        blocker = asyncio.ensure_future(hold(scheduler, "blocker", "bulk", gate))
+        await asyncio.sleep(0)
+        # "a" floods the queue before "b" submits anything
+        jobs = [asyncio.ensure_future(job("a")) for _ in range(6)]
+        jobs += [asyncio.ensure_future(job("b")) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocker, *jobs)
+        return order, scheduler.stats()
+
+    order, stats = asyncio.run(scenario())
+
+    assert order == ["a", "b", "a", "a", "b", "a", "a", "b", "a"]
+    assert stats["tenants"]["a"]["dispatched"] == 6 and stats["tenants"]["b"]["dispatched"] == 3
+    assert stats["in_flight"] == {"interactive": 0, "bulk": 0} and stats["queue_depth"] == 0
+
+
+def test_bulk_work_never_takes_the_interactive_reserve():
+    async def scenario():
+        scheduler = TenantScheduler(capacity=3, interactive_reserve=1, weights={})
+        gate = asyncio.Event()
+        entered = []
+
+        tasks = [asyncio.ensure_future(hold(scheduler, f"bulk{n}", "bulk", gate, entered)) for n in range(3)]
+        await asyncio.sleep(0)
+        bulk_only = list(entered)
+        tasks.append(asyncio.ensure_future(hold(scheduler, "user", "interactive", gate, entered)))
+        await asyncio.sleep(0)
+        snapshot = (bulk_only, list(entered), dict(scheduler.in_flight), scheduler.queue_depth())
+        gate.set()
+        await asyncio.gather(*tasks)
+        return snapshot, entered
+
+    (bulk_only, with_interactive, in_flight, queued), entered = asyncio.run(scenario())
+
+    assert bulk_only == ["bulk0", "bulk1"]
+    assert with_interactive == ["bulk0", "bulk1", "user"]
+    assert in_flight == {"interactive": 1, "bulk": 2} and queued == 1
+    assert sorted(entered) == ["bulk0", "bulk1", "bulk2", "user"]
+
+
+def test_interactive_requests_jump_queued_bulk_work():
+    async def scenario():
+        scheduler = TenantScheduler(capacity=1, interactive_reserve=0, weights={})
+        gate = asyncio.Event()
+        order = []
+
+        async def job(tenant, priority):
+            async with scheduler.slot(tenant, priority):
+                order.append(priority)
+
+        blocker = asyncio.ensure_future(hold(scheduler, "blocker", "bulk", gate))
+        await asyncio.sleep(0)
+        jobs = [asyncio.ensure_future(job("t", "bulk")) for _ in range(2)]
+        await asyncio.sleep(0)
+        jobs.append(asyncio.ensure_future(job("t", "interactive")))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocker, *jobs)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "bulk", "bulk"]
+
+
+def test_cancelled_waiter_leaves_the_queue_without_holding_a_slot():
+    async def scenario():
+        scheduler = TenantScheduler(capacity=1, interactive_reserve=0, weights={})
+        gate = asyncio.Event()
+
+        blocker = asyncio.ensure_future(hold(scheduler, "blocker", "bulk", gate))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(hold(scheduler, "t", "bulk", gate))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        queued = scheduler.queue_depth()
+        gate.set()
+        await blocker
+        return queued, dict(scheduler.in_flight)
+
+    assert asyncio.run(scenario()) == (0, {"interactive": 0, "bulk": 0})
+
+
+def test_parse_weights_skips_malformed_entries():
+    assert parse_weights("a=2, b = 0.5,broken,") == {"a": 2.0, "b": 0.5}
@@ -0,0 +1,87 @@
+from similarity import MinHasher, SimilarityIndex, normalize, shingles
+
+AI_COURSE = {
+    "course_title": "Introduction to Artificial Intelligence",
+    "course_description": "A practical first course in AI for non-technical learners",
+    "course_level": "Introductory",
+    "course_domain": "Computer Science",
+    "goals": ["Understand core AI concepts", "Evaluate AI applications"],
+    "weeks": 6,
+}
+
+BAKING_COURSE = {
+    "course_title": "Sourdough Baking",
+    "course_description": "Starters, hydration and shaping loaves at home",
+    "course_level": "Introductory",
+    "course_domain": "Culinary Arts",
+    "goals": ["Maintain a starter", "Bake an open-crumb loaf"],
+    "weeks": 6,
+}
+
+
+def test_abbreviations_and_stopwords_are_normalized():
+    assert normalize("Intro to AI & ML") == ["introduction", "artificial", "intelligence", "machine", "learning"]
+    assert shingles({"course_title": "Intro to AI"}) == shingles({"course_title": "Introduction to Artificial Intelligence"})
+
+
+def test_signature_similarity_tracks_jaccard():
+    hasher = MinHasher()
+    left = hasher.signature({"a", "b", "c", "d"})
+    right = hasher.signature({"a", "b", "c", "e"})
+
+    assert hasher.similarity(left, left) == 1.0
+    assert 0.3 < hasher.similarity(left, right) < 0.9
+    assert hasher.signature({"a", "b"}) == MinHasher().signature({"a", "b"})
+
+
+def test_near_duplicate_course_matches_and_unrelated_does_not():
+    index = SimilarityIndex()
+    index.add("ai", AI_COURSE)
+    index.add("baking", BAKING_COURSE)
+
+    matches = index.query({**AI_COURSE, "course_title": "Intro to AI"})
+
+    assert [run_id for run_id, _ in matches] == ["ai"]
+    assert matches[0][1] >= 0.8
+
+
+def test_structural_fields_must_match():
+    index = SimilarityIndex()
+    index.add("ai", AI_COURSE)
+
+    assert index.query(AI_COURSE) == [("ai", 1.0)]
+    assert index.query({**AI_COURSE, "weeks": 8}) == []
+    assert index.query({**AI_COURSE, "course_level": "Advanced"}) == []
+
+
+def test_threshold_limit_and_exclude():
+    index = SimilarityIndex()
+    index.add("exact", AI_COURSE)
+    index.add("close", {**AI_COURSE, "goals": AI_COURSE["goals"] + ["Discuss AI ethics"]})
+
+    assert [run_id for run_id, _ in index.query(AI_COURSE, threshold=0.5)] == ["exact", "close"]
+    assert [run_id for run_id, _ in index.query(AI_COURSE, threshold=0.5, limit=1)] == ["exact"]
+    assert [run_id for run_id, _ in index.query(AI_COURSE, threshold=0.5, exclude="exact")] == ["close"]
+    assert index.query(AI_COURSE, threshold=1.01) == []
+
+
+def test_index_keeps_only_the_most_recent_runs():
+    index = SimilarityIndex(max_runs=2)
+    index.add("first", AI_COURSE)
+    index.add("second", BAKING_COURSE)
+    index.add("third", {**AI_COURSE, "weeks": 8})
+
+    assert len(index) == 2
+    assert "first" not in index and "third" in index
+    assert index.query(AI_COURSE) == []
+    assert not any("first" in bucket for bucket in index._buckets.values())
+
+
+def test_re_adding_a_run_replaces_its_entry():
+    index = SimilarityIndex()
+    index.add("run", AI_COURSE)
+    index.add("run", BAKING_COURSE)
+
+    assert len(index) == 1
+    assert index.query(AI_COURSE) == []
+    assert index.query(BAKING_COURSE) == [("run", 1.0)]
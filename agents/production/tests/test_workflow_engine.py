@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+
+from workflow_engine import Stage, WorkflowEngine, WorkflowError
+
+
+def recording_stage(name, log, depends_on=(), delay=0.05):
+    async def func(run):
+        log.append(("start", name))
+        await asyncio.sleep(delay)
+        log.append(("end", name))
+        return {name: [run.results[dep] for dep in depends_on]}
+    return Stage(name, func, depends_on)
+
+
+def test_stages_start_only_after_their_dependencies_finish():
+    log = []
+    engine = WorkflowEngine([
+        recording_stage("d", log, ("b", "c")),
+        recording_stage("b", log, ("a",)),
+        recording_stage("c", log, ("a",)),
+        recording_stage("a", log),
+    ])
+    run = asyncio.run(engine.run({}))
+
+    assert engine.order == ["a", "b", "c", "d"]
+    for stage, deps in {"b": ("a",), "c": ("a",), "d": ("b", "c")}.items():
+        for dep in deps:
+            assert log.index(("end", dep)) < log.index(("start", stage))
+    assert run.results["d"] == {"d": [{"b": [{"a": []}]}, {"c": [{"a": []}]}]}
+    assert set(run.timings) == {"a", "b", "c", "d"}
+
+
+def test_independent_stages_run_concurrently():
+    log = []
+    engine = WorkflowEngine([recording_stage(name, log, delay=0.2) for name in ("a", "b", "c")])
+    started = time.perf_counter()
+    asyncio.run(engine.run({}))
+
+    assert time.perf_counter() - started < 0.5
+    assert [kind for kind, _ in log[:3]] == ["start"] * 3
+
+
+def test_plain_functions_run_off_the_event_loop():
+    def blocking(run):
+        time.sleep(0.2)
+        return "slow"
+
+    async def ticker(run):
+        ticks = 0
+        for _ in range(4):
+            await asyncio.sleep(0.02)
+            ticks += 1
+        return ticks
+
+    run = asyncio.run(WorkflowEngine([Stage("slow", blocking), Stage("ticker", ticker)]).run({}))
+
+    assert run.results == {"slow": "slow", "ticker": 4}
+    assert run.timings["ticker"].finished_at < run.timings["slow"].finished_at
+
+
+def test_stage_callbacks_see_results_in_completion_order():
+    seen = []
+
+    async def on_stage_complete(name, result, run):
+        seen.append((name, result))
+
+    engine = WorkflowEngine([
+        Stage("a", lambda run: 1),
+        Stage("b", lambda run: run.results["a"] + 1, ("a",)),
+    ])
+    asyncio.run(engine.run({}, on_stage_complete=on_stage_complete))
+
+    assert seen == [("a", 1), ("b", 2)]
+
+
+def test_cycles_unknown_and_duplicate_stages_are_rejected():
+    with pytest.raises(WorkflowError, match="Cycle detected between stages: a, b"):
+        WorkflowEngine([Stage("a", lambda run: None, ("b",)), Stage("b", lambda run: None, ("a",))])
+    with pytest.raises(WorkflowError, match="unknown stage 'missing'"):
+        WorkflowEngine([Stage("a", lambda run: None, ("missing",))])
+    with pytest.raises(WorkflowError, match="Duplicate stage: a"):
+        WorkflowEngine([Stage("a", lambda run: None), Stage("a", lambda run: None)])
+
+
+def test_failing_stage_names_itself_and_skips_its_dependents():
+    calls = []
+
+    def broken(run):
+        raise ValueError("boom")
+
+    engine = WorkflowEngine([
+        Stage("a", broken),
+        Stage("b", lambda run: calls.append("b"), ("a",)),
+    ])
+    with pytest.raises(WorkflowError, match="a failed: boom") as error:
+        asyncio.run(engine.run({}))
+
+    assert error.value.stage == "a"
+    assert calls == []
@@ -0,0 +1,98 @@
+"""
+HAILEI Usage Ledger - per-agent LLM tokens, estimated cost and processing time
+Rolled up per agent, per tenant and per run from the usage each agent reports
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Agents report metadata.usage in this shape (see agents/core/usage.py);
+# template agents make no LLM calls and report zeros
+EMPTY_USAGE = {
+    "calls": 0,
+    "cached_calls": 0,
+    "prompt_tokens": 0,
+    "completion_tokens": 0,
+    "total_tokens": 0,
+    "estimated_cost_usd": 0.0
+}
+
+
+class UsageTotals:
+    """Summed usage of a set of agent runs"""
+
+    def __init__(self):
+        self.runs = 0
+        self.usage = dict(EMPTY_USAGE)
+        self.processing_time = 0.0
+
+    def add(self, usage: Dict[str, Any], processing_time: float):
+        self.runs += 1
+        for key in EMPTY_USAGE:
+            self.usage[key] += usage.get(key, 0)
+        self.processing_time += processing_time
+
+    def merge(self, other: "UsageTotals"):
+        self.add(other.usage, other.processing_time)
+        self.runs += other.runs - 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "agent_runs": self.runs,
+            **self.usage,
+            "estimated_cost_usd": round(self.usage["estimated_cost_usd"], 6),
+            "processing_time": f"{self.processing_time:.3f}s"
+        }
+
+
+class UsageLedger:
+    """Process-wide usage per agent and tenant, plus the most recent runs"""
+
+    def __init__(self, max_runs: int = 1000):
+        self.max_runs = max_runs
+        self.total = UsageTotals()
+        self.by_agent: Dict[str, UsageTotals] = {}
+        self.by_tenant: Dict[str, UsageTotals] = {}
+        self.runs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, usage: Dict[str, Any], processing_time: float,
+               tenant: str = "default", run_id: Optional[str] = None):
+        with self._lock:
+            for totals in (self.total, self.by_agent.setdefault(agent, UsageTotals()),
+                           self.by_tenant.setdefault(tenant, UsageTotals())):
+                totals.add(usage, processing_time)
+            if run_id is None:
+                return
+            if run_id not in self.runs:
+                self.runs[run_id] = {"tenant": tenant, "agents": {}}
+                while len(self.runs) > self.max_runs:
+                    self.runs.popitem(last=False)
+            agents = self.runs[run_id]["agents"]
+            agents.setdefault(agent, UsageTotals()).add(usage, processing_time)
+
+    def run_usage(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Usage of one recent run, per agent and in total"""
+        with self._lock:
+            record = self.runs.get(run_id)
+            if record is None:
+                return None
+            total = UsageTotals()
+            for totals in record["agents"].values():
+                total.merge(totals)
+            return {
+                "run_id": run_id,
+                "tenant": record["tenant"],
+                "total": total.to_dict(),
+                "agents": {agent: totals.to_dict() for agent, totals in record["agents"].items()}
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total": self.total.to_dict(),
+                "agents": {agent: totals.to_dict() for agent, totals in self.by_agent.items()},
+                "tenants": {tenant: totals.to_dict() for tenant, totals in self.by_tenant.items()},
+                "recent_runs": len(self.runs)
+            }
@@ -0,0 +1,266 @@
+"""
+HAILEI Workflow Engine - DAG-based agent orchestration
+Runs each agent as soon as the stages it depends on have finished
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from hashing import stable_hash
+
+
+class WorkflowError(Exception):
+    """Raised when a workflow stage fails or the DAG is invalid"""
+
+    def __init__(self, message: str, stage: Optional[str] = None):
+        super().__init__(message)
+        self.stage = stage
+
+
+@dataclass
+class Stage:
+    """A single node in the workflow DAG
+
+    `func` receives the WorkflowRun and returns the stage output. It may be a
+    coroutine function or a plain function; plain functions run in the default
+    executor so a slow agent never blocks the event loop.
+    """
+    name: str
+    func: Callable[["WorkflowRun"], Any]
+    depends_on: Tuple[str, ...] = ()
+    # Relative share of a run's deadline budget, and a cheap template
+    # producer used when the stage runs out of budget
+    weight: float = 1.0
+    fallback: Optional[Callable[["WorkflowRun"], Any]] = None
+
+
+class Deadline:
+    """Absolute time budget for a workflow run"""
+
+    def __init__(self, budget_seconds: float):
+        self.budget = budget_seconds
+        self.expires_at = time.perf_counter() + budget_seconds
+
+    @classmethod
+    def from_ms(cls, budget_ms: Optional[int]) -> Optional["Deadline"]:
+        return cls(budget_ms / 1000.0) if budget_ms else None
+
+    def remaining(self) -> float:
+        return self.expires_at - time.perf_counter()
+
+
+@dataclass
+class StageTiming:
+    """Wall-clock timing recorded for one stage of a run"""
+    started_at: float
+    finished_at: float
+    restored: bool = False
+    fallback: bool = False
+
+    @property
+    def duration(self) -> float:
+        return self.finished_at - self.started_at
+
+    def to_dict(self, run_started_at: float) -> Dict[str, Any]:
+        timing = {
+            "start_offset": f"{self.started_at - run_started_at:.3f}s",
+            "end_offset": f"{self.finished_at - run_started_at:.3f}s",
+            "duration": f"{self.duration:.3f}s"
+        }
+        if self.restored:
+            timing["restored_from_checkpoint"] = True
+        if self.fallback:
+            timing["deadline_fallback"] = True
+        return timing
+
+
+@dataclass
+class WorkflowRun:
+    """State for one execution of a workflow"""
+    input: Dict[str, Any]
+    run_id: Optional[str] = None
+    deadline: Optional[Deadline] = None
+    results: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, StageTiming] = field(default_factory=dict)
+    state: Dict[str, Any] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.perf_counter)
+    start_time: datetime = field(default_factory=datetime.now)
+    finished_at: Optional[float] = None
+
+    @property
+    def total_time(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    def stage_timings(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage timings relative to the start of the run"""
+        return {
+            name: timing.to_dict(self.started_at)
+            for name, timing in self.timings.items()
+        }
+
+
+StageCallback = Callable[[str, Any, WorkflowRun], Awaitable[None]]
+
+
+class WorkflowEngine:
+    """Executes a set of stages as a DAG with maximum concurrency
+
+    With a checkpoint store, every stage output is persisted under the run id
+    and a hash of the stage's inputs, and a repeated run with the same id
+    reuses those outputs instead of executing the stage again.
+
+    With a deadline, each stage gets the share of the remaining budget given
+    by its weight relative to the heaviest chain of stages still ahead of it.
+    A stage that overruns is cancelled and replaced by its fallback output.
+    """
+
+    def __init__(self, stages: Sequence[Stage], checkpoints=None):
+        self.checkpoints = checkpoints
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise WorkflowError(f"Duplicate stage: {stage.name}", stage.name)
+            self.stages[stage.name] = stage
+        self.order = self._topological_order()
+        self.path_weight = self._path_weights()
+
+    def _topological_order(self) -> List[str]:
+        """Validate dependencies and return a deterministic topological order"""
+        for stage in self.stages.values():
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise WorkflowError(f"Stage '{stage.name}' depends on unknown stage '{dep}'", stage.name)
+
+        order = []
+        remaining = {name: set(stage.depends_on) for name, stage in self.stages.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise WorkflowError(f"Cycle detected between stages: {', '.join(sorted(remaining))}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    def _path_weights(self) -> Dict[str, float]:
+        """Weight of the heaviest chain from each stage to the end of the DAG"""
+        path_weight: Dict[str, float] = {}
+        for name in reversed(self.order):
+            children = [child for child, stage in self.stages.items() if name in stage.depends_on]
+            path_weight[name] = self.stages[name].weight + max((path_weight[c] for c in children), default=0.0)
+        return path_weight
+
+    def stage_budget(self, stage: Stage, deadline: Deadline) -> float:
+        return deadline.remaining() * stage.weight / self.path_weight[stage.name]
+
+    def stage_input_hash(self, stage: Stage, run: WorkflowRun) -> str:
+        """Hash of everything a stage can read: the run input and its dependencies' outputs
+
+        Volatile metadata (timestamps, processing time, usage) is ignored, so a
+        restored dependency matches the stamped output the stage originally read.
+        """
+        return stable_hash({
+            "input": run.input,
+            "depends_on": {dep: run.results[dep] for dep in stage.depends_on}
+        })
+
+    async def _run_stage(self, stage: Stage, run: WorkflowRun) -> Any:
+        started = time.perf_counter()
+        use_checkpoints = self.checkpoints is not None and run.run_id is not None
+        if use_checkpoints:
+            input_hash = self.stage_input_hash(stage, run)
+            saved = await asyncio.to_thread(self.checkpoints.load, run.run_id, stage.name, input_hash)
+            if saved is not None:
+                run.timings[stage.name] = StageTiming(started, time.perf_counter(), restored=True)
+                return saved
+
+        budget = self.stage_budget(stage, run.deadline) if run.deadline is not None else None
+        try:
+            if budget is not None and budget <= 0:
+                raise asyncio.TimeoutError()
+            result = await asyncio.wait_for(self._call(stage.func, run), budget)
+        except asyncio.TimeoutError:
+            if stage.fallback is None:
+                raise WorkflowError(f"{stage.name} exceeded its deadline budget", stage.name)
+            # Fallback output is never checkpointed, so a resume retries the real stage
+            result = await self._call(stage.fallback, run)
+            run.timings[stage.name] = StageTiming(started, time.perf_counter(), fallback=True)
+            return result
+
+        if use_checkpoints:
+            await asyncio.to_thread(self.checkpoints.save, run.run_id, stage.name, input_hash, result)
+        run.timings[stage.name] = StageTiming(started, time.perf_counter())
+        return result
+
+    async def _call(self, func: Callable[[WorkflowRun], Any], run: WorkflowRun) -> Any:
+        if asyncio.iscoroutinefunction(func):
+            return await func(run)
+        # Executor threads cannot be interrupted; on cancellation the stage's
+        # result is discarded but the thread runs to completion
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, run)
+
+    async def run(self, input_data: Dict[str, Any], on_stage_complete: Optional[StageCallback] = None,
+                  run_id: Optional[str] = None, state: Optional[Dict[str, Any]] = None,
+                  deadline: Optional[Deadline] = None) -> WorkflowRun:
+        """Run every stage, starting each one as soon as its dependencies finish
+
+        Passing the run id of an earlier, failed run resumes it: stages whose
+        checkpointed inputs still match are restored rather than re-executed.
+        `state` seeds the run's scratch space shared by the stage functions.
+        Cancelling the task awaiting run() cancels every stage in flight.
+        """
+        run = WorkflowRun(input=input_data, run_id=run_id, state=dict(state or {}), deadline=deadline)
+        if self.checkpoints is not None and run_id is not None:
+            await asyncio.to_thread(self.checkpoints.start_run, run_id, input_data)
+        pending = {name: set(self.stages[name].depends_on) for name in self.order}
+        running: Dict[asyncio.Task, str] = {}
+
+        def launch_ready():
+            for name in [n for n, deps in pending.items() if not deps]:
+                del pending[name]
+                task = asyncio.ensure_future(self._run_stage(self.stages[name], run))
+                running[task] = name
+
+        try:
+            launch_ready()
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    try:
+                        result = task.result()
+                    except WorkflowError as e:
+                        await self._record_failure(run, str(e))
+                        raise
+                    except Exception as e:
+                        await self._record_failure(run, f"{name} failed: {str(e)}")
+                        raise WorkflowError(f"{name} failed: {str(e)}", name) from e
+                    run.results[name] = result
+                    for deps in pending.values():
+                        deps.discard(name)
+                    if on_stage_complete is not None:
+                        await on_stage_complete(name, result, run)
+                launch_ready()
+        except asyncio.CancelledError:
+            await self._record_failure(run, "cancelled", status="cancelled")
+            raise
+        finally:
+            for task in running:
+                task.cancel()
+            run.finished_at = time.perf_counter()
+
+        if self.checkpoints is not None and run_id is not None:
+            await asyncio.to_thread(self.checkpoints.finish_run, run_id, "completed")
+        return run
+
+    async def _record_failure(self, run: WorkflowRun, error: str, status: str = "failed"):
+        if self.checkpoints is not None and run.run_id is not None:
+            # SQLite writes run in a worker thread so they never block the event loop
+            await asyncio.to_thread(self.checkpoints.finish_run, run.run_id, status, error)
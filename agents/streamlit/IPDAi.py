@@ -1,10 +1,14 @@
 import streamlit as st
 import json
+import sys
 from datetime import datetime
-import openai
 import os
 from typing import Dict, List
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+from llm_client import get_client
+from prompts import registry as prompts
+
 st.set_page_config(page_title="IPDAi - AI Course Planning Agent", layout="wide")
 
 st.title("🤖 IPDAi - AI-Powered Course Planning Agent")
@@ -13,39 +17,41 @@ st.markdown("**True AI Generation:** Uses OpenAI GPT to intelligently create KDK
 # OpenAI API Setup
 @st.cache_data
 def setup_openai():
-    """Setup OpenAI client"""
+    """Find the OpenAI API key"""
     api_key = st.secrets.get("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY")
     if not api_key:
         st.error("⚠️ OpenAI API key required. Set OPENAI_API_KEY environment variable or add to Streamlit secrets.")
         st.info("For demo purposes, you can still use the template-based generation below.")
         return None
-    openai.api_key = api_key
-    return True
+    return api_key
 
 # API key input fallback
-if not setup_openai():
+api_key = setup_openai()
+if not api_key:
     api_key_input = st.text_input("Enter OpenAI API Key (optional - for true AI generation):", type="password")
     if api_key_input:
-        openai.api_key = api_key_input
+        api_key = api_key_input
         st.success("✅ OpenAI API key configured!")
-        st.rerun()
 
-def generate_with_ai(prompt: str) -> str:
-    """Generate content using OpenAI API"""
+fresh_output = st.checkbox("Fresh AI output (skip cached responses)", value=False)
+
+def stream_with_ai(prompt: str):
+    """Stream content from the shared pooled LLM client as it is generated"""
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert instructional designer specializing in KDKA and PRRR pedagogical frameworks. Generate educational content that is pedagogically sound, engaging, and appropriate for the specified course level."},
-                {"role": "user", "content": prompt}
-            ],
+        yield from get_client(api_key).chat_stream_sync(
+            prompts.messages(prompt),
             max_tokens=500,
-            temperature=0.7
+            temperature=0.7,
+            bypass_cache=fresh_output
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
         st.error(f"AI generation failed: {e}")
+
+def generate_with_ai(prompt: str) -> str:
+    """Render the AI response as it streams in, then return the full text"""
+    if not api_key:
         return None
+    return st.write_stream(stream_with_ai(prompt)) or None
 
 # Initialize session state
 for key in ['objectives_generated', 'frameworks_generated', 'modules_generated']:
@@ -80,53 +86,37 @@ if ready_for_ai:
     # Generate Learning Objectives
     with col1:
         if st.button("🎯 Generate Learning Objectives", type="primary", disabled=st.session_state.objectives_generated):
-            with st.spinner("🧠 AI generating learning objectives..."):
-                # Create AI prompt for learning objectives
-                prompt = f"""
-Create pedagogically sound learning objectives for this course:
-
-Course: {course_title}
-Description: {course_desc}
-Level: {course_level}
-Goals: {', '.join(goals)}
-
-Generate:
-1. ONE Terminal Learning Objective (TLO) using appropriate Bloom's taxonomy verbs for {course_level} level
-2. 5-6 Enabling Learning Objectives (ELOs) that support the TLO
-
-Requirements:
-- Use Bloom's taxonomy verbs appropriate for {course_level} level
-- Make objectives measurable and specific
-- Align with course goals
-- Format as: TLO: [single paragraph], ELOs: [bulleted list]
-"""
+            # Same shared-prefix prompt as the IPDAi API (see core/prompts.py)
+            prompt = prompts.render(
+                "learning_objectives", course_title=course_title, course_description=course_desc,
+                course_level=course_level, goals=goals
+            )
+            
+            # Try AI generation first, fallback to templates
+            ai_result = generate_with_ai(prompt)
+            if ai_result and api_key:
+                # Parse AI response (simple parsing)
+                lines = ai_result.split('\n')
+                tlo_line = next((line for line in lines if 'TLO:' in line), '')
+                tlo = tlo_line.replace('TLO:', '').strip() if tlo_line else ai_result.split('\n')[0]
                 
-                # Try AI generation first, fallback to templates
-                ai_result = generate_with_ai(prompt)
-                if ai_result and openai.api_key:
-                    # Parse AI response (simple parsing)
-                    lines = ai_result.split('\n')
-                    tlo_line = next((line for line in lines if 'TLO:' in line), '')
-                    tlo = tlo_line.replace('TLO:', '').strip() if tlo_line else ai_result.split('\n')[0]
-                    
-                    elo_lines = [line.strip() for line in lines if line.strip().startswith(('•', '-', '1.', '2.', '3.', '4.', '5.', '6.'))]
-                    elo = '\n'.join(elo_lines) if elo_lines else "• AI-generated enabling objectives"
+                elo_lines = [line.strip() for line in lines if line.strip().startswith(('•', '-', '1.', '2.', '3.', '4.', '5.', '6.'))]
+                elo = '\n'.join(elo_lines) if elo_lines else "• AI-generated enabling objectives"
+            else:
+                # Fallback to improved templates
+                if "artificial intelligence" in course_title.lower() or "ai" in course_title.lower():
+                    tlo = "Students will analyze AI concepts, evaluate machine learning applications, and create intelligent solutions for real-world problems."
+                    elo = "• Identify types of machine learning algorithms\n• Explain neural network fundamentals\n• Evaluate AI applications across industries\n• Analyze ethical implications of AI systems\n• Communicate AI concepts to diverse audiences"
+                elif "data science" in course_title.lower():
+                    tlo = "Students will analyze datasets, evaluate statistical models, and create data-driven solutions for real-world problems."
+                    elo = "• Identify and clean data sources\n• Apply statistical analysis techniques\n• Create compelling visualizations\n• Build predictive models\n• Communicate findings effectively"
                 else:
-                    # Fallback to improved templates
-                    if "artificial intelligence" in course_title.lower() or "ai" in course_title.lower():
-                        tlo = "Students will analyze AI concepts, evaluate machine learning applications, and create intelligent solutions for real-world problems."
-                        elo = "• Identify types of machine learning algorithms\n• Explain neural network fundamentals\n• Evaluate AI applications across industries\n• Analyze ethical implications of AI systems\n• Communicate AI concepts to diverse audiences"
-                    elif "data science" in course_title.lower():
-                        tlo = "Students will analyze datasets, evaluate statistical models, and create data-driven solutions for real-world problems."
-                        elo = "• Identify and clean data sources\n• Apply statistical analysis techniques\n• Create compelling visualizations\n• Build predictive models\n• Communicate findings effectively"
-                    else:
-                        tlo = f"Students will analyze core concepts in {course_title.lower()}, evaluate practical applications, and create innovative solutions for real-world challenges."
-                        elo = f"• Master fundamental principles\n• Apply theoretical frameworks\n• Analyze complex problems\n• Develop creative solutions\n• Communicate professionally"
-                
-                st.session_state.tlo = tlo
-                st.session_state.elo = elo
-                st.session_state.objectives_generated = True
-                st.rerun()
+                    tlo = f"Students will analyze core concepts in {course_title.lower()}, evaluate practical applications, and create innovative solutions for real-world challenges."
+                    elo = f"• Master fundamental principles\n• Apply theoretical frameworks\n• Analyze complex problems\n• Develop creative solutions\n• Communicate professionally"
+            
+            st.session_state.tlo = tlo
+            st.session_state.elo = elo
+            st.session_state.objectives_generated = True
     
     # Generate KDKA/PRRR Frameworks  
     with col2:
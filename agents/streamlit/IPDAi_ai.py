@@ -1,7 +1,15 @@
 import streamlit as st
 import json
+import os
+import sys
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core"))
+from ipdai_schema import FRAMEWORKS, MODULES, validate_with_repair
+from json_stream import JSONStreamParser, parse_json
+from llm_client import get_client
+from prompts import registry as prompts
+
 st.set_page_config(page_title="IPDAi - True AI Course Planning", layout="wide")
 
 st.title("🤖 IPDAi - True AI Course Planning Agent")
@@ -10,26 +18,36 @@ st.markdown("**Real AI Generation:** Uses LLM prompting to create intelligent, c
 # API Configuration
 api_key = st.text_input("Enter OpenAI API Key (required for AI generation):", type="password")
 use_ai = bool(api_key)
+fresh_output = st.checkbox("Fresh AI output (skip cached responses)", value=False, disabled=not use_ai)
 
 if use_ai:
-    import openai
-    openai.api_key = api_key
-    
-    def generate_with_ai(prompt: str, max_tokens: int = 800) -> str:
-        """Generate content using OpenAI API"""
+    def stream_with_ai(prompt: str, max_tokens: int = 800):
+        """Stream content from the shared pooled LLM client as it is generated"""
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert instructional designer specializing in KDKA (Knowledge, Delivery, Context, Assessment) and PRRR (Personal, Relatable, Relative, Real-world) pedagogical frameworks. Create pedagogically sound, engaging educational content."},
-                    {"role": "user", "content": prompt}
-                ],
+            yield from get_client(api_key).chat_stream_sync(
+                prompts.messages(prompt),
                 max_tokens=max_tokens,
-                temperature=0.7
+                temperature=0.7,
+                bypass_cache=fresh_output
             )
-            return response.choices[0].message.content.strip()
         except Exception as e:
             st.error(f"AI generation failed: {str(e)}")
+    
+    def generate_with_ai(prompt: str, max_tokens: int = 800) -> str:
+        """Render the AI response as it streams in, then return the full text"""
+        return st.write_stream(stream_with_ai(prompt, max_tokens)) or None
+    
+    def repair_with_ai(prompt: str, max_tokens: int) -> str:
+        """Ask only for the fields that failed validation (see ipdai_schema.validate_with_repair)"""
+        try:
+            return get_client(api_key).chat_sync(
+                prompts.messages(prompt),
+                max_tokens=max_tokens,
+                temperature=0.7,
+                bypass_cache=fresh_output,
+                response_format={"type": "json_object"}
+            ).text
+        except Exception:
             return None
 else:
     st.info("💡 Enter OpenAI API key above to enable true AI generation. Without it, you'll get basic template responses.")
@@ -66,178 +84,106 @@ if ready:
     # Generate Learning Objectives
     with col1:
         if st.button("🎯 Generate Objectives", type="primary", disabled=st.session_state.objectives_generated):
-            with st.spinner("🤖 AI creating learning objectives..."):
-                if use_ai:
-                    prompt = f"""
-Create learning objectives for this course using Bloom's taxonomy:
-
-**Course:** {course_title}
-**Description:** {course_desc}  
-**Level:** {course_level}
-**Domain:** {course_domain}
-**Goals:** {', '.join(goals)}
-
-Please generate:
-1. ONE Terminal Learning Objective (TLO) - overarching outcome
-2. 5-6 Enabling Learning Objectives (ELOs) - specific skills
-
-Requirements:
-- Use Bloom's verbs appropriate for {course_level} level
-- Make objectives measurable and specific
-- Align with the course goals provided
-- Focus on what students will DO/DEMONSTRATE
-
-Format as:
-TLO: [single comprehensive objective]
-ELOs: 
-• [objective 1]
-• [objective 2]
-• [etc.]
-"""
+            if use_ai:
+                prompt = prompts.render(
+                    "learning_objectives", course_title=course_title, course_description=course_desc,
+                    course_level=course_level, goals=goals
+                )
+                
+                result = generate_with_ai(prompt)
+                if result:
+                    # Parse TLO and ELOs
+                    parts = result.split('ELOs:')
+                    tlo = parts[0].replace('TLO:', '').strip()
+                    elo = parts[1].strip() if len(parts) > 1 else "• Generated enabling objectives"
                     
-                    result = generate_with_ai(prompt)
-                    if result:
-                        # Parse TLO and ELOs
-                        parts = result.split('ELOs:')
-                        tlo = parts[0].replace('TLO:', '').strip()
-                        elo = parts[1].strip() if len(parts) > 1 else "• Generated enabling objectives"
-                        
-                        st.session_state.tlo = tlo
-                        st.session_state.elo = elo
-                        st.session_state.objectives_generated = True
-                        st.success("✅ AI-generated objectives!")
-                        st.rerun()
-                else:
-                    st.error("⚠️ OpenAI API key required for AI generation")
+                    st.session_state.tlo = tlo
+                    st.session_state.elo = elo
+                    st.session_state.objectives_generated = True
+                    st.success("✅ AI-generated objectives!")
+            else:
+                st.error("⚠️ OpenAI API key required for AI generation")
     
     # Generate KDKA/PRRR Frameworks
     with col2:
         if st.button("🧠 Generate Frameworks", type="primary", disabled=st.session_state.frameworks_generated):
-            with st.spinner("🤖 AI creating pedagogical frameworks..."):
-                if use_ai:
-                    prompt = f"""
-Create KDKA and PRRR pedagogical frameworks for this course:
-
-**Course:** {course_title}
-**Description:** {course_desc}
-**Level:** {course_level}
-**Domain:** {course_domain}
-
-Generate frameworks:
-
-**KDKA Model (Knowledge, Delivery, Context, Assessment):**
-- Knowledge: What key knowledge will students acquire?
-- Delivery: How will content be delivered effectively?
-- Context: What real-world contexts will connect learning?
-- Assessment: How will learning be measured?
-
-**PRRR Model (Personal, Relatable, Relative, Real-world):**
-- Personal: How does content connect to student experiences?
-- Relatable: What examples/analogies make content relatable?
-- Relative: How does each element support course outcomes?
-- Real-world: What authentic applications will students engage with?
-
-Format as JSON:
-{{
-  "kdka": {{
-    "knowledge": "...",
-    "delivery": "...",
-    "context": "...",
-    "assessment": "..."
-  }},
-  "prrr": {{
-    "personal": "...",
-    "relatable": "...",
-    "relative": "...",
-    "realworld": "..."
-  }}
-}}
-"""
-                    
-                    result = generate_with_ai(prompt, 600)
-                    if result:
-                        try:
-                            # Try to parse JSON
-                            import re
-                            json_match = re.search(r'\{.*\}', result, re.DOTALL)
-                            if json_match:
-                                frameworks = json.loads(json_match.group())
-                                st.session_state.kdka = frameworks.get('kdka', {})
-                                st.session_state.prrr = frameworks.get('prrr', {})
-                            else:
-                                # Fallback parsing
-                                st.session_state.kdka = {"knowledge": "AI-generated", "delivery": "AI-generated", "context": "AI-generated", "assessment": "AI-generated"}
-                                st.session_state.prrr = {"personal": "AI-generated", "relatable": "AI-generated", "relative": "AI-generated", "realworld": "AI-generated"}
-                            
-                            st.session_state.frameworks_generated = True
-                            st.success("✅ AI-generated frameworks!")
-                            st.rerun()
-                        except:
-                            st.error("Error parsing AI response. Please try again.")
-                else:
-                    st.error("⚠️ OpenAI API key required for AI generation")
+            if use_ai:
+                prompt = prompts.render(
+                    "pedagogical_frameworks", course_title=course_title, course_description=course_desc,
+                    course_level=course_level, course_domain=course_domain
+                )
+                
+                result = generate_with_ai(prompt, 600)
+                if result:
+                    try:
+                        # Tolerates code fences, trailing prose and a truncated response
+                        # and fixes a missing or invalid field without regenerating the rest
+                        frameworks = validate_with_repair(FRAMEWORKS, parse_json(result, "{"), repair_with_ai)
+                        if frameworks is not None:
+                            st.session_state.kdka = frameworks.kdka.model_dump()
+                            st.session_state.prrr = frameworks.prrr.model_dump()
+                        else:
+                            # Fallback parsing
+                            st.session_state.kdka = {"knowledge": "AI-generated", "delivery": "AI-generated", "context": "AI-generated", "assessment": "AI-generated"}
+                            st.session_state.prrr = {"personal": "AI-generated", "relatable": "AI-generated", "relative": "AI-generated", "realworld": "AI-generated"}
+                        
+                        st.session_state.frameworks_generated = True
+                        st.success("✅ AI-generated frameworks!")
+                    except:
+                        st.error("Error parsing AI response. Please try again.")
+            else:
+                st.error("⚠️ OpenAI API key required for AI generation")
     
     # Generate Modules
     with col3:
         if st.button("📚 Generate Modules", type="primary", disabled=st.session_state.modules_generated):
-            with st.spinner("🤖 AI creating course modules..."):
-                if use_ai:
-                    prompt = f"""
-Create {weeks} course modules for this course:
-
-**Course:** {course_title}
-**Description:** {course_desc}
-**Level:** {course_level}
-**Goals:** {', '.join(goals)}
-
-Generate {weeks} modules with:
-- Progressive learning sequence
-- Clear module titles
-- Specific learning objectives for each module
-- Engaging activities aligned with course level
-- Appropriate assessments
-
-Format as JSON array:
-[
-  {{
-    "title": "Module Title",
-    "objectives": "What students will learn/do in this module",
-    "activities": "Learning activities and exercises",
-    "assessment": "How learning will be assessed"
-  }},
-  ...
-]
-"""
-                    
-                    result = generate_with_ai(prompt, 1000)
-                    if result:
-                        try:
-                            # Try to parse JSON
-                            import re
-                            json_match = re.search(r'\[.*\]', result, re.DOTALL)
-                            if json_match:
-                                modules = json.loads(json_match.group())
-                                st.session_state.modules = modules
-                            else:
-                                # Create basic modules from AI text
-                                lines = [line.strip() for line in result.split('\n') if line.strip()]
-                                modules = []
-                                for i in range(min(weeks, len(lines))):
-                                    modules.append({
-                                        "title": lines[i] if i < len(lines) else f"Module {i+1}",
-                                        "objectives": "AI-generated objectives",
-                                        "activities": "AI-generated activities", 
-                                        "assessment": "AI-generated assessment"
-                                    })
-                                st.session_state.modules = modules
-                            
-                            st.session_state.modules_generated = True
-                            st.success("✅ AI-generated modules!")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Error parsing AI response: {e}")
-                else:
-                    st.error("⚠️ OpenAI API key required for AI generation")
+            if use_ai:
+                prompt = prompts.render(
+                    "course_modules", course_title=course_title, course_description=course_desc,
+                    course_level=course_level, goals=goals, weeks=weeks
+                )
+                
+                # Show each module as soon as its JSON object closes in the stream
+                parser = JSONStreamParser("[")
+                chunks = []
+                early = st.container()
+                for chunk in stream_with_ai(prompt, 1000):
+                    chunks.append(chunk)
+                    for module in parser.feed(chunk):
+                        if isinstance(module, dict):
+                            early.write(f"✅ **Module {parser.items_emitted}:** {module.get('title', '')}")
+                result = "".join(chunks)
+                if result:
+                    try:
+                        # A truncated response keeps what arrived; modules with missing or
+                        # invalid fields get just those fields regenerated
+                        parsed = parser.close()
+                        modules = validate_with_repair(
+                            MODULES,
+                            [module for module in parsed if isinstance(module, dict)] if isinstance(parsed, list) else None,
+                            repair_with_ai
+                        )
+                        if modules:
+                            st.session_state.modules = [module.model_dump() for module in modules]
+                        else:
+                            # Create basic modules from AI text
+                            lines = [line.strip() for line in result.split('\n') if line.strip()]
+                            modules = []
+                            for i in range(min(weeks, len(lines))):
+                                modules.append({
+                                    "title": lines[i] if i < len(lines) else f"Module {i+1}",
+                                    "objectives": "AI-generated objectives",
+                                    "activities": "AI-generated activities", 
+                                    "assessment": "AI-generated assessment"
+                                })
+                            st.session_state.modules = modules
+                        
+                        st.session_state.modules_generated = True
+                        st.success("✅ AI-generated modules!")
+                    except Exception as e:
+                        st.error(f"Error parsing AI response: {e}")
+            else:
+                st.error("⚠️ OpenAI API key required for AI generation")
 
 else:
     st.info("💡 Complete Steps 1-2 to enable AI generation")